@@ -0,0 +1,43 @@
+import click
+from .handle_execution import handle_apply
+from ..utils.utils import handle_json_input
+
+@click.command()
+@click.argument(
+    "input_path",
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True
+    )
+)
+@click.argument(
+    "batch_path",
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True
+    )
+)
+def apply(input_path: str, batch_path: str) -> None:
+    """
+    CLI command to transform a batch of new samples with the preprocessing fitted by a previous run.
+
+    This command reads the metadata file of the run, loads the transform state it saved to the
+    output path and pushes the batch through it with the `handle_apply` function.
+
+    Args:
+        input_path (str): Path to the JSON metadata file of the fitted run.
+        batch_path (str): Path to the batch of new samples.
+
+    Raises:
+        ClickException: If there are issues reading the files or applying the transform state.
+    """
+    try:
+        click.echo(f"Applying the fitted preprocessing of {input_path} to {batch_path}")
+        handle_apply(handle_json_input(input_path), batch_path)
+
+    except Exception as e:
+        raise click.ClickException(f"An error occurred: {e}")
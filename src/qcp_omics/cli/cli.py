@@ -1,4 +1,5 @@
 import click
+from .apply import apply
 from .interactive import interactive
 from .metadata import metadata
 
@@ -11,3 +12,4 @@ def qcp() -> None:
 
 qcp.add_command(interactive, name="interactive")
 qcp.add_command(metadata, name="metadata")
+qcp.add_command(apply, name="apply")
@@ -1,13 +1,27 @@
+import functools
+import os
+from pathlib import Path
 import typing as t
 import click
 from .input_validation import DatasetShapeWarning, Input
 from pydantic import ValidationError
+import pandas as pd
 from qcp_omics.models.clinical_data import ClinicalData
 from qcp_omics.models.genomics_data import GenomicsData
+from qcp_omics.models.omics_data import OmicsData
 from qcp_omics.models.proteomics_data import ProteomicsData
-from qcp_omics.utils.utils import load_dataset
+from qcp_omics.models.transform_state import TransformState
+from qcp_omics.utils.utils import OUTPUT_FORMATS, iter_dataset_blocks, load_dataset, release_dataset, save_dataset
+from qcp_omics.utils.parse_cache import CACHE_DIR_NAME, load_dataset_cached
 from qcp_omics.report_generation.generate_report import generate_html_report
 
+# Dataset model class of every dataset type
+DATASET_TYPE_TO_CLASS: dict[str, type[OmicsData]] = {
+    "clinical": ClinicalData,
+    "genomics": GenomicsData,
+    "proteomics": ProteomicsData
+}
+
 def instantiate_input(metadata: dict[str, t.Any]) -> Input:
     """
     Attempt to create the Input model, handling validation errors and dataset shape warnings.
@@ -58,33 +72,48 @@ def instantiate_input(metadata: dict[str, t.Any]) -> Input:
         click.echo("Input validation successful.")
         return model
 
-def handle_execution(metadata: dict[str, t.Any]) -> None:
+def handle_execution(metadata: dict[str, t.Any], use_cache: bool = True) -> None:
     """
     Execute the data processing pipeline based on provided metadata.
 
     Args:
         metadata (dict[str, t.Any]): Metadata dictionary containing dataset configuration.
+        use_cache (bool): Whether to reuse the parsed dataset cached in the output path
+            by a previous run. Defaults to True.
 
     Raises:
         ValueError: If the dataset type in the metadata is unsupported.
     """
     metadata_model = instantiate_input(metadata)
-    data = load_dataset(metadata_model.dataset_path)
-    valid_metadata = metadata_model.model_dump()
-
-    dataset_type_to_class = {
-        "clinical": ClinicalData,
-        "genomics": GenomicsData,
-        "proteomics": ProteomicsData
+    # Files with features in rows are read straight into a samples x features layout
+    load_args: dict[str, t.Any] = {
+        "dtypes": metadata_model.dtypes,
+        "chunksize": metadata_model.read_chunksize,
+        "features_cols": metadata_model.features_cols
     }
+    streaming = metadata_model.memory_mode == "streaming"
+    if streaming:
+        # The dataset is only read block by block by the streaming profile
+        data = pd.DataFrame()
+    elif use_cache:
+        cache_dir = os.path.join(metadata_model.output_path, CACHE_DIR_NAME)
+        data = load_dataset_cached(metadata_model.dataset_path, cache_dir, **load_args)
+    else:
+        data = release_dataset(metadata_model.dataset_path, **load_args)
+    valid_metadata = metadata_model.model_dump()
 
-    dataset_model_class = dataset_type_to_class.get(valid_metadata['dataset_type'])
+    dataset_model_class = DATASET_TYPE_TO_CLASS.get(valid_metadata['dataset_type'])
     if not dataset_model_class:
         raise ValueError(f"Unsupported dataset type: {valid_metadata['dataset_type']}")
 
     data_model = dataset_model_class(data, valid_metadata)
-    data_model.transpose()
-    data_model.map_dtypes()
+    if streaming:
+        data_model.profile_stream(functools.partial(iter_dataset_blocks, metadata_model.dataset_path, **load_args))
+    else:
+        data_model.map_dtypes()
+        if data_model.compact:
+            data_model.compact_dtypes()
+        data_model.build_numeric_matrix()
     data_model.execute_steps()
 
     generate_html_report(
@@ -93,4 +122,55 @@ def handle_execution(metadata: dict[str, t.Any]) -> None:
         valid_metadata["report_path"]
     )
 
-    data_model.save_data_files()
+    # Streaming mode does not change the dataset, so there are no processed files to save
+    if not streaming:
+        data_model.save_data_files()
+
+def handle_apply(metadata: dict[str, t.Any], batch_path: str) -> Path:
+    """
+    Push a batch of new samples through the transform state fitted by a previous run of the pipeline,
+    without refitting any step.
+
+    The batch is read like the dataset described by the metadata (same dtypes and orientation) and
+    the transformed samples are saved to the metadata output path, next to the transform state, as
+    `<batch name>_transformed` in the metadata output format. Only the keys describing the dataset
+    layout and output are used, so the dataset the pipeline was fitted on does not have to exist anymore.
+
+    Args:
+        metadata (dict[str, t.Any]): Metadata dictionary of the run that fitted the transform state.
+        batch_path (str): Path to the batch of new samples.
+
+    Returns:
+        Path: Path of the transformed batch.
+
+    Raises:
+        ValueError: If the dataset type in the metadata is unsupported, or the batch lacks fitted features.
+        FileNotFoundError: If no transform state was saved to the output path.
+    """
+    dataset_model_class = DATASET_TYPE_TO_CLASS.get(metadata["dataset_type"])
+    if not dataset_model_class:
+        raise ValueError(f"Unsupported dataset type: {metadata.get('dataset_type')}")
+
+    output_path = Path(metadata["output_path"])
+    state_path = output_path / OmicsData.TRANSFORM_STATE_FILE
+    if not state_path.is_file():
+        raise FileNotFoundError(f"No transform state found at {state_path}; run the pipeline first.")
+    state = TransformState.load(str(state_path))
+    click.echo(f"Loaded the transform state of steps: {', '.join(fitted.step for fitted in state.steps)}")
+
+    data = load_dataset(
+        batch_path,
+        dtypes=metadata.get("dtypes"),
+        chunksize=metadata.get("read_chunksize"),
+        features_cols=metadata.get("features_cols", True)
+    )
+    data_model = dataset_model_class(data, metadata)
+    data_model.map_dtypes()
+    transformed = data_model.compact_floats(state.apply(data_model.data))
+
+    ext = OUTPUT_FORMATS[metadata.get("output_format", "csv")]
+    batch_name = Path(batch_path).name.split(".")[0]
+    transformed_path = output_path / f"{batch_name}_transformed{ext}"
+    save_dataset(transformed, str(transformed_path))
+    click.echo(f"Transformed {len(transformed.index)} samples saved to {transformed_path}")
+    return transformed_path
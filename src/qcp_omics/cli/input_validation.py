@@ -1,25 +1,57 @@
 import os
 import re
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pydantic import BaseModel, field_validator, model_validator
 from typing_extensions import Self
-from qcp_omics.utils.utils import load_dataset
+from qcp_omics.utils.utils import (
+    check_dtype_plausibility,
+    get_dataset_format,
+    probe_dataset,
+    pyarrow_available,
+    zstandard_available,
+    COLUMNAR_FORMATS,
+    COMPRESSION_EXTENSIONS,
+    DATASET_FORMATS,
+    OUTPUT_FORMATS
+)
 
 # Define the full list of steps in the pipeline
 ALL_STEPS: List[Dict[str, Any]] = [
     {"step": "identify_missing_values"},
-    {"step": "handle_missing_values"},
-    {"step": "handle_outliers", "methods": ["IQR", "zscore"]},
+    {"step": "sample_qc", "methods": ["flag", "filter"], "default_method": "flag", "optional": True},
+    {"step": "identify_duplicates", "methods": ["flag", "drop"], "default_method": "flag", "optional": True},
+    {
+        "step": "handle_missing_values",
+        "methods": ["mean", "median", "mode", "constant", "knn"],
+        "default_method": "mean"
+    },
+    {"step": "handle_outliers", "methods": ["IQR", "zscore", "mad"]},
     {"step": "split_train_test"},
     {"step": "split_numerical_categorical"},
+    {
+        "step": "filter_low_variance",
+        "methods": ["near_zero", "highly_variable"],
+        "default_method": "near_zero",
+        "optional": True
+    },
     {"step": "scale_numerical_features", "methods": ["standard_scaler", "robust_scaler"]},
-    {"step": "transform_numerical_features", "methods": ["box-cox", "log2"]},
+    {"step": "transform_numerical_features", "methods": ["box-cox", "yeo-johnson", "log2", "log1p", "asinh", "sqrt"]},
     {"step": "descriptive_statistics"},
     {"step": "pairwise_correlations_numerical", "methods": ["pearson", "spearman"]},
     {"step": "evaluate_distribution_features"},
-    {"step": "dimensionality_reduction"},
+    {
+        "step": "dimensionality_reduction",
+        "methods": ["full", "randomized", "incremental"],
+        "default_method": "full"
+    },
 ]
 
+MEMORY_MODES: List[str] = ["default", "compact", "streaming"]
+
+# Outlier methods computed from the bounds of a streaming profile
+STREAMING_OUTLIER_METHODS: List[str] = ["IQR", "zscore"]
+NUMERIC_BACKENDS: List[str] = ["dataframe", "array", "memmap", "sparse"]
+
 class DatasetShapeWarning(Exception):
     """
     Custom exception to warn about dataset shape inconsistencies.
@@ -52,6 +84,26 @@ class Input(BaseModel):
         is_raw (bool): If True, requires all pipeline steps to be run.
         dtypes (dict): Expected data types for dataset columns.
         steps_to_run (list): List of steps and methods to run in the pipeline.
+        output_format (str): File format of the saved train and test datasets.
+        validation_sample_rows (int): Number of leading rows parsed to check that values
+            match their declared dtypes. 0 disables the check.
+        read_chunksize (Optional[int]): If set, text datasets are parsed in chunks of this many rows.
+        memory_mode (str): "compact" downcasts numerical columns and low-cardinality strings after
+            mapping dtypes; "streaming" profiles the dataset chunk by chunk without loading it, and only
+            runs the quality control steps computed from the profile; "default" keeps the mapped dtypes.
+        numeric_backend (str): Storage of numerical features: "dataframe", "array" (one contiguous
+            float matrix), "memmap" (a float matrix memory-mapped in the output directory) or "sparse"
+            (a compressed sparse column matrix storing only non-zero values).
+        missing_threshold (float): Percentage of missing values from which a column is dropped
+            by `handle_missing_values`.
+        imputation_constant (float): Fill value of the "constant" imputation method.
+        knn_neighbors (int): Number of neighbouring samples averaged by the "knn" imputation method.
+        n_top_features (int): Number of features kept by the "highly_variable" method of `filter_low_variance`.
+        n_workers (Optional[int]): Number of worker threads of parallel steps. Defaults to the number of CPUs.
+        transform_shift (str): "global" shifts all features by the same amount into the domain of the
+            transformation of `transform_numerical_features`; "per_column" only shifts the features outside it.
+        pca_components (Optional[Union[int, float]]): Number of principal components computed by
+            `dimensionality_reduction`, or the fraction of variance (between 0 and 1) they must explain.
         shape_override (bool): Override shape warnings if True.
     """
 
@@ -65,6 +117,18 @@ class Input(BaseModel):
     is_raw: bool
     dtypes: Dict[str, str]
     steps_to_run: List[Dict[str, str]]
+    output_format: str = "csv"
+    validation_sample_rows: int = 0
+    read_chunksize: Optional[int] = None
+    memory_mode: str = "default"
+    numeric_backend: str = "dataframe"
+    missing_threshold: float = 30.0
+    imputation_constant: float = 0.0
+    knn_neighbors: int = 5
+    n_top_features: int = 2000
+    n_workers: Optional[int] = None
+    transform_shift: str = "global"
+    pca_components: Optional[Union[int, float]] = None
     shape_override: bool = False
 
     @field_validator("dataset_type")
@@ -85,10 +149,19 @@ class Input(BaseModel):
             raise ValueError(f"File '{v}' cannot be opened or read.")
         if os.path.getsize(v) == 0:
             raise ValueError(f"File '{v}' is empty.")
-        _, ext = os.path.splitext(v)
-        allowed_extensions = [".csv", ".tsv"]
-        if ext.lower() not in allowed_extensions:
+        try:
+            fmt, compression = get_dataset_format(v)
+        except ValueError:
+            allowed_extensions = list(DATASET_FORMATS) + [
+                ext + comp_ext
+                for ext, ext_fmt in DATASET_FORMATS.items() if ext_fmt not in COLUMNAR_FORMATS
+                for comp_ext in COMPRESSION_EXTENSIONS
+            ]
             raise ValueError(f"File '{v}' extension must be one of: {', '.join(allowed_extensions)}.")
+        if fmt in COLUMNAR_FORMATS and not pyarrow_available():
+            raise ValueError(f"Reading '{fmt}' files requires the optional 'pyarrow' package to be installed.")
+        if compression == "zstd" and not zstandard_available():
+            raise ValueError("Reading '.zst' files requires the optional 'zstandard' package to be installed.")
         return v
 
     @field_validator("metadata_path")
@@ -130,11 +203,116 @@ class Input(BaseModel):
             raise ValueError(f"Directory '{v}' is not writable.")
         return v
 
+    @field_validator("output_format")
+    @classmethod
+    def check_output_format(cls, v: str) -> str:
+        if v not in OUTPUT_FORMATS:
+            raise ValueError(f"Incorrect output format value. Must be one of: {', '.join(OUTPUT_FORMATS)}.")
+        if v in COLUMNAR_FORMATS and not pyarrow_available():
+            raise ValueError(f"Writing '{v}' files requires the optional 'pyarrow' package to be installed.")
+        if v.endswith(".zst") and not zstandard_available():
+            raise ValueError(f"Writing '{v}' files requires the optional 'zstandard' package to be installed.")
+        return v
+
+    @field_validator("validation_sample_rows")
+    @classmethod
+    def check_validation_sample_rows(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError("validation_sample_rows can't be negative.")
+        return v
+
+    @field_validator("missing_threshold")
+    @classmethod
+    def check_missing_threshold(cls, v: float) -> float:
+        if not 0 < v <= 100:
+            raise ValueError("missing_threshold must be a percentage greater than 0 and at most 100.")
+        return v
+
+    @field_validator("knn_neighbors")
+    @classmethod
+    def check_knn_neighbors(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("knn_neighbors must be at least 1.")
+        return v
+
+    @field_validator("n_top_features")
+    @classmethod
+    def check_n_top_features(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("n_top_features must be at least 1.")
+        return v
+
+    @field_validator("n_workers")
+    @classmethod
+    def check_n_workers(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and v < 1:
+            raise ValueError("n_workers must be at least 1.")
+        return v
+
+    @field_validator("transform_shift")
+    @classmethod
+    def check_transform_shift(cls, v: str) -> str:
+        if v not in ("global", "per_column"):
+            raise ValueError("transform_shift must be one of: global, per_column.")
+        return v
+
+    @field_validator("pca_components")
+    @classmethod
+    def check_pca_components(cls, v: Optional[Union[int, float]]) -> Optional[Union[int, float]]:
+        if v is not None and not (0 < v < 1 or (v >= 1 and float(v).is_integer())):
+            raise ValueError(
+                "pca_components must be a number of components (at least 1) or a fraction of variance between 0 and 1."
+            )
+        return int(v) if v is not None and v >= 1 else v
+
+    @field_validator("read_chunksize")
+    @classmethod
+    def check_read_chunksize(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and v < 1:
+            raise ValueError("read_chunksize must be a positive number of rows.")
+        return v
+
+    @field_validator("memory_mode")
+    @classmethod
+    def check_memory_mode(cls, v: str) -> str:
+        if v not in MEMORY_MODES:
+            raise ValueError(f"Incorrect memory mode value. Must be one of: {', '.join(MEMORY_MODES)}.")
+        return v
+
+    @field_validator("numeric_backend")
+    @classmethod
+    def check_numeric_backend(cls, v: str) -> str:
+        if v not in NUMERIC_BACKENDS:
+            raise ValueError(f"Incorrect numeric backend value. Must be one of: {', '.join(NUMERIC_BACKENDS)}.")
+        return v
+
+    @model_validator(mode="after")
+    def check_streaming_steps(self) -> Self:
+        if self.memory_mode == "streaming":
+            for step_entry in self.steps_to_run:
+                method = step_entry.get("method")
+                if step_entry.get("step") == "handle_outliers" and method not in STREAMING_OUTLIER_METHODS:
+                    raise ValueError(
+                        f"steps_to_run error: method '{method}' of step 'handle_outliers' is not available "
+                        f"in streaming memory mode. Valid methods: {STREAMING_OUTLIER_METHODS}"
+                    )
+        return self
+
+    @model_validator(mode="after")
+    def check_highly_variable_features(self) -> Self:
+        for step_entry in self.steps_to_run:
+            if step_entry.get("step") == "filter_low_variance" and step_entry.get("method") == "highly_variable" \
+                    and self.dataset_type != "genomics":
+                raise ValueError(
+                    "steps_to_run error: method 'highly_variable' of step 'filter_low_variance' is only "
+                    "available for genomics datasets."
+                )
+        return self
+
     @model_validator(mode="after")
     def validate_features_cols(self) -> Self:
         if not self.shape_override:
-            df = load_dataset(self.dataset_path)
-            nrows, ncols = df.shape
+            nrows, ncols = probe_dataset(self.dataset_path).shape
             if self.features_cols and nrows <= ncols:
                 raise DatasetShapeWarning(
                     "Detected shape suggests features might be in rows instead of columns",
@@ -150,9 +328,9 @@ class Input(BaseModel):
     @model_validator(mode="after")
     def check_en_header(self) -> Self:
         if self.en_header:
-            df = load_dataset(self.dataset_path)
-            columns = df.columns.tolist()
-            rows = df.index.tolist()
+            probe = probe_dataset(self.dataset_path)
+            columns = probe.columns
+            rows = probe.rows
             pattern = re.compile(r"^[a-zA-Z0-9 ._\-]+$")
 
             invalid_columns = [col for col in columns if not pattern.match(str(col))]
@@ -167,24 +345,24 @@ class Input(BaseModel):
 
     @model_validator(mode="after")
     def check_size(self) -> Self:
-        df = load_dataset(self.dataset_path)
-        if len(df.columns) < 1:
+        if len(probe_dataset(self.dataset_path).columns) < 1:
             raise ValueError("There can't be less than two columns in the dataset.")
         return self
 
     @model_validator(mode="after")
     def check_dtypes(self) -> Self:
-        df = load_dataset(self.dataset_path)
-        if not self.features_cols:
-            df = df.T
+        probe = probe_dataset(self.dataset_path, self.validation_sample_rows)
+        # Features are read from the index instead of transposing the whole dataset
+        features = probe.columns if self.features_cols else probe.rows
+        feature_set = set(features)
         valid_dtypes = {"int", "float", "str", "object", "bool", "category"}
 
-        for col in df.columns:
+        for col in features:
             if col not in self.dtypes.keys():
                 raise ValueError(f"dtypes error: column '{col}' not found in dtypes.")
 
         for col_name, dtype_str in self.dtypes.items():
-            if col_name not in df.columns:
+            if col_name not in feature_set:
                 raise ValueError(f"dtypes error: column '{col_name}' not found in dataset.")
             if dtype_str not in valid_dtypes:
                 raise ValueError(
@@ -192,6 +370,16 @@ class Input(BaseModel):
                     f"Must be one of: {', '.join(valid_dtypes)}."
                 )
 
+        if probe.sample is not None:
+            sample = probe.sample if self.features_cols else probe.sample.T
+            for col_name in sample.columns:
+                declared = self.dtypes.get(str(col_name), "object")
+                if not check_dtype_plausibility(sample[col_name], declared):
+                    raise ValueError(
+                        f"dtypes error: sampled values of column '{col_name}' "
+                        f"cannot be cast to dtype '{declared}'."
+                    )
+
         return self
 
     @model_validator(mode="after")
@@ -217,7 +405,7 @@ class Input(BaseModel):
             all_steps_obj = ALL_STEPS[current_index]
             if "methods" in all_steps_obj:
                 allowed_methods = all_steps_obj["methods"]
-                user_method = step_entry.get("method")
+                user_method = step_entry.get("method", all_steps_obj.get("default_method"))
                 if user_method not in allowed_methods:
                     raise ValueError(
                         f"steps_to_run error: invalid method '{user_method}' "
@@ -229,16 +417,18 @@ class Input(BaseModel):
                     f"but got method='{step_entry['method']}'."
                 )
 
-        # Ensure all steps are present if is_raw=True
+        # Ensure all steps are present if is_raw=True; optional steps may be left out
         if self.is_raw:
-            if len(self.steps_to_run) != len(ALL_STEPS):
+            official_steps = [s["step"] for s in ALL_STEPS if not s.get("optional")]
+            provided_steps = [
+                s["step"] for s in self.steps_to_run if not ALL_STEPS[step_index_map[s["step"]]].get("optional")
+            ]
+            if len(provided_steps) != len(official_steps):
                 raise ValueError(
                     "steps_to_run error: is_raw=True requires all steps, "
                     "but some are missing."
                 )
 
-            official_steps = [s["step"] for s in ALL_STEPS]
-            provided_steps = [s["step"] for s in self.steps_to_run]
             if official_steps != provided_steps:
                 raise ValueError(
                     "steps_to_run error: is_raw=True requires the full pipeline in order. "
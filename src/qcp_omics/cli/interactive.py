@@ -14,16 +14,32 @@ from qcp_omics.utils.utils import (
 # Constants for pipeline steps
 ALL_STEPS: list[dict] = [
     {"step": "identify_missing_values"},
-    {"step": "handle_missing_values"},
-    {"step": "handle_outliers", "methods": ["IQR", "zscore"]},
+    {"step": "sample_qc", "methods": ["flag", "filter"], "default_method": "flag", "optional": True},
+    {"step": "identify_duplicates", "methods": ["flag", "drop"], "default_method": "flag", "optional": True},
+    {
+        "step": "handle_missing_values",
+        "methods": ["mean", "median", "mode", "constant", "knn"],
+        "default_method": "mean"
+    },
+    {"step": "handle_outliers", "methods": ["IQR", "zscore", "mad"]},
     {"step": "split_train_test"},
     {"step": "split_numerical_categorical"},
+    {
+        "step": "filter_low_variance",
+        "methods": ["near_zero", "highly_variable"],
+        "default_method": "near_zero",
+        "optional": True
+    },
     {"step": "scale_numerical_features", "methods": ["standard_scaler", "robust_scaler"]},
-    {"step": "transform_numerical_features", "methods": ["box-cox", "log2"]},
+    {"step": "transform_numerical_features", "methods": ["box-cox", "yeo-johnson", "log2", "log1p", "asinh", "sqrt"]},
     {"step": "descriptive_statistics"},
     {"step": "pairwise_correlations_numerical", "methods": ["pearson", "spearman"]},
     {"step": "evaluate_distribution_features"},
-    {"step": "dimensionality_reduction"}
+    {
+        "step": "dimensionality_reduction",
+        "methods": ["full", "randomized", "incremental"],
+        "default_method": "full"
+    }
 ]
 
 PREVIOUS_STEPS: list[str] = []
@@ -97,6 +113,7 @@ def interactive() -> None:
     # Load metadata and update input
     input_metadata: dict[str, t.Any] = handle_json_input(cli_input["metadata_path"])
     cli_input["dtypes"] = input_metadata["dtypes"]
+    cli_input["output_format"] = input_metadata.get("output_format", "csv")
     cli_input["steps_to_run"] = steps_to_run
 
     # Execute the pipeline
@@ -12,7 +12,13 @@ from ..utils.utils import handle_json_input
         readable=True
     )
 )
-def metadata(input_path: str) -> None:
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the dataset again instead of reusing the parsed copy cached in the output path."
+)
+def metadata(input_path: str, no_cache: bool) -> None:
     """
     CLI command to process metadata from a specified JSON file.
 
@@ -21,6 +27,7 @@ def metadata(input_path: str) -> None:
 
     Args:
         input_path (str): Path to the input JSON metadata file.
+        no_cache (bool): Bypass the parsed dataset cache.
 
     Raises:
         ClickException: If there are issues reading the file or processing its content.
@@ -32,7 +39,7 @@ def metadata(input_path: str) -> None:
         input_json = handle_json_input(input_path)
 
         # Handle execution with the parsed JSON
-        handle_execution(input_json)
+        handle_execution(input_json, use_cache=not no_cache)
 
     except Exception as e:
         raise click.ClickException(f"An error occurred: {e}")
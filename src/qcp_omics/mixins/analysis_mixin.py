@@ -1,5 +1,8 @@
 from typing import Optional, TypeVar, Literal, Union
+import numpy as np
 import pandas as pd
+from scipy.stats import kurtosis, skew
+from qcp_omics.models.numeric_matrix import NumericMatrix
 from qcp_omics.report_generation.report_step import report_step
 from qcp_omics.utils.protocols import HasData
 
@@ -22,9 +25,15 @@ class AnalysisMixin:
         Returns:
             Optional[pd.DataFrame]: A DataFrame with descriptive statistics, or None if no numerical data is available.
         """
+        if self.streaming_profile is not None:
+            return self.streaming_profile.statistics()
+
         if self.data_numerical is None or self.data_numerical.empty:
             return None
 
+        if isinstance(self.data_numerical, NumericMatrix):
+            return AnalysisMixin._matrix_statistics(self.data_numerical)
+
         # Compute basic statistics
         basic_stats = self.data_numerical.describe(include="all").T
         basic_stats["kurtosis"] = self.data_numerical.kurt()
@@ -32,6 +41,39 @@ class AnalysisMixin:
 
         return basic_stats
 
+    @staticmethod
+    def _matrix_statistics(matrix: NumericMatrix) -> pd.DataFrame:
+        """
+        Compute the same statistics as `DataFrame.describe` plus kurtosis and skewness
+        for a numeric matrix, one block of columns at a time.
+
+        Args:
+            matrix (NumericMatrix): The numeric matrix.
+
+        Returns:
+            pd.DataFrame: A DataFrame with one row of statistics per feature.
+        """
+        stats = []
+        for _, block in matrix.blocks():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                quartiles = np.nanpercentile(block, [25, 50, 75], axis=0)
+                stats.append(np.column_stack([
+                    np.sum(~np.isnan(block), axis=0),
+                    np.nanmean(block, axis=0),
+                    np.nanstd(block, axis=0, ddof=1),
+                    np.nanmin(block, axis=0),
+                    *quartiles,
+                    np.nanmax(block, axis=0),
+                    kurtosis(block, axis=0, bias=False, nan_policy="omit"),
+                    skew(block, axis=0, bias=False, nan_policy="omit"),
+                ]))
+
+        return pd.DataFrame(
+            np.vstack(stats),
+            index=matrix.features,
+            columns=["count", "mean", "std", "min", "25%", "50%", "75%", "max", "kurtosis", "skewness"]
+        )
+
     @report_step(output=True)
     def pairwise_correlations_numerical(
         self: T, method: Literal["pearson", "spearman"] = "pearson"
@@ -50,7 +92,10 @@ class AnalysisMixin:
             return None
 
         # Compute correlation matrix
-        corr_matrix = self.data_numerical.corr(method=method)
+        data_numerical = self.data_numerical
+        if isinstance(data_numerical, NumericMatrix):
+            data_numerical = data_numerical.to_frame()
+        corr_matrix = data_numerical.corr(method=method)
 
         # Generate heatmap (assumes self._heatmap is implemented in the parent class)
         heatmap = self._heatmap(corr_matrix)
@@ -75,7 +120,10 @@ class AnalysisMixin:
             return None
 
         # Generate histograms (assumes self._histograms is implemented in the parent class)
-        hist_plots = self._histograms(self.data_numerical)
+        data_numerical = self.data_numerical
+        if isinstance(data_numerical, NumericMatrix):
+            data_numerical = data_numerical.to_frame()
+        hist_plots = self._histograms(data_numerical)
 
         return {
             "hist_plots": hist_plots
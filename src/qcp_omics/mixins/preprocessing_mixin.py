@@ -1,20 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import click
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from sklearn.decomposition import PCA
-from scipy.stats import boxcox
+from sklearn.decomposition import PCA, IncrementalPCA, TruncatedSVD
+from scipy import special, stats
 import numpy as np
+from qcp_omics.models.numeric_matrix import NumericMatrix
+from qcp_omics.models.sparse_matrix import SparseMatrix
+from qcp_omics.models.transform_state import ELEMENTWISE_TRANSFORMS, FittedStep, yeo_johnson
 from qcp_omics.report_generation.report_step import report_step
-from typing import TypeVar, Optional, Dict
+from typing import TypeVar, Any, Callable, Iterator, Optional, Dict, Tuple, Union
 from qcp_omics.utils.protocols import HasData
 
 T = TypeVar("T", bound=HasData)
 
+# Columns processed at once when profiling feature variability
+VARIANCE_CHUNK_SIZE: int = 1024
+
+# A feature has near-zero variance if its most common value is more than NZV_FREQ_RATIO times as
+# frequent as the second most common one, and under NZV_UNIQUE_PERCENT percent of its values are distinct
+NZV_FREQ_RATIO: float = 95 / 5
+NZV_UNIQUE_PERCENT: float = 10.0
+
+# Number of quantile bins of mean values within which the dispersions of highly variable features are normalized
+HVF_MEAN_BINS: int = 20
+
+# Number of kept and dropped features listed in the report
+VARIANCE_REPORT_FEATURES: int = 20
+
+# Columns transformed at once, in place, by one worker of `transform_numerical_features`
+TRANSFORM_CHUNK_SIZE: int = 256
+
+# Lambdas are searched in [-POWER_LAMBDA_BOUND, POWER_LAMBDA_BOUND] to a precision of POWER_LAMBDA_TOL;
+# columns whose optimum lies on a bound are estimated again by scipy's unbounded search
+POWER_LAMBDA_BOUND: float = 5.0
+POWER_LAMBDA_TOL: float = 1e-7
+
+# Elementwise transformations mapping 0 to 0, applied to the stored values of a sparse matrix
+ZERO_PRESERVING_TRANSFORMS: Tuple[str, ...] = ("log1p", "asinh", "sqrt")
+
+# Principal components computed by the randomized and incremental methods of `dimensionality_reduction`
+# unless `pca_components` gives their number
+PCA_DEFAULT_COMPONENTS: int = 50
+
+# Minimum number of samples fitted or projected at once by `dimensionality_reduction`
+PCA_BATCH_SIZE: int = 1000
+
 class PreprocessingMixin:
     """
     A mixin class for preprocessing data, including splitting datasets, scaling,
     transforming features, and applying dimensionality reduction techniques.
     """
+    # Attributes the steps assign, with the types declared by `HasData`
+    data_numerical: Optional[Union[pd.DataFrame, NumericMatrix]]
 
     @report_step(snapshot="combined", output=True)
     def split_train_test(self: T) -> pd.DataFrame:
@@ -24,6 +64,17 @@ class PreprocessingMixin:
         Returns:
             pd.DataFrame: The test set.
         """
+        if isinstance(self.data_numerical, NumericMatrix):
+            train_idx, test_idx = train_test_split(np.arange(len(self.data.index)), test_size=0.2, random_state=42)
+            if isinstance(self.data_numerical, SparseMatrix):
+                test_numerical = self.data_numerical.take_samples(test_idx).to_frame()
+            else:
+                test_numerical = self.data_numerical.to_frame().iloc[test_idx]
+            self.test_set = pd.concat([test_numerical, self.data.iloc[test_idx]], axis=1)
+            self.data_numerical = self.data_numerical.take_samples(train_idx)
+            self.data = self.data.iloc[train_idx]
+            return self.test_set
+
         train_set, test_set = train_test_split(self.data, test_size=0.2, random_state=42)
         self.test_set = test_set
         self.data = train_set
@@ -34,74 +85,597 @@ class PreprocessingMixin:
         """
         Split the dataset into numerical and categorical subsets.
         """
-        self.data_numerical = self.data.select_dtypes(include=["float", "int"])
-        self.data_categorical = self.data.select_dtypes(include=["category"])
+        if not isinstance(self.data_numerical, NumericMatrix):
+            self.data_numerical = self.data.select_dtypes(include="number")
+        self.data_categorical = self.data[self._categorical_columns()]
+
+    def _numerical_blocks(self: T) -> Iterator[Tuple[pd.Index, np.ndarray]]:
+        """
+        Iterate over column blocks of the numerical features.
+
+        Yields:
+            Tuple[pd.Index, np.ndarray]: The features of the block and their values as a float array
+            (samples x features).
+        """
+        data_numerical = self.data_numerical
+        if data_numerical is None:
+            return
+        if isinstance(data_numerical, NumericMatrix):
+            for columns, block in data_numerical.blocks():
+                yield data_numerical.columns[columns], block
+            return
+
+        for start in range(0, data_numerical.shape[1], VARIANCE_CHUNK_SIZE):
+            block = data_numerical.iloc[:, start:start + VARIANCE_CHUNK_SIZE]
+            yield block.columns, block.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @staticmethod
+    def _block_variability(block: np.ndarray) -> np.ndarray:
+        """
+        Profile the variability of every column of a block from one sort of its values.
+
+        Args:
+            block (np.ndarray): 2-D float array (samples x features).
+
+        Returns:
+            np.ndarray: Array of shape (features, 5) with the minimum, mean, variance (ddof=1), percentage
+            of distinct values and ratio of the frequencies of the two most common values of every
+            feature. The ratio is infinite for features with a single value.
+        """
+        n_rows, n_columns = block.shape
+        # NaNs are sorted last, after the present values of every column
+        values = np.sort(block, axis=0).T
+        n_present = np.count_nonzero(~np.isnan(values), axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nanmean(values, axis=1)
+            variance = np.nanvar(values, axis=1, ddof=1)
+
+        # Runs of equal values start where a present value differs from the previous one
+        starts = ~np.isnan(values)
+        starts[:, 1:] &= values[:, 1:] != values[:, :-1]
+        distinct = starts.sum(axis=1)
+
+        starts = np.flatnonzero(starts.ravel())
+        columns = starts // max(n_rows, 1)
+        same_column = np.r_[columns[1:] == columns[:-1], False]
+        stops = np.where(same_column, np.r_[starts[1:], 0], columns * n_rows + n_present[columns])
+        lengths = stops - starts
+
+        # The longest run of every column comes first, followed by the second longest
+        order = np.lexsort((-lengths, columns))
+        columns, lengths = columns[order], lengths[order]
+        first = np.r_[True, columns[1:] != columns[:-1]]
+        second = np.r_[False, first[:-1]] & ~first
+        most_common = np.zeros(n_columns)
+        most_common[columns[first]] = lengths[first]
+        second_common = np.zeros(n_columns)
+        second_common[columns[second]] = lengths[second]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            freq_ratio = np.where(second_common > 0, most_common / second_common, np.inf)
+            unique = distinct / n_present * 100
+
+        minimum = np.where(n_present > 0, values[:, 0], np.nan)
+        return np.column_stack([minimum, mean, variance, unique, freq_ratio])
+
+    def _feature_variability(self: T) -> pd.DataFrame:
+        """
+        Profile the variability of every numerical feature in one pass over column blocks.
+
+        Returns:
+            pd.DataFrame: Minimum, mean, variance, percentage of distinct values ("unique") and ratio of
+            the frequencies of the two most common values ("freq_ratio") of every numerical feature.
+        """
+        features = []
+        profiles = []
+        for columns, block in self._numerical_blocks():
+            features.append(columns)
+            profiles.append(PreprocessingMixin._block_variability(block))
+        return pd.DataFrame(
+            np.vstack(profiles) if profiles else np.empty((0, 5)),
+            index=features[0].append(features[1:]) if features else pd.Index([]),
+            columns=["min", "mean", "variance", "unique", "freq_ratio"]
+        )
+
+    @staticmethod
+    def _normalized_dispersion(variability: pd.DataFrame) -> pd.Series:
+        """
+        Rank features by their dispersion (variance over mean) normalized within quantile bins of similar
+        means, as for highly variable genes, so that features are not selected for their high mean alone.
+
+        Features with negative values are ranked by their variance instead.
+
+        Args:
+            variability (pd.DataFrame): Feature variability profile, see `_feature_variability`.
+
+        Returns:
+            pd.Series: Score of every feature; more variable features have higher scores.
+        """
+        if variability.empty or (variability["min"] < 0).any():
+            return variability["variance"]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dispersion = np.log(variability["variance"] / variability["mean"])
+            log_mean = np.log1p(variability["mean"])
+        # Quantile bins hold similar numbers of features, even where means are sparse
+        bins = pd.qcut(log_mean, q=HVF_MEAN_BINS, duplicates="drop")
+        grouped = dispersion.groupby(bins, observed=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normalized = (dispersion - grouped.transform("mean")) / grouped.transform("std")
+        # Features alone in their bin have no spread to be normalized by
+        return normalized.fillna(0).where(np.isfinite(dispersion), -np.inf)
+
+    @report_step(snapshot="numerical", output=True)
+    def filter_low_variance(self: T, method: str = "near_zero") -> Optional[Dict[str, Any]]:
+        """
+        Drop numerical features without variance or with near-zero variance, i.e. whose most common value
+        is more than 19 times as frequent as the second most common one, with under 10% distinct values.
+
+        Features are profiled in a single pass over column blocks, before the scaling, transformation and
+        analysis steps run over every feature.
+
+        Args:
+            method (str): "near_zero" to only drop uninformative features, or "highly_variable" to also keep
+                only the `n_top_features` features (2000 by default) with the highest dispersion normalized
+                within bins of similar means. Defaults to "near_zero".
+
+        Returns:
+            Optional[Dict[str, Any]]: The number of features and of dropped features, and the profile of the
+            most variable kept features and of the first dropped ones, or None if there are no numerical features.
+        """
+        if self.data_numerical is None or self.data_numerical.empty:
+            return None
+
+        variability = self._feature_variability()
+        constant = ~(variability["variance"] > 0)
+        near_zero = ~constant & (variability["freq_ratio"] > NZV_FREQ_RATIO) & \
+            (variability["unique"] < NZV_UNIQUE_PERCENT)
+        keep = ~(constant | near_zero)
+
+        score = variability["variance"]
+        n_top = None
+        if method == "highly_variable":
+            n_top = self.metadata.get("n_top_features", 2000)
+            score = PreprocessingMixin._normalized_dispersion(variability)
+            ranked = score[keep.to_numpy()].sort_values(ascending=False, kind="stable")
+            keep &= variability.index.isin(ranked.index[:n_top])
+        variability["score"] = score
+
+        dropped = variability.index[~keep.to_numpy()]
+        if len(dropped):
+            click.echo(f"Dropping {len(dropped)} of {len(variability.index)} numerical features with low variance")
+            if isinstance(self.data_numerical, NumericMatrix):
+                self.data_numerical.drop_features(list(dropped))
+            else:
+                self.data_numerical = self.data_numerical.iloc[:, np.flatnonzero(keep.to_numpy())]
+            self.data = self.data.drop(columns=dropped, errors="ignore")
+            self._record_fit(FittedStep("filter_low_variance", method, {"dropped": dropped.tolist()}))
+
+        kept = variability[keep.to_numpy()].sort_values("score", ascending=False, kind="stable")
+        return {
+            "n_features": len(variability.index),
+            "n_constant": int(constant.sum()),
+            "n_near_zero": int(near_zero.sum()),
+            "n_dropped": len(dropped),
+            "n_top": n_top,
+            "kept": kept.iloc[:VARIANCE_REPORT_FEATURES],
+            "dropped": variability[~keep.to_numpy()].iloc[:VARIANCE_REPORT_FEATURES]
+        }
 
     @report_step(snapshot="numerical")
     def scale_numerical_features(self: T, method: str = "standard_scaler") -> None:
         """
         Scale numerical features using the specified scaling method.
 
+        The fitted centers and scales are stored in the transform state and applied to the test set.
+        Features of a sparse matrix are only divided by their scale, as centering would fill in the zeros.
+
         Args:
             method (str): The scaling method to use ("standard_scaler" or "robust_scaler").
         """
         scaler = StandardScaler() if method == "standard_scaler" else RobustScaler()
 
-        if self.data_numerical.empty:
+        if self.data_numerical is None or self.data_numerical.empty:
+            return
+
+        if isinstance(self.data_numerical, SparseMatrix):
+            matrix = self.data_numerical
+            if method == "standard_scaler":
+                scaler.set_params(with_mean=False)
+            else:
+                scaler.set_params(with_centering=False)
+            scaler.fit(matrix.values)
+            # Scalers transform CSR matrices only; the stored values are divided in place instead
+            matrix.values.data /= scaler.scale_[matrix.stored_columns()]
+            self._record_fit(FittedStep("scale_numerical_features", method, {
+                "features": matrix.columns.tolist(),
+                "center": np.zeros(matrix.shape[1]),
+                "scale": scaler.scale_
+            }))
+            return
+
+        if isinstance(self.data_numerical, NumericMatrix):
+            scaler.set_params(copy=False)
+            centers, scales = [], []
+            for _, block in self.data_numerical.blocks():
+                block[:] = scaler.fit_transform(block)
+                centers.append(PreprocessingMixin._scaler_center(scaler))
+                scales.append(scaler.scale_)
+            self._record_fit(FittedStep("scale_numerical_features", method, {
+                "features": self.data_numerical.columns.tolist(),
+                "center": np.concatenate(centers),
+                "scale": np.concatenate(scales)
+            }))
             return
 
-        self.data_numerical = pd.DataFrame(
+        self.data_numerical = self.compact_floats(pd.DataFrame(
             scaler.fit_transform(self.data_numerical),
             columns=self.data_numerical.columns,
             index=self.data_numerical.index,
-        )
+        ))
+        self._record_fit(FittedStep("scale_numerical_features", method, {
+            "features": self.data_numerical.columns.tolist(),
+            "center": PreprocessingMixin._scaler_center(scaler),
+            "scale": scaler.scale_
+        }))
+
+    @staticmethod
+    def _scaler_center(scaler: Union[StandardScaler, RobustScaler]) -> np.ndarray:
+        """
+        Return the values a fitted scaler subtracts from every feature.
+
+        Args:
+            scaler (Union[StandardScaler, RobustScaler]): The fitted scaler.
+
+        Returns:
+            np.ndarray: The mean (standard scaler) or median (robust scaler) of every feature.
+        """
+        return scaler.mean_ if isinstance(scaler, StandardScaler) else scaler.center_
+
+    @staticmethod
+    def _power_log_likelihood(values: np.ndarray, method: str = "box-cox") -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Build the profile log-likelihood of the Box-Cox or Yeo-Johnson transformation of every column
+        of a 2-D array, as defined by `scipy.stats.boxcox_llf` and `scipy.stats.yeojohnson_llf`.
+
+        Logarithms of the values are computed once; every evaluation then costs one exponential per value.
+        Box-Cox values are exponentiated relative to the column's largest (or smallest) logarithm, so
+        large lambdas do not overflow and lambdas close to 0 do not lose precision. The Yeo-Johnson
+        transformation of non-negative values is the Box-Cox transformation of `x + 1` and is computed
+        the same way.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features); positive for Box-Cox.
+            method (str): "box-cox" or "yeo-johnson". Defaults to "box-cox".
+
+        Returns:
+            Callable[[np.ndarray], np.ndarray]: Maps one lambda per column to the log-likelihood of every column.
+        """
+        var = np.nanvar if np.isnan(values).any() else np.var
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+
+        if method == "box-cox" or not (values < 0).any():
+            logs = np.log(values) if method == "box-cox" else np.log1p(values)
+            log_sum = np.nansum(logs, axis=0)
+            log_max, log_min = np.nanmax(logs, axis=0), np.nanmin(logs, axis=0)
+
+            def log_likelihood(lambdas: np.ndarray) -> np.ndarray:
+                # var((x^l - 1) / l) = exp(2 l c) var((exp(l (log x - c)) - 1) / l), with l (log x - c) <= 0
+                offsets = np.where(lambdas > 0, log_max, log_min)
+                scaled = np.expm1(lambdas * (logs - offsets)) / np.where(lambdas == 0, 1, lambdas)
+                scaled[:, lambdas == 0] = logs[:, lambdas == 0]
+                log_var = np.log(var(scaled, axis=0)) + 2 * lambdas * offsets
+                return (lambdas - 1) * log_sum - counts / 2 * log_var
+
+            return log_likelihood
+
+        with np.errstate(invalid="ignore"):
+            log_sum = np.nansum(np.sign(values) * np.log1p(np.abs(values)), axis=0)
+
+        def signed_log_likelihood(lambdas: np.ndarray) -> np.ndarray:
+            return (lambdas - 1) * log_sum - counts / 2 * np.log(var(yeo_johnson(values, lambdas), axis=0))
+
+        return signed_log_likelihood
+
+    @staticmethod
+    def _power_lambdas(values: np.ndarray, method: str = "box-cox") -> np.ndarray:
+        """
+        Estimate the Box-Cox or Yeo-Johnson lambda of every column of a 2-D array by maximum likelihood,
+        like `scipy.stats.boxcox` and `scipy.stats.yeojohnson`.
+
+        Instead of one scalar optimization per column, a golden-section search runs on all columns at once,
+        evaluating the log-likelihood of every column at its own lambda in each vectorized iteration.
+        Columns whose optimum lies on the bounds of the search are estimated again with scipy.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features) with variance;
+                positive for Box-Cox.
+            method (str): "box-cox" or "yeo-johnson". Defaults to "box-cox".
+
+        Returns:
+            np.ndarray: The lambda of every column.
+        """
+        log_likelihood = PreprocessingMixin._power_log_likelihood(values, method)
+
+        def objective(lambdas: np.ndarray) -> np.ndarray:
+            with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+                result = log_likelihood(lambdas)
+            # Overflowing or degenerate transformations are never the optimum
+            return np.where(np.isfinite(result), result, -np.inf)
+
+        ratio = (np.sqrt(5) - 1) / 2
+        n_iterations = int(np.ceil(np.log(POWER_LAMBDA_TOL / (2 * POWER_LAMBDA_BOUND)) / np.log(ratio)))
+        lower = np.full(values.shape[1], -POWER_LAMBDA_BOUND)
+        upper = np.full(values.shape[1], POWER_LAMBDA_BOUND)
+        inner_lower = upper - ratio * (upper - lower)
+        inner_upper = lower + ratio * (upper - lower)
+        f_lower, f_upper = objective(inner_lower), objective(inner_upper)
+        for _ in range(n_iterations):
+            # The maximum is in [lower, inner_upper] or [inner_lower, upper]; one inner point is reused
+            left = f_lower >= f_upper
+            upper = np.where(left, inner_upper, upper)
+            lower = np.where(left, lower, inner_lower)
+            new_lower = np.where(left, upper - ratio * (upper - lower), inner_upper)
+            new_upper = np.where(left, inner_lower, lower + ratio * (upper - lower))
+            f_new = objective(np.where(left, new_lower, new_upper))
+            f_lower, f_upper = np.where(left, f_new, f_upper), np.where(left, f_lower, f_new)
+            inner_lower, inner_upper = new_lower, new_upper
+
+        lambdas = (lower + upper) / 2
+        estimate = stats.boxcox if method == "box-cox" else stats.yeojohnson
+        for position in np.flatnonzero(np.abs(lambdas) >= POWER_LAMBDA_BOUND - POWER_LAMBDA_TOL):
+            column = values[:, position]
+            lambdas[position] = estimate(column[~np.isnan(column)])[1]
+        return lambdas
+
+    @staticmethod
+    def _power_transform_chunk(chunk: np.ndarray, variable: np.ndarray, method: str = "box-cox") -> np.ndarray:
+        """
+        Apply the Box-Cox or Yeo-Johnson transformation in place to the columns of a chunk with variance,
+        estimating one lambda per column.
+
+        Args:
+            chunk (np.ndarray): 2-D array of numerical values (samples x features), transformed in place.
+            variable (np.ndarray): Whether every column has variance and is transformed.
+            method (str): "box-cox" or "yeo-johnson". Defaults to "box-cox".
+
+        Returns:
+            np.ndarray: The lambda of every column of the chunk; NaN for columns without variance.
+        """
+        lambdas = np.full(chunk.shape[1], np.nan)
+        positions = np.flatnonzero(variable)
+        values = chunk[:, positions].astype(np.float64, copy=False)
+        lambdas[positions] = PreprocessingMixin._power_lambdas(values, method)
+        if method == "box-cox":
+            special.boxcox(values, lambdas[positions], out=values)
+        else:
+            values = yeo_johnson(values, lambdas[positions])
+        chunk[:, positions] = values
+        return lambdas
+
+    @staticmethod
+    def _transform_shifts(minimums: np.ndarray, method: str) -> np.ndarray:
+        """
+        Compute the shift bringing features into the domain of a transformation.
+
+        Box-Cox and log2 need positive values: features with a minimum at or below 0 are shifted to a minimum
+        of 1. log1p and sqrt need non-negative values: features with a negative minimum are shifted to 0.
+        Yeo-Johnson and asinh are defined for all values and are never shifted.
+
+        Args:
+            minimums (np.ndarray): The minimum of every feature (or the minimum of all features, repeated).
+            method (str): The transformation method.
+
+        Returns:
+            np.ndarray: The shift added to every feature.
+        """
+        with np.errstate(invalid="ignore"):
+            if method in ("box-cox", "log2"):
+                return np.where(minimums <= 0, 1 - minimums, 0.0)
+            if method in ("log1p", "sqrt"):
+                return np.where(minimums < 0, -minimums, 0.0)
+        return np.zeros(len(minimums))
+
+    def _transform_chunks(self: T, transform: Callable[[slice, np.ndarray], None]) -> None:
+        """
+        Apply a transformation in place to chunks of `TRANSFORM_CHUNK_SIZE` numerical features, spread over
+        `n_workers` threads.
+
+        Numeric matrix chunks are transformed as views of the matrix. DataFrame chunks are copied to a float
+        array one at a time per worker and written back into the DataFrame's own memory, integer features of
+        the chunk being converted to float features first, so the transformation needs a bounded number of
+        chunks of additional memory however many features there are.
+
+        Args:
+            transform (Callable[[slice, np.ndarray], None]): Transforms the values of the given features in place.
+        """
+        data_numerical = self.data_numerical
+        if data_numerical is None:
+            return
+        lock = threading.Lock()
+
+        def transform_chunk(start: int) -> None:
+            columns = slice(start, start + TRANSFORM_CHUNK_SIZE)
+            if isinstance(data_numerical, NumericMatrix):
+                transform(columns, data_numerical.values[:, columns])
+                return
+            with lock:
+                dtypes = data_numerical.dtypes.iloc[columns]
+                floats = [dtype for dtype in dtypes if pd.api.types.is_float_dtype(dtype)]
+                dtype = np.result_type(self.float_dtype, *floats)
+                chunk = data_numerical.iloc[:, columns].to_numpy(dtype=dtype, copy=True)
+            transform(columns, chunk)
+            with lock:
+                # Integer features of the chunk become float features, and every feature keeps its float dtype
+                for position in start + np.flatnonzero([pd.api.types.is_integer_dtype(dtype) for dtype in dtypes]):
+                    data_numerical.isetitem(position, data_numerical.iloc[:, position].astype(self.float_dtype))
+                targets = data_numerical.dtypes.iloc[columns]
+                for dtype in targets.unique():
+                    positions = np.flatnonzero(targets == dtype)
+                    values = chunk if len(positions) == chunk.shape[1] else chunk[:, positions]
+                    data_numerical.iloc[:, start + positions] = values.astype(dtype, copy=False)
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            list(executor.map(transform_chunk, range(0, data_numerical.shape[1], TRANSFORM_CHUNK_SIZE)))
 
     @report_step(snapshot="numerical")
     def transform_numerical_features(self: T, method: str = "box-cox") -> None:
         """
-        Transform numerical features using the specified method.
+        Transform numerical features in place using the specified method.
+
+        Features without variance are left untransformed. Features are first shifted into the domain of the
+        transformation (see `_transform_shifts`), all by the same amount computed from the minimum of the
+        dataset, or each by its own amount if `transform_shift` is "per_column" in the metadata. Box-Cox and
+        Yeo-Johnson lambdas are estimated for all features of a chunk at once (see `_power_lambdas`); the other
+        methods are NumPy ufuncs writing into the chunk. The shifts, the transformed features and the lambdas
+        are stored in the transform state and applied to the test set. A sparse matrix keeps its zeros implicit
+        if the method maps 0 to 0 and no shift is needed (log1p and sqrt of non-negative values, and asinh), and
+        is converted to a dense one otherwise.
 
         Args:
-            method (str): The transformation method to use ("box-cox" or "log2").
+            method (str): The transformation method to use ("box-cox", "yeo-johnson", "log2", "log1p",
+                "asinh" or "sqrt").
 
         Raises:
             ValueError: If the transformation method is unsupported.
         """
-        min_val = self.data_numerical.min().min()
-        if min_val <= 0:
-            shift = abs(min_val) + 1
-            self.data_numerical += shift
-
-        if method == "box-cox":
-            self.data_numerical = pd.DataFrame(
-                self.data_numerical.apply(lambda col: boxcox(col)[0] if col.var() > 0 else col),
-                columns=self.data_numerical.columns,
-                index=self.data_numerical.index,
-            )
-        elif method == "log2":
-            self.data_numerical = self.data_numerical.apply(
-                lambda col: np.log2(col) if col.var() > 0 else col
-            )
-        else:
+        if method not in ("box-cox", "yeo-johnson") and method not in ELEMENTWISE_TRANSFORMS:
             raise ValueError(f"Unsupported transformation method: {method}")
+        if self.data_numerical is None or self.data_numerical.empty:
+            return
+
+        minimums = np.concatenate([np.fmin.reduce(block, axis=0) for _, block in self._numerical_blocks()])
+        if self.metadata.get("transform_shift", "global") == "global":
+            minimums = np.full(len(minimums), np.fmin.reduce(minimums))
+        shifts = PreprocessingMixin._transform_shifts(minimums, method)
+        transformed = np.zeros(len(shifts), dtype=bool)
+        lambdas = np.full(len(shifts), np.nan)
+
+        if isinstance(self.data_numerical, SparseMatrix):
+            if method in ZERO_PRESERVING_TRANSFORMS and not shifts.any():
+                matrix = self.data_numerical
+                transformed[:] = np.concatenate([
+                    np.nanvar(block, axis=0, ddof=1) > 0 for _, block in self._numerical_blocks()
+                ])
+                data = matrix.values.data
+                ELEMENTWISE_TRANSFORMS[method](data, out=data, where=transformed[matrix.stored_columns()])
+                self._record_fit(FittedStep("transform_numerical_features", method, {
+                    "features": matrix.columns.tolist(), "shift": shifts, "transformed": transformed, "lambdas": lambdas
+                }))
+                return
+            self._densify(f"Method '{method}' does not keep zeros at 0")
+
+        def transform(columns: slice, chunk: np.ndarray) -> None:
+            chunk += shifts[columns].astype(chunk.dtype)
+            variable = np.nanvar(chunk, axis=0, ddof=1) > 0
+            transformed[columns] = variable
+            if method in ELEMENTWISE_TRANSFORMS:
+                ELEMENTWISE_TRANSFORMS[method](chunk, out=chunk, where=variable)
+            else:
+                lambdas[columns] = PreprocessingMixin._power_transform_chunk(chunk, variable, method)
+
+        self._transform_chunks(transform)
+        self._record_fit(FittedStep("transform_numerical_features", method, {
+            "features": self.data_numerical.columns.tolist(),
+            "shift": shifts,
+            "transformed": transformed,
+            "lambdas": lambdas
+        }))
+
+    def _sample_batches(self: T, batch_size: int) -> Iterator[np.ndarray]:
+        """
+        Iterate over consecutive batches of samples of the numerical features.
+
+        Args:
+            batch_size (int): Minimum number of samples in a batch; all samples form one batch if there are fewer.
 
-    def _run_pca(self: T) -> Optional[Dict[str, np.ndarray]]:
+        Yields:
+            np.ndarray: The values of the samples of the batch as a float array (samples x features).
+        """
+        data_numerical = self.data_numerical
+        if data_numerical is None:
+            return
+        n_samples = data_numerical.shape[0]
+        for positions in np.array_split(np.arange(n_samples), max(1, n_samples // batch_size)):
+            rows = slice(positions[0], positions[-1] + 1)
+            if isinstance(data_numerical, NumericMatrix):
+                yield data_numerical.values[rows]
+            else:
+                yield data_numerical.iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _run_pca(self: T, method: str = "full") -> Optional[Dict[str, np.ndarray]]:
         """
         Perform Principal Component Analysis (PCA) on numerical features.
 
+        `pca_components` in the metadata gives the number of components, or the fraction of variance they must
+        explain. "full" computes an exact SVD, of all components unless a number is given. "randomized" computes
+        the leading components with a randomized SVD, and "incremental" fits them batch by batch of samples, so
+        only one batch is copied at a time; both compute `PCA_DEFAULT_COMPONENTS` components unless a number is
+        given. With a fraction of variance, only the first components explaining it are kept. At least two
+        components are computed for the PCA plot, and samples are projected on the kept components batch by batch.
+        A sparse matrix is decomposed with a truncated SVD of its uncentered values whatever the method, as
+        centering would fill in the zeros; it also computes `PCA_DEFAULT_COMPONENTS` components unless a number
+        is given.
+
+        Args:
+            method (str): PCA method ("full", "randomized" or "incremental").
+
         Returns:
             Optional[Dict[str, np.ndarray]]: A dictionary containing PCA results and explained variance metrics,
             or None if there are no numerical features.
+
+        Raises:
+            ValueError: If the method is not supported.
         """
-        if self.data_numerical.empty:
+        if method not in ("full", "randomized", "incremental"):
+            raise ValueError(f"Unsupported PCA method: {method}")
+
+        if self.data_numerical is None or self.data_numerical.empty:
             return None
 
-        pca = PCA()
-        pca.fit(self.data_numerical)
-        pca_data = pca.transform(self.data_numerical)
+        sparse = isinstance(self.data_numerical, SparseMatrix)
+        data_numerical = self.data_numerical
+        if isinstance(data_numerical, NumericMatrix):
+            data_numerical = data_numerical.values
 
-        per_var = np.round(pca.explained_variance_ratio_ * 100, decimals=1)
-        cumulative_var = np.cumsum(pca.explained_variance_ratio_) * 100
+        max_components = min(data_numerical.shape)
+        components = self.metadata.get("pca_components")
+        if components is not None and components >= 1:
+            n_components = components
+        else:
+            n_components = max_components if method == "full" and not sparse else PCA_DEFAULT_COMPONENTS
+        n_components = min(max(n_components, 2), max_components)
+
+        if sparse:
+            pca = TruncatedSVD(n_components=n_components, random_state=42)
+            pca.fit(data_numerical)
+        elif method == "incremental":
+            pca = IncrementalPCA(n_components=n_components)
+            # Every batch holds at least as many samples as components, as IncrementalPCA requires
+            for batch in self._sample_batches(max(PCA_BATCH_SIZE, n_components)):
+                pca.partial_fit(batch)
+        else:
+            pca = PCA(n_components=n_components, svd_solver=method, random_state=42)
+            pca.fit(data_numerical)
+
+        explained_ratio = pca.explained_variance_ratio_
+        if components is not None and components < 1:
+            reached = np.cumsum(explained_ratio) >= components
+            if reached.any():
+                explained_ratio = explained_ratio[:max(int(np.argmax(reached)) + 1, min(2, n_components))]
+            else:
+                click.echo(
+                    f"The {n_components} principal components computed explain {explained_ratio.sum():.1%} "
+                    f"of the variance, less than the {components:.1%} requested by pca_components."
+                )
+
+        kept = pca.components_[:len(explained_ratio)]
+        if sparse:
+            pca_data = data_numerical @ kept.T
+        else:
+            pca_data = np.vstack([(batch - pca.mean_) @ kept.T for batch in self._sample_batches(PCA_BATCH_SIZE)])
+
+        per_var = np.round(explained_ratio * 100, decimals=1)
+        cumulative_var = np.cumsum(explained_ratio) * 100
 
         return {
             "pca_data": pca_data,
@@ -110,14 +684,17 @@ class PreprocessingMixin:
         }
 
     @report_step(output=True)
-    def dimensionality_reduction(self: T) -> Optional[Dict[str, any]]:
+    def dimensionality_reduction(self: T, method: str = "full") -> Optional[Dict[str, Any]]:
         """
         Apply dimensionality reduction using PCA and generate relevant visualizations.
 
+        Args:
+            method (str): PCA method ("full", "randomized" or "incremental", see `_run_pca`).
+
         Returns:
-            Optional[Dict[str, any]]: A dictionary containing PCA data, explained variance plot, and PCA plot.
+            Optional[Dict[str, Any]]: A dictionary containing PCA data, explained variance plot, and PCA plot.
         """
-        result = self._run_pca()
+        result = self._run_pca(method)
 
         if result is None:
             return None
@@ -134,7 +711,7 @@ class PreprocessingMixin:
             columns=columns
         )
 
-        pca_plot = self._pca_plot(df_pca, per_var) if hasattr(self, '_pca_plot') else None
+        pca_plot = self._pca_plot(df_pca, per_var) if hasattr(self, '_pca_plot') and n_components >= 2 else None
 
         return {
             "pca_data": df_pca,
@@ -1,176 +1,1376 @@
+from concurrent.futures import ThreadPoolExecutor
+import click
 import numpy as np
 import pandas as pd
+from qcp_omics.models.missingness import MissingnessProfile
+from qcp_omics.models.numeric_matrix import NumericMatrix
+from qcp_omics.models.outliers import OutlierCoo
+from qcp_omics.models.sparse_matrix import SparseMatrix
+from qcp_omics.models.streaming_profile import StreamingProfile
+from qcp_omics.models.transform_state import FittedStep
 from qcp_omics.report_generation.report_step import report_step
-from typing import TypeVar, Any, Dict, List, Tuple
+from typing import TypeVar, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from qcp_omics.utils.protocols import HasData
-from sklearn.impute import SimpleImputer
 
 T = TypeVar("T", bound=HasData)
 
+# Columns of a DataFrame converted to a missingness mask at once
+MISSINGNESS_CHUNK_SIZE: int = 1024
+
+# Number of samples and of missingness patterns listed in the report
+MISSINGNESS_REPORT_SAMPLES: int = 20
+MISSINGNESS_REPORT_PATTERNS: int = 10
+
+# Samples processed at once by per-sample QC metrics
+SAMPLE_QC_CHUNK_SIZE: int = 4096
+
+# Number of flagged samples listed in the report
+SAMPLE_QC_REPORT_SAMPLES: int = 20
+
+# Columns hashed at once when looking for duplicates
+DUPLICATE_CHUNK_SIZE: int = 1024
+
+# Near-duplicates are found by locality-sensitive hashing: values are quantized to bins of
+# DUPLICATE_RESOLUTION standard deviations, and only samples (or features) sharing the hash of
+# at least DUPLICATE_MIN_BANDS of DUPLICATE_BANDS random bands of quantized values are compared.
+# Bands hold at least DUPLICATE_BAND_SIZE values, more for data with few distinct values
+DUPLICATE_RESOLUTION: float = 1.0
+DUPLICATE_BANDS: int = 64
+DUPLICATE_MIN_BANDS: int = 2
+DUPLICATE_BAND_SIZE: int = 8
+
+# Larger buckets of a band are ignored, e.g. bands of zeros shared by most samples of sparse data
+DUPLICATE_MAX_BUCKET: int = 32
+
+# Minimum correlation of near-duplicate samples or features
+DUPLICATE_MIN_CORRELATION: float = 0.99
+
+# Pairs of candidate near-duplicates compared at once
+DUPLICATE_PAIR_CHUNK_SIZE: int = 256
+
+# Number of duplicate groups and of near-duplicate pairs listed in the report
+DUPLICATE_REPORT_ITEMS: int = 20
+
+# Columns imputed at once when filling missing values of a DataFrame
+IMPUTE_CHUNK_SIZE: int = 256
+
+# Samples processed at once by KNN imputation
+KNN_BLOCK_SIZE: int = 256
+
+# Minimum number of nearest samples searched for donors before looking at all samples
+KNN_MIN_CANDIDATES: int = 32
+
+# Columns processed at once by outlier detection
+OUTLIER_CHUNK_SIZE: int = 1024
+
+# Default thresholds of the z-score (standard score) and MAD (modified z-score) methods
+OUTLIER_THRESHOLDS: Dict[str, float] = {"zscore": 3.0, "mad": 3.5}
+
+# Number of features, and of outliers per feature, listed in the report
+OUTLIER_REPORT_FEATURES: int = 20
+OUTLIER_REPORT_EXAMPLES: int = 5
+
 class QCMixin:
     """
     A mixin class providing methods for quality control operations on a dataset.
     Includes functionality for handling missing values, imputing data, and detecting outliers.
     """
+    # Attributes the steps assign, with the types declared by `HasData`
+    data_numerical: Optional[Union[pd.DataFrame, NumericMatrix]]
+    missingness: Optional[MissingnessProfile]
+    outliers: Optional[OutlierCoo]
+
+    def _missingness_blocks(self: T) -> Iterator[np.ndarray]:
+        """
+        Iterate over boolean missingness masks of column blocks of the dataset, including the numeric
+        matrix if there is one.
+
+        Yields:
+            np.ndarray: Mask of one block of columns (samples x columns), True where a value is missing.
+        """
+        for start in range(0, self.data.shape[1], MISSINGNESS_CHUNK_SIZE):
+            yield self.data.iloc[:, start:start + MISSINGNESS_CHUNK_SIZE].isna().to_numpy()
+        if isinstance(self.data_numerical, NumericMatrix):
+            for _, block in self.data_numerical.blocks():
+                yield np.isnan(block)
+
+    def _missingness_profile(self: T) -> MissingnessProfile:
+        """
+        Return the missingness profile of the dataset, computing it only if the dataset changed
+        since it was last computed.
+
+        Steps that fill or drop values reset `self.missingness`; a profile whose samples or features
+        do not match the dataset anymore is computed again as well.
+
+        Returns:
+            MissingnessProfile: The missingness profile of the dataset.
+        """
+        features = self.data.columns
+        if isinstance(self.data_numerical, NumericMatrix):
+            features = features.append(self.data_numerical.columns)
+        if self.missingness is None or not self.missingness.matches(self.data.index, features):
+            self.missingness = MissingnessProfile.from_blocks(self._missingness_blocks(), self.data.index, features)
+        return self.missingness
+
+    def _missing_values(self: T) -> Dict[str, float]:
+        """
+        Identify missing values across the dataset, including the numeric matrix if there is one.
+
+        Returns:
+            Dict[str, float]: A dictionary of column names and their respective missing value percentages,
+            sorted in descending order.
+        """
+        rates = self._missingness_profile().feature_rates
+        rates = rates[rates > 0].sort_values(ascending=False, kind="stable")
+        return rates.to_dict()
+
+    def _sample_chunks(self: T) -> Iterator[np.ndarray]:
+        """
+        Iterate over chunks of samples of the numerical features, from the numeric matrix if there is one.
+
+        Yields:
+            np.ndarray: Values of `SAMPLE_QC_CHUNK_SIZE` consecutive samples (samples x numerical features).
+        """
+        matrix = self.data_numerical
+        if isinstance(matrix, NumericMatrix):
+            for start in range(0, matrix.shape[0], SAMPLE_QC_CHUNK_SIZE):
+                if isinstance(matrix, SparseMatrix):
+                    yield matrix.values[start:start + SAMPLE_QC_CHUNK_SIZE].toarray()
+                else:
+                    yield matrix.values[start:start + SAMPLE_QC_CHUNK_SIZE]
+            return
+
+        numerical = self.data.select_dtypes(include="number")
+        for start in range(0, len(numerical.index), SAMPLE_QC_CHUNK_SIZE):
+            yield numerical.iloc[start:start + SAMPLE_QC_CHUNK_SIZE].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _sample_metrics(self: T) -> pd.DataFrame:
+        """
+        Compute QC metrics of every sample over the numerical features, one chunk of samples at a time.
+
+        Returns:
+            pd.DataFrame: Total signal (sum of values, e.g. library size), detection rate (percentage of
+            features with a positive value) and missing values (percentage of features) of every sample.
+        """
+        n_features = 0
+        chunk_metrics = []
+        for chunk in self._sample_chunks():
+            n_features = chunk.shape[1]
+            chunk_metrics.append(np.column_stack([
+                np.nansum(chunk, axis=1, dtype=np.float64),
+                np.count_nonzero(chunk > 0, axis=1),
+                np.count_nonzero(np.isnan(chunk), axis=1),
+            ]))
+
+        metrics = np.vstack(chunk_metrics) if chunk_metrics else np.empty((0, 3))
+        metrics[:, 1:] *= 100 / max(n_features, 1)
+        return pd.DataFrame(metrics, index=self.data.index, columns=["total_signal", "detection_rate", "missing"])
 
     @staticmethod
-    def _identify_missing_values(df: pd.DataFrame) -> Dict[str, float]:
+    def _mad_bounds(values: np.ndarray, threshold: float = 3.5) -> Tuple[float, float, float, float]:
         """
-        Identify columns with missing values and calculate the percentage of missing data.
+        Compute the range of values whose modified z-score 0.6745 * (x - median) / MAD is within the threshold.
+
+        Values that are all non-negative (e.g. counts) are compared on a log1p scale, where their
+        distribution across samples is closer to symmetric.
 
         Args:
-            df (pd.DataFrame): The DataFrame to analyze.
+            values (np.ndarray): Values of one metric for every sample.
+            threshold (float): The modified z-score threshold. Defaults to 3.5.
 
         Returns:
-            Dict[str, float]: A dictionary of column names and their respective missing value percentages.
+            Tuple[float, float, float, float]: The median, MAD and lower and upper bounds, on the scale
+            of `values`. Bounds are infinite if the MAD is 0.
         """
-        missing_values = df.isnull().mean() * 100
-        filtered_missing = {col: pct for col, pct in missing_values.items() if pct > 0}
-        return dict(sorted(filtered_missing.items(), key=lambda item: item[1], reverse=True))
+        log_scale = len(values) > 0 and np.nanmin(values) >= 0
+        scaled = np.log1p(values) if log_scale else values
+        median = QCMixin._nan_quantiles(scaled[:, np.newaxis], [0.5])[0, 0]
+        mad = QCMixin._nan_quantiles(np.abs(scaled - median)[:, np.newaxis], [0.5])[0, 0]
+        if not mad > 0:
+            lower, upper = -np.inf, np.inf
+        else:
+            lower, upper = median - threshold * mad / 0.6745, median + threshold * mad / 0.6745
+        if log_scale:
+            median, lower, upper = np.expm1([median, lower, upper])
+            mad = QCMixin._nan_quantiles(np.abs(values - median)[:, np.newaxis], [0.5])[0, 0]
+        return float(median), float(mad), float(lower), float(upper)
 
-    def _impute_mean(self: T) -> None:
+    @staticmethod
+    def _hash_values(values: np.ndarray) -> np.ndarray:
         """
-        Impute missing values in numerical columns with the mean.
+        Hash every value of a numerical array with pandas' vectorized hash.
+
+        Values are hashed as float64, so equal integers and floats, 0.0 and -0.0, and all NaNs hash equal.
+
+        Args:
+            values (np.ndarray): Numerical array.
+
+        Returns:
+            np.ndarray: uint64 hashes with the shape of `values`.
         """
-        imputer = SimpleImputer(strategy="mean")
-        data_numerical = self.data.select_dtypes(include=["float", "int"])
-        if data_numerical.empty:
-            return
+        values = np.asarray(values, dtype=np.float64)
+        values = np.where(np.isnan(values), np.nan, values + 0.0)
+        return pd.util.hash_array(values.ravel()).reshape(values.shape)
+
+    @staticmethod
+    def _position_keys(n: int, seed: int) -> np.ndarray:
+        """
+        Draw a random odd 64-bit key for every position, to combine value hashes into an order-dependent hash.
+
+        Args:
+            n (int): Number of positions.
+            seed (int): Seed of the random generator.
+
+        Returns:
+            np.ndarray: uint64 keys.
+        """
+        keys = np.random.default_rng(seed).integers(0, 2 ** 63, size=n, dtype=np.uint64)
+        return keys * np.uint64(2) + np.uint64(1)
+
+    @staticmethod
+    def _hash_groups(hashes: np.ndarray) -> List[np.ndarray]:
+        """
+        Group the positions of equal hashes.
+
+        Args:
+            hashes (np.ndarray): Hash of every item.
+
+        Returns:
+            List[np.ndarray]: Positions of the items of every hash shared by several items, in
+            increasing order, ordered by first position.
+        """
+        order = np.argsort(hashes, kind="stable")
+        sorted_hashes = hashes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]])
+        stops = np.r_[starts[1:], len(hashes)]
+        shared = stops - starts > 1
+        groups = [order[start:stop] for start, stop in zip(starts[shared], stops[shared])]
+        return sorted(groups, key=lambda group: group[0])
+
+    @staticmethod
+    def _same_values(x: np.ndarray, y: np.ndarray) -> bool:
+        """
+        Check whether two 1-D arrays hold the same values, missing values included.
+        """
+        missing_x = pd.isna(x)
+        missing_y = pd.isna(y)
+        return bool(np.array_equal(missing_x, missing_y) and (x[~missing_x] == y[~missing_y]).all())
+
+    @staticmethod
+    def _confirmed_groups(candidates: List[np.ndarray], values: Callable[[int], np.ndarray]) -> List[np.ndarray]:
+        """
+        Split groups of items sharing a hash into groups of items with the same values, so hash
+        collisions are never reported as duplicates.
+
+        Args:
+            candidates (List[np.ndarray]): Positions of the items sharing every hash.
+            values (Callable[[int], np.ndarray]): Returns the values of the item at a position.
+
+        Returns:
+            List[np.ndarray]: Positions of every group of at least two identical items.
+        """
+        groups = []
+        for candidate in candidates:
+            remaining = list(candidate)
+            while len(remaining) > 1:
+                first = values(remaining[0])
+                same = [QCMixin._same_values(first, values(position)) for position in remaining[1:]]
+                group = [remaining[0]] + [position for position, equal in zip(remaining[1:], same) if equal]
+                if len(group) > 1:
+                    groups.append(np.array(group))
+                remaining = [position for position, equal in zip(remaining[1:], same) if not equal]
+        return sorted(groups, key=lambda group: group[0])
+
+    def _value_hash_blocks(self: T) -> Iterator[np.ndarray]:
+        """
+        Iterate over the hashes of the values of column blocks of the dataset, including the numeric
+        matrix if there is one.
+
+        Yields:
+            np.ndarray: uint64 hashes of one block of columns (samples x columns).
+        """
+        for start in range(0, self.data.shape[1], DUPLICATE_CHUNK_SIZE):
+            block = self.data.iloc[:, start:start + DUPLICATE_CHUNK_SIZE]
+            numerical = block.columns.isin(block.select_dtypes(include="number").columns)
+            hashes = np.empty(block.shape, dtype=np.uint64)
+            if numerical.any():
+                hashes[:, numerical] = QCMixin._hash_values(
+                    block.iloc[:, numerical].to_numpy(dtype=np.float64, na_value=np.nan)
+                )
+            for position in np.flatnonzero(~numerical):
+                hashes[:, position] = pd.util.hash_pandas_object(block.iloc[:, position], index=False).to_numpy()
+            yield hashes
+        if isinstance(self.data_numerical, NumericMatrix):
+            for _, block in self.data_numerical.blocks():
+                yield QCMixin._hash_values(block)
+
+    def _exact_duplicates(self: T) -> Tuple[List[np.ndarray], List[np.ndarray], pd.Index]:
+        """
+        Find groups of identical samples and of identical features by hashing rows and columns.
+
+        Every value is hashed once, one block of columns at a time. The hash of a sample (row) or
+        feature (column) is the sum of the hashes of its values multiplied by random odd keys of
+        their positions, modulo 2^64, so only items sharing a hash are compared.
+
+        Returns:
+            Tuple[List[np.ndarray], List[np.ndarray], pd.Index]: Row positions of every group of duplicate
+            samples, column positions of every group of duplicate features, and all features (the
+            columns of the dataset followed by the numeric matrix), in which the column positions are.
+        """
+        n_samples = len(self.data.index)
+        matrix = self.data_numerical if isinstance(self.data_numerical, NumericMatrix) else None
+        n_features = self.data.shape[1] + (matrix.shape[1] if matrix is not None else 0)
+        feature_keys = QCMixin._position_keys(n_features, seed=0)
+        sample_keys = QCMixin._position_keys(n_samples, seed=1)[:, np.newaxis]
+
+        sample_hashes = np.zeros(n_samples, dtype=np.uint64)
+        feature_hashes = np.zeros(n_features, dtype=np.uint64)
+        offset = 0
+        for hashes in self._value_hash_blocks():
+            positions = slice(offset, offset + hashes.shape[1])
+            sample_hashes += (hashes * feature_keys[positions]).sum(axis=1, dtype=np.uint64)
+            feature_hashes[positions] = (hashes * sample_keys).sum(axis=0, dtype=np.uint64)
+            offset += hashes.shape[1]
+
+        def sample_values(position: int) -> np.ndarray:
+            row = self.data.iloc[position].to_numpy()
+            return np.concatenate([row, matrix.values[position]]) if matrix is not None else row
+
+        def feature_values(position: int) -> np.ndarray:
+            if matrix is None or position < self.data.shape[1]:
+                return self.data.iloc[:, position].to_numpy()
+            return matrix.values[:, position - self.data.shape[1]]
+
+        features = self.data.columns.append(matrix.columns) if matrix is not None else self.data.columns
+        return (
+            QCMixin._confirmed_groups(QCMixin._hash_groups(sample_hashes), sample_values),
+            QCMixin._confirmed_groups(QCMixin._hash_groups(feature_hashes), feature_values),
+            features
+        )
+
+    @staticmethod
+    def _band_candidates(quantized: np.ndarray, n_bands: int, min_bands: int = 1) -> np.ndarray:
+        """
+        Find the pairs of items sharing the hash of bands of quantized values.
+
+        Buckets of more than `DUPLICATE_MAX_BUCKET` items are ignored.
+
+        Args:
+            quantized (np.ndarray): 2-D integer array (items x values), the values of every band in
+                consecutive columns.
+            n_bands (int): Number of bands.
+            min_bands (int): Minimum number of bands whose hash a pair shares. Defaults to 1.
+
+        Returns:
+            np.ndarray: Candidate pairs (n_pairs x 2) of item positions, lower position first.
+        """
+        n_items = quantized.shape[0]
+        hashes = pd.util.hash_array(quantized.ravel()).reshape(n_items, n_bands, -1)
+        band_hashes = (hashes * QCMixin._position_keys(hashes.shape[2], seed=2)).sum(axis=2, dtype=np.uint64)
+
+        bands = np.tile(np.arange(n_bands), n_items)
+        items = np.repeat(np.arange(n_items), n_bands)
+        band_hashes = band_hashes.ravel()
+        order = np.lexsort((items, band_hashes, bands))
+        bands, band_hashes, items = bands[order], band_hashes[order], items[order]
+        starts = np.flatnonzero(np.r_[
+            True, (band_hashes[1:] != band_hashes[:-1]) | (bands[1:] != bands[:-1])
+        ])
+        sizes = np.diff(np.r_[starts, len(items)])
+
+        # Buckets of the same size are expanded into pairs at once, encoded as first * n_items + second
+        bucket_codes = [np.empty(0, dtype=np.int64)]
+        for size in np.unique(sizes[(sizes > 1) & (sizes <= DUPLICATE_MAX_BUCKET)]):
+            buckets = items[starts[sizes == size][:, np.newaxis] + np.arange(size)]
+            first, second = np.triu_indices(size, k=1)
+            bucket_codes.append((buckets[:, first] * n_items + buckets[:, second]).ravel())
+        codes, counts = np.unique(np.concatenate(bucket_codes), return_counts=True)
+        codes = codes[counts >= min_bands]
+        return np.column_stack([codes // n_items, codes % n_items])
+
+    @staticmethod
+    def _pair_correlations(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Compute the Pearson correlation of every row of `x` with the same row of `y`, over the
+        coordinates present in both.
+
+        Args:
+            x (np.ndarray): 2-D array of shape (n_pairs, n_values).
+            y (np.ndarray): 2-D array of shape (n_pairs, n_values).
+
+        Returns:
+            np.ndarray: Correlation of every pair; NaN if either row is constant.
+        """
+        present = ~(np.isnan(x) | np.isnan(y))
+        count = np.maximum(present.sum(axis=1, keepdims=True), 1)
+        x = np.where(present, x, 0)
+        y = np.where(present, y, 0)
+        x = np.where(present, x - x.sum(axis=1, keepdims=True) / count, 0)
+        y = np.where(present, y - y.sum(axis=1, keepdims=True) / count, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+
+    def _near_duplicates(self: T, exclude: np.ndarray, by_samples: bool) -> List[Tuple[Any, Any, float]]:
+        """
+        Find near-duplicate samples or features by locality-sensitive hashing of standardized values.
+
+        Numerical features are standardized and quantized to bins of `DUPLICATE_RESOLUTION` standard
+        deviations, with a random offset per band. Every band hashes the values of random features
+        (to compare samples) or samples (to compare features); it holds enough values for two
+        unrelated items to share its hash with a probability of about one over the number of items,
+        estimated from how often single quantized values are equal. Only items sharing the hash of
+        at least `DUPLICATE_MIN_BANDS` bands are compared, so near-duplicates are found without
+        comparing all pairs.
+
+        Args:
+            exclude (np.ndarray): Boolean mask of the items to leave out, e.g. exact duplicates.
+            by_samples (bool): Compare samples if True, features otherwise.
+
+        Returns:
+            List[Tuple[Any, Any, float]]: The labels and correlation of every pair of near-duplicates
+            with a correlation of at least `DUPLICATE_MIN_CORRELATION`, most correlated first.
+        """
+        if isinstance(self.data_numerical, NumericMatrix):
+            numerical = self.data_numerical.to_frame()
+        else:
+            numerical = self.data.select_dtypes(include="number")
+        if by_samples:
+            labels, n_dims = numerical.index, numerical.shape[1]
+        else:
+            labels, n_dims = numerical.columns, numerical.shape[0]
+        if len(labels) < 2 or n_dims == 0:
+            return []
+
+        def quantize(dims: np.ndarray, offsets: Union[float, np.ndarray]) -> np.ndarray:
+            # Values of the items (rows) at the given dimensions, with features standardized over samples
+            unique_dims, inverse = np.unique(dims, return_inverse=True)
+            if by_samples:
+                values = numerical.iloc[:, unique_dims].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values = numerical.iloc[unique_dims].to_numpy(dtype=np.float64, na_value=np.nan).T
+            axis = 0 if by_samples else 1
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = (values - np.nanmean(values, axis=axis, keepdims=True)) / \
+                    np.nanstd(values, axis=axis, keepdims=True)
+            quantized = np.floor(values[:, inverse] / DUPLICATE_RESOLUTION + offsets)
+            return np.where(np.isfinite(quantized), quantized, np.iinfo(np.int64).min).astype(np.int64)
+
+        rng = np.random.default_rng(0)
+        probe = quantize(rng.choice(n_dims, min(n_dims, DUPLICATE_BANDS), replace=False), rng.random())
+        collision = np.mean([
+            np.sum((np.unique(column, return_counts=True)[1] / len(column)) ** 2) for column in probe.T
+        ])
+        band_size = n_dims
+        if collision < 1:
+            band_size = int(np.ceil(np.log(len(labels)) / -np.log(collision)))
+        band_size = min(max(band_size, DUPLICATE_BAND_SIZE), n_dims)
+
+        dims = np.concatenate([rng.choice(n_dims, band_size, replace=False) for _ in range(DUPLICATE_BANDS)])
+        quantized = quantize(dims, np.repeat(rng.random(DUPLICATE_BANDS), band_size))
+        pairs = QCMixin._band_candidates(quantized, DUPLICATE_BANDS, DUPLICATE_MIN_BANDS)
+        pairs = pairs[~(exclude[pairs[:, 0]] | exclude[pairs[:, 1]])]
+        if len(pairs) == 0:
+            return []
+
+        positions, pairs = np.unique(pairs, return_inverse=True)
+        pairs = pairs.reshape(-1, 2)
+        if by_samples:
+            means = np.empty(n_dims)
+            stds = np.empty(n_dims)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                for start in range(0, n_dims, DUPLICATE_CHUNK_SIZE):
+                    block = numerical.iloc[:, start:start + DUPLICATE_CHUNK_SIZE].to_numpy(
+                        dtype=np.float64, na_value=np.nan
+                    )
+                    means[start:start + block.shape[1]] = np.nanmean(block, axis=0)
+                    stds[start:start + block.shape[1]] = np.nanstd(block, axis=0)
+                values = (numerical.iloc[positions].to_numpy(dtype=np.float64, na_value=np.nan) - means) / stds
+            values[~np.isfinite(values)] = np.nan
+        else:
+            values = numerical.iloc[:, positions].to_numpy(dtype=np.float64, na_value=np.nan).T
+
+        correlations = np.concatenate([
+            QCMixin._pair_correlations(
+                values[pairs[start:start + DUPLICATE_PAIR_CHUNK_SIZE, 0]],
+                values[pairs[start:start + DUPLICATE_PAIR_CHUNK_SIZE, 1]]
+            )
+            for start in range(0, len(pairs), DUPLICATE_PAIR_CHUNK_SIZE)
+        ])
+        near = np.flatnonzero(correlations >= DUPLICATE_MIN_CORRELATION)
+        near = near[np.argsort(-correlations[near], kind="stable")]
+        return [
+            (labels[positions[pairs[i, 0]]], labels[positions[pairs[i, 1]]], float(correlations[i])) for i in near
+        ]
+
+    def _impute_numerical(self: T, columns: List[str], method: str = "mean") -> pd.Series:
+        """
+        Fill missing values of numerical columns in place.
+
+        Fill values are computed once per column, for every numerical feature so that new samples
+        can be filled the same way. DataFrame columns are processed in chunks of `IMPUTE_CHUNK_SIZE`
+        columns and numeric matrix blocks are filled in place, so at most one chunk of columns is
+        copied at a time. Fill values of a sparse matrix are computed from dense copies of its blocks
+        and only replace its stored missing values.
+
+        Args:
+            columns (List[str]): Numerical columns of `self.data` with missing values.
+            method (str): The fill value: "mean", "median", "mode", "constant" or "knn". Defaults to "mean".
+
+        Returns:
+            pd.Series: The fill value of every numerical feature.
+        """
+        if method == "knn":
+            return self._impute_knn(columns)
+
+        constant = self.metadata.get("imputation_constant", 0.0)
+        fills = []
+        if isinstance(self.data_numerical, SparseMatrix):
+            for block_columns, block in self.data_numerical.blocks():
+                fills.append(pd.Series(
+                    QCMixin._fill_values(block, method, constant), index=self.data_numerical.columns[block_columns]
+                ))
+            if fills:
+                self.data_numerical.fill_missing(pd.concat(fills).to_numpy())
+        elif isinstance(self.data_numerical, NumericMatrix):
+            for block_columns, block in self.data_numerical.blocks():
+                fill = QCMixin._fill_values(block, method, constant)
+                fills.append(pd.Series(fill, index=self.data_numerical.columns[block_columns]))
+                missing = np.isnan(block)
+                if missing.any():
+                    np.copyto(block, np.broadcast_to(fill.astype(block.dtype), block.shape), where=missing)
+
+        missing_columns = set(columns)
+        numerical = self.data.select_dtypes(include="number").columns
+        for start in range(0, len(numerical), IMPUTE_CHUNK_SIZE):
+            chunk = self.data[numerical[start:start + IMPUTE_CHUNK_SIZE]]
+            fill = QCMixin._fill_values(chunk.to_numpy(dtype=np.float64, na_value=np.nan), method, constant)
+            fills.append(pd.Series(fill, index=chunk.columns))
+            filled = [col for col in chunk.columns if col in missing_columns]
+            if filled:
+                # Fill values are cast to each column's dtype, so compact float32 columns are not upcast
+                self.data[filled] = chunk[filled].fillna(
+                    {col: chunk[col].dtype.type(value) for col, value in zip(chunk.columns, fill) if col in filled}
+                )
+        return pd.concat(fills) if fills else pd.Series(dtype=np.float64)
+
+    def _impute_knn(self: T, columns: List[str]) -> pd.Series:
+        """
+        Fill missing values of numerical columns with the mean of the `knn_neighbors` nearest samples
+        (5 by default) that have a value, using NaN-aware Euclidean distances over all numerical features.
+
+        Args:
+            columns (List[str]): Numerical columns of `self.data` with missing values.
+
+        Returns:
+            pd.Series: The mean of every numerical feature after imputation, which fills new samples
+            without searching the training samples again.
+        """
+        n_neighbors = self.metadata.get("knn_neighbors", 5)
+        self._densify("KNN imputation has no sparse implementation")
+        fills: List[pd.Series] = []
+        if isinstance(self.data_numerical, NumericMatrix):
+            self._knn_fill(self.data_numerical.values, n_neighbors)
+            fills.extend(
+                pd.Series(QCMixin._fill_values(block), index=self.data_numerical.columns[block_columns])
+                for block_columns, block in self.data_numerical.blocks()
+            )
+
+        data_numerical = self.data.select_dtypes(include="number")
+        values = data_numerical.to_numpy(dtype=np.float64, na_value=np.nan)
+        if columns:
+            self._knn_fill(values, n_neighbors)
+            positions = data_numerical.columns.get_indexer(columns)
+            self.data[columns] = pd.DataFrame(
+                values[:, positions], index=data_numerical.index, columns=columns
+            ).astype(data_numerical.dtypes[columns].to_dict())
+        fills.append(pd.Series(QCMixin._fill_values(values), index=data_numerical.columns))
+        return pd.concat(fills)
+
+    @staticmethod
+    def _nan_euclidean_distances(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Compute Euclidean distances between the rows of two arrays, ignoring NaN coordinates.
+
+        Squared distances over the coordinates present in both rows are computed with matrix
+        products and scaled up by the share of coordinates used, like sklearn's
+        `nan_euclidean_distances`.
+
+        Args:
+            x (np.ndarray): 2-D array of shape (n_x, n_features).
+            y (np.ndarray): 2-D array of shape (n_y, n_features).
+
+        Returns:
+            np.ndarray: Distances of shape (n_x, n_y); NaN for pairs without common coordinates.
+        """
+        present_x = ~np.isnan(x)
+        present_y = ~np.isnan(y)
+        x0 = np.where(present_x, x, 0)
+        y0 = np.where(present_y, y, 0)
+        present_x = present_x.astype(x0.dtype)
+        present_y = present_y.astype(y0.dtype)
 
-        imputed_values = imputer.fit_transform(data_numerical)
-        imputed_df = pd.DataFrame(imputed_values, columns=data_numerical.columns, index=data_numerical.index)
-        self.data[data_numerical.columns] = imputed_df.astype(data_numerical.dtypes)
+        squared = (x0 * x0) @ present_y.T
+        squared += present_x @ (y0 * y0).T
+        squared -= 2 * (x0 @ y0.T)
+        np.maximum(squared, 0, out=squared)
+        common = present_x @ present_y.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distances = np.sqrt(squared * (x.shape[1] / common))
+        distances[common == 0] = np.nan
+        return distances
 
-    def _impute_mode(self: T) -> None:
+    @staticmethod
+    def _knn_fill_block(
+            values: np.ndarray,
+            missing: np.ndarray,
+            rows: np.ndarray,
+            n_neighbors: int,
+            fallback: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Impute missing values in categorical columns with the most frequent value (mode).
+        Compute KNN fill values for the missing cells of a block of samples.
+
+        Distances from the block to all samples are computed in blocks of `KNN_BLOCK_SIZE` samples,
+        so memory stays bounded by the block size times the number of samples.
+
+        Args:
+            values (np.ndarray): 2-D array of all samples (samples x features), with NaN for missing values.
+            missing (np.ndarray): Boolean mask of the missing values of `values`.
+            rows (np.ndarray): Row positions of the samples of the block.
+            n_neighbors (int): Number of neighbours averaged.
+            fallback (np.ndarray): Fill value of every column for samples without a neighbour.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Row positions, column positions and fill values.
         """
-        imputer = SimpleImputer(strategy="most_frequent")
-        data_categorical = self.data.select_dtypes(include=["category"])
-        if data_categorical.empty:
+        block = values[rows]
+        distances = np.empty((len(rows), values.shape[0]), dtype=np.float64)
+        for start in range(0, values.shape[0], KNN_BLOCK_SIZE):
+            stop = start + KNN_BLOCK_SIZE
+            distances[:, start:stop] = QCMixin._nan_euclidean_distances(block, values[start:stop])
+        distances[np.isnan(distances)] = np.inf
+
+        # The nearest samples of every receiver, closest first: the neighbours of most cells are among them
+        n_candidates = min(values.shape[0], max(4 * n_neighbors, KNN_MIN_CANDIDATES))
+        candidates = np.argpartition(distances, n_candidates - 1, axis=1)[:, :n_candidates]
+        candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidates_finite = np.isfinite(np.take_along_axis(candidate_distances, order, axis=1))
+
+        block_missing = missing[rows]
+        fill_rows, fill_cols, fill_values = [], [], []
+        for col in np.flatnonzero(block_missing.any(axis=0)):
+            receivers = np.flatnonzero(block_missing[:, col])
+            neighbours = candidates[receivers]
+            selected = ~missing[neighbours, col] & candidates_finite[receivers]
+            selected &= np.cumsum(selected, axis=1) <= n_neighbors
+            counts = selected.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                fill = np.where(selected, values[neighbours, col], 0).sum(axis=1) / counts
+
+            # Receivers without enough donors among their candidates look at all samples
+            incomplete = np.flatnonzero(counts < n_neighbors)
+            if n_candidates >= values.shape[0]:
+                incomplete = incomplete[:0]
+            if len(incomplete):
+                donors = np.flatnonzero(~missing[:, col])
+                donor_distances = distances[np.ix_(receivers[incomplete], donors)]
+                k = min(n_neighbors, donors.size)
+                if k > 0:
+                    nearest = np.argpartition(donor_distances, k - 1, axis=1)[:, :k]
+                    valid = np.isfinite(np.take_along_axis(donor_distances, nearest, axis=1))
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        fill[incomplete] = (
+                            np.where(valid, values[donors[nearest], col], 0).sum(axis=1) / valid.sum(axis=1)
+                        )
+                    counts[incomplete] = valid.sum(axis=1)
+
+            fill[counts == 0] = fallback[col]
+            fill_rows.append(rows[receivers])
+            fill_cols.append(np.full(len(receivers), col))
+            fill_values.append(fill)
+
+        if not fill_rows:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty, np.empty(0)
+        return np.concatenate(fill_rows), np.concatenate(fill_cols), np.concatenate(fill_values)
+
+    def _knn_fill(self: T, values: np.ndarray, n_neighbors: int = 5) -> None:
+        """
+        Fill missing values of a 2-D array in place with the mean of the nearest samples.
+
+        Samples with missing values are processed in blocks of `KNN_BLOCK_SIZE` on `n_workers` threads
+        (matrix products release the GIL). Fill values are only written once all blocks are done,
+        so distances are always computed on the original values. Samples whose distance to every
+        donor is undefined get the column mean.
+
+        Args:
+            values (np.ndarray): 2-D array (samples x features) with NaN for missing values.
+            n_neighbors (int): Number of neighbours averaged. Defaults to 5.
+        """
+        missing = np.isnan(values)
+        receivers = np.flatnonzero(missing.any(axis=1))
+        if receivers.size == 0:
             return
 
-        imputed_values = imputer.fit_transform(data_categorical)
-        imputed_df = pd.DataFrame(imputed_values, columns=data_categorical.columns, index=data_categorical.index)
-        self.data[data_categorical.columns] = imputed_df.astype('category')
+        fallback = QCMixin._fill_values(values, "mean")
+        blocks = [receivers[start:start + KNN_BLOCK_SIZE] for start in range(0, len(receivers), KNN_BLOCK_SIZE)]
+        with ThreadPoolExecutor(max_workers=min(len(blocks), self.n_workers)) as executor:
+            results = list(executor.map(
+                lambda rows: QCMixin._knn_fill_block(values, missing, rows, n_neighbors, fallback), blocks
+            ))
+        for rows, cols, fill in results:
+            values[rows, cols] = fill
+
+    def _impute_categorical(self: T, columns: List[str]) -> Dict[Any, Any]:
+        """
+        Fill missing values of categorical columns in place with the most frequent value (mode).
+
+        Args:
+            columns (List[str]): Categorical columns of `self.data` with missing values.
+
+        Returns:
+            Dict[Any, Any]: The mode of every categorical feature, so that new samples can be filled the same way.
+        """
+        missing_columns = set(columns)
+        categorical = self._categorical_columns()
+        modes = {}
+        for start in range(0, len(categorical), IMPUTE_CHUNK_SIZE):
+            chunk = self.data[categorical[start:start + IMPUTE_CHUNK_SIZE]]
+            chunk_modes = chunk.mode(dropna=True)
+            if chunk_modes.empty:
+                continue
+            chunk_modes = chunk_modes.iloc[0].dropna().to_dict()
+            modes.update(chunk_modes)
+            filled = [col for col in chunk.columns if col in missing_columns]
+            if filled:
+                self.data[filled] = chunk[filled].fillna({col: chunk_modes[col] for col in filled if col in chunk_modes})
+        return modes
+
+    @staticmethod
+    def _nan_modes(values: np.ndarray) -> np.ndarray:
+        """
+        Compute the most frequent value of every column of a 2-D array at once, ignoring NaN values.
+
+        Ties are resolved with the smallest value, like `pd.Series.mode` and sklearn's `SimpleImputer`.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features).
+
+        Returns:
+            np.ndarray: The mode of every column; NaN for columns without values.
+        """
+        n_rows, n_cols = values.shape
+        modes = np.full(n_cols, np.nan)
+        if n_rows == 0 or n_cols == 0:
+            return modes
+
+        # Runs of equal values in the sorted columns, laid out one column after another
+        sorted_values = np.sort(values, axis=0).ravel(order="F")
+        starts = np.ones(sorted_values.shape, dtype=bool)
+        starts[1:] = sorted_values[1:] != sorted_values[:-1]
+        starts[::n_rows] = True
+        starts = np.flatnonzero(starts)
+        lengths = np.diff(np.append(starts, sorted_values.size))
+        lengths[np.isnan(sorted_values[starts])] = 0
+
+        # For every column, the longest run, the first one (smallest value) among equally long runs
+        run_cols = starts // n_rows
+        order = np.lexsort((starts, -lengths, run_cols))
+        first = order[np.unique(run_cols[order], return_index=True)[1]]
+        first = first[lengths[first] > 0]
+        modes[run_cols[first]] = sorted_values[starts[first]]
+        return modes
+
+    @staticmethod
+    def _fill_values(values: np.ndarray, method: str = "mean", constant: float = 0.0) -> np.ndarray:
+        """
+        Compute the value used to fill missing values of every column of a 2-D array.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features).
+            method (str): "mean", "median", "mode" or "constant". Defaults to "mean".
+            constant (float): The fill value of the "constant" method. Defaults to 0.0.
+
+        Returns:
+            np.ndarray: The fill value of every column; NaN for columns without values.
+        """
+        if method == "median":
+            return QCMixin._nan_quantiles(values, [0.5])[0]
+        if method == "mode":
+            return QCMixin._nan_modes(values)
+        if method == "constant":
+            return np.full(values.shape[1], constant, dtype=np.float64)
+
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nansum(values, axis=0, dtype=np.float64) / counts
+
+    @staticmethod
+    def _nan_quantiles(values: np.ndarray, quantiles: List[float]) -> np.ndarray:
+        """
+        Compute quantiles of every column of a 2-D array at once, ignoring NaN values.
+
+        Columns are sorted in one pass and quantiles are linearly interpolated between the
+        two closest ranks, which matches `pd.Series.quantile` and `np.nanpercentile`.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features).
+            quantiles (List[float]): Quantiles to compute, between 0 and 1.
+
+        Returns:
+            np.ndarray: Array of shape (len(quantiles), n_features); NaN for columns without values.
+        """
+        sorted_values = np.sort(values, axis=0)
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+        last = np.maximum(counts - 1, 0)
+        result = np.empty((len(quantiles), values.shape[1]), dtype=np.result_type(values.dtype, np.float64))
+        for i, q in enumerate(quantiles):
+            position = q * last
+            lower = np.floor(position).astype(np.intp)
+            upper = np.minimum(lower + 1, last)
+            low = np.take_along_axis(sorted_values, lower[np.newaxis], axis=0)[0]
+            high = np.take_along_axis(sorted_values, upper[np.newaxis], axis=0)[0]
+            result[i] = low + (high - low) * (position - lower)
+        result[:, counts == 0] = np.nan
+        return result
+
+    @staticmethod
+    def _outlier_bounds(
+            values: np.ndarray,
+            method: str = "iqr",
+            threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the bounds outside of which values of every column of a 2-D array are outliers,
+        vectorized over chunks of columns.
+
+        The z-score and MAD bounds are computed in float32, one chunk of `OUTLIER_CHUNK_SIZE`
+        columns at a time, so no float64 copy of the whole array is made.
+
+        Args:
+            values (np.ndarray): 2-D array of numerical values (samples x features).
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
+            threshold (Optional[float]): Threshold of the z-score based methods. Defaults to 3.0 for
+                "zscore" and 3.5 for "mad".
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The lower and upper bound of every column; NaN where a column
+            has no spread to compare against, so none of its values are outliers.
+        """
+        if threshold is None:
+            threshold = OUTLIER_THRESHOLDS.get(method)
+
+        dtype = "float64" if method == "iqr" else "float32"
+        lower = np.empty(values.shape[1], dtype=dtype)
+        upper = np.empty(values.shape[1], dtype=dtype)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for start in range(0, values.shape[1], OUTLIER_CHUNK_SIZE):
+                columns = slice(start, start + OUTLIER_CHUNK_SIZE)
+                chunk = values[:, columns].astype(dtype, copy=False)
+                if method == "iqr":
+                    q1, q3 = QCMixin._nan_quantiles(chunk, [0.25, 0.75])
+                    iqr = q3 - q1
+                    lower[columns], upper[columns] = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+                    continue
+
+                if method == "mad":
+                    center = QCMixin._nan_quantiles(chunk, [0.5])[0].astype(np.float32)
+                    mad = QCMixin._nan_quantiles(np.abs(chunk - center), [0.5])[0].astype(np.float32)
+                    # Columns where most values are equal have no spread to compare against
+                    mad[mad == 0] = np.nan
+                    spread = np.float32(threshold) * mad / np.float32(0.6745)
+                else:
+                    center = np.nanmean(chunk, axis=0)
+                    spread = np.float32(threshold) * np.nanstd(chunk, axis=0, ddof=1)
+                lower[columns], upper[columns] = center - spread, center + spread
+        return lower, upper
 
     @staticmethod
-    def _detect_outliers_iqr(df: pd.DataFrame) -> Dict[str, List[Tuple[int, Any]]]:
+    def _replace_block_outliers(
+            block: np.ndarray,
+            samples: np.ndarray,
+            features: np.ndarray,
+            col_offset: int = 0,
+            method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]:
         """
-        Detect outliers in numerical columns using the Interquartile Range (IQR) method.
+        Detect outliers in a block of columns against the bounds of `_outlier_bounds` and replace them
+        in place with the column's median value.
 
         Args:
-            df (pd.DataFrame): The DataFrame containing numerical data.
+            block (np.ndarray): 2-D float array (samples x features) of a block of columns, modified in place.
+            samples (np.ndarray): Sample labels of the dataset.
+            features (np.ndarray): Feature names of the dataset.
+            col_offset (int): Column position of the first column of the block in the dataset. Defaults to 0.
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
 
         Returns:
-            Dict[str, List[Tuple[int, Any]]]: A dictionary where keys are column names and values are lists of tuples,
-            each tuple containing the index and outlier value.
+            Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]: The outliers of the block with their values
+            before replacement, and the median, lower and upper outlier bounds of every column.
         """
-        outliers = {}
-        for col in df.columns:
-            q1 = df[col].quantile(0.25)
-            q3 = df[col].quantile(0.75)
-            iqr = q3 - q1
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            outliers_mask = (df[col] < lower_bound) | (df[col] > upper_bound)
-            col_outliers = df[col][outliers_mask]
-            if not col_outliers.empty:
-                outliers[col] = list(col_outliers.items())
-        return outliers
+        lower, upper = QCMixin._outlier_bounds(block, method=method)
+        compared = block.astype(lower.dtype, copy=False)
+        mask = (compared < lower) | (compared > upper)
+        medians = QCMixin._nan_quantiles(block, [0.5])[0]
+        outliers = OutlierCoo.from_mask(mask, block, samples, features, col_offset)
+        np.putmask(block, mask, np.broadcast_to(medians.astype(block.dtype), block.shape))
+        return outliers, medians, lower, upper
 
     @staticmethod
-    def _detect_outliers_zscore(df: pd.DataFrame, threshold: float = 3.0) -> Dict[str, List[Tuple[int, Any]]]:
+    def _handle_matrix_outliers(
+            matrix: NumericMatrix, method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]:
         """
-        Detect outliers in numerical columns using the Z-score method.
+        Detect outliers in a numeric matrix and replace them in place with the column's median value.
 
         Args:
-            df (pd.DataFrame): The DataFrame containing numerical data.
-            threshold (float): The Z-score threshold for defining outliers. Defaults to 3.0.
+            matrix (NumericMatrix): The numeric matrix of the dataset.
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
 
         Returns:
-            Dict[str, List[Tuple[int, Any]]]: A dictionary where keys are column names and values are lists of tuples,
-            each tuple containing the index and outlier value.
+            Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]: The outliers with their values before
+            replacement, and the median, lower and upper outlier bounds of every feature.
+        """
+        parts, medians, lower, upper = [], [], [], []
+        for columns, block in matrix.blocks():
+            outliers, block_medians, block_lower, block_upper = QCMixin._replace_block_outliers(
+                block, matrix.samples, matrix.features, columns.start, method=method
+            )
+            parts.append(outliers)
+            medians.append(block_medians)
+            lower.append(block_lower)
+            upper.append(block_upper)
+        outliers = OutlierCoo.concat(parts, matrix.samples, matrix.features)
+        if not medians:
+            return outliers, np.empty(0), np.empty(0), np.empty(0)
+        return outliers, np.concatenate(medians), np.concatenate(lower), np.concatenate(upper)
+
+    def _handle_frame_outliers(
+            self: T, method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]:
         """
-        outliers = {}
-        for col in df.columns:
-            z_scores = np.abs((df[col] - df[col].mean()) / df[col].std())
-            outliers_mask = z_scores > threshold
-            col_outliers = df[col][outliers_mask]
-            if not col_outliers.empty:
-                outliers[col] = list(col_outliers.items())
-        return outliers
+        Detect outliers in the numerical columns of the dataset and replace them with the column's median value.
 
-    def _detect_outliers(self: T, df: pd.DataFrame, method: str = "iqr") -> Dict[str, List[Tuple[int, Any]]]:
+        Columns are converted to a float array one chunk of `OUTLIER_CHUNK_SIZE` columns at a time, and only
+        the columns of the chunk with outliers are written back; integer columns whose median is not an
+        integer become float columns.
+
+        Args:
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
+
+        Returns:
+            Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]: The outliers with their values before
+            replacement, and the median, lower and upper outlier bounds of every feature.
+        """
+        numerical = self.data.select_dtypes(include="number").columns
+        parts, medians, lower, upper = [], [], [], []
+        for start in range(0, len(numerical), OUTLIER_CHUNK_SIZE):
+            columns = numerical[start:start + OUTLIER_CHUNK_SIZE]
+            block = self.data[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            outliers, block_medians, block_lower, block_upper = QCMixin._replace_block_outliers(
+                block, self.data.index, numerical, start, method=method
+            )
+            parts.append(outliers)
+            medians.append(block_medians)
+            lower.append(block_lower)
+            upper.append(block_upper)
+
+            positions = np.unique(outliers.cols) - start
+            dtypes = {}
+            for col, median_value in zip(columns[positions], block_medians[positions]):
+                dtype = self.data[col].dtype
+                if pd.api.types.is_integer_dtype(dtype) and not float(median_value).is_integer():
+                    dtype = self.float_dtype
+                dtypes[col] = dtype
+            if len(positions):
+                self.data[columns[positions]] = pd.DataFrame(
+                    block[:, positions], index=self.data.index, columns=columns[positions]
+                ).astype(dtypes)
+
+        outliers = OutlierCoo.concat(parts, self.data.index, numerical)
+        if not medians:
+            return outliers, np.empty(0), np.empty(0), np.empty(0)
+        return outliers, np.concatenate(medians), np.concatenate(lower), np.concatenate(upper)
+
+    @staticmethod
+    def _values_before_outliers(outliers: OutlierCoo, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Detect outliers in a DataFrame using the specified method (IQR or Z-score).
+        Restore the replaced outliers into a copy of some of the features.
 
         Args:
-            df (pd.DataFrame): The DataFrame containing numerical data.
+            outliers (OutlierCoo): The outliers with their values before replacement.
+            data (pd.DataFrame): Values of some of the features after the outliers were replaced.
+
+        Returns:
+            pd.DataFrame: The values of the features before replacement, as floats.
+        """
+        feature_positions = pd.Index(outliers.features).get_indexer(data.columns)
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        selected = np.isin(outliers.cols, feature_positions)
+        positions = pd.Index(feature_positions).get_indexer(outliers.cols[selected])
+        values[outliers.rows[selected], positions] = outliers.values[selected]
+        return pd.DataFrame(values, index=data.index, columns=data.columns)
+
+    @staticmethod
+    def _handle_sparse_outliers(
+            matrix: SparseMatrix, method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Detect outliers among the stored values of a sparse numeric matrix and replace them in place
+        with the median of the feature's stored values.
+
+        Zeros are not stored and are not measurements to compare, e.g. genes not detected in a cell, so
+        the bounds and medians are computed from the stored values only and zeros are never outliers;
+        otherwise every non-zero value of a mostly-zero feature would be one.
+
+        Args:
+            matrix (SparseMatrix): The sparse numeric matrix of the dataset.
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
+
+        Returns:
+            Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]: The outliers with their values before
+            replacement, and the median, lower and upper outlier bounds of every feature.
+        """
+        block_medians, block_lower, block_upper = [], [], []
+        for _, block in matrix.blocks(fill_value=np.nan):
+            bounds = QCMixin._outlier_bounds(block, method=method)
+            block_medians.append(QCMixin._nan_quantiles(block, [0.5])[0])
+            block_lower.append(bounds[0])
+            block_upper.append(bounds[1])
+        if not block_medians:
+            return OutlierCoo.concat([], matrix.samples, matrix.features), np.empty(0), np.empty(0), np.empty(0)
+        medians = np.concatenate(block_medians)
+        lower, upper = np.concatenate(block_lower), np.concatenate(block_upper)
+
+        # Stored values are sorted by column, as outliers are
+        data = matrix.values.data
+        columns = matrix.stored_columns()
+        values = data.astype(lower.dtype, copy=False)
+        with np.errstate(invalid="ignore"):
+            mask = (values < lower[columns]) | (values > upper[columns])
+        positions = np.flatnonzero(mask)
+        outliers = OutlierCoo(
+            matrix.values.indices[positions], columns[positions], data[positions].copy(), matrix.samples, matrix.features
+        )
+        data[positions] = medians[columns[positions]]
+        return outliers, medians, lower, upper
+
+    def _stream_outliers(
+            self: T,
+            profile: StreamingProfile,
+            dataset_blocks: Callable[[], Iterator[pd.DataFrame]],
+            method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray]:
+        """
+        Detect outliers of the streamed dataset in a second pass over its blocks, against the bounds
+        estimated by the streaming profile. Outliers are only detected, not replaced.
+
+        Args:
+            profile (StreamingProfile): Profile of the streamed dataset.
+            dataset_blocks (Callable[[], Iterator[pd.DataFrame]]): Reads the dataset block by block.
             method (str): The method for detecting outliers ("iqr" or "zscore"). Defaults to "iqr".
 
         Returns:
-            Dict[str, List[Tuple[int, Any]]]: A dictionary of outliers detected in the data.
+            Tuple[OutlierCoo, np.ndarray]: The outliers, sorted by column, and the estimated median
+            of every numerical feature.
+        """
+        lower, upper = profile.outlier_bounds(method, threshold=OUTLIER_THRESHOLDS["zscore"])
+        features_cols = self.metadata.get("features_cols", True)
+
+        parts = []
+        row_offset = 0
+        for block in dataset_blocks():
+            columns = block.columns.intersection(profile.numeric, sort=False)
+            positions = profile.numeric.get_indexer(columns)
+            values = block[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            mask = (values < lower[positions]) | (values > upper[positions])
+            rows, cols = np.nonzero(mask)
+            parts.append(OutlierCoo(
+                rows + row_offset, positions[cols], values[rows, cols], profile.samples, profile.numeric
+            ))
+            if features_cols:
+                row_offset += len(block.index)
+
+        outliers = OutlierCoo.concat(parts, profile.samples, profile.numeric)
+        # Blocks of samples give outliers in row order; they are kept sorted by column
+        order = np.argsort(outliers.cols, kind="stable")
+        outliers = outliers._replace(
+            rows=outliers.rows[order], cols=outliers.cols[order], values=outliers.values[order]
+        )
+        return outliers, profile.quantiles([0.5])[0]
+
+    def _outliers_report(
+            self: T, outliers: OutlierCoo, data_before: Optional[pd.DataFrame], medians: np.ndarray
+    ) -> Dict[str, Any]:
+        """
+        Summarize the outliers for the report.
+
+        Only the features with the most outliers are listed, each with its most extreme values,
+        and box plots are drawn for these features only.
+
+        Args:
+            outliers (OutlierCoo): The outliers found by the outlier handling step.
+            data_before (Optional[pd.DataFrame]): Values of the listed features before replacement,
+                or None to leave out box plots.
+            medians (np.ndarray): The median of every feature.
+
+        Returns:
+            Dict[str, Any]: Outlier examples, counts and box plots.
         """
-        if method == "zscore":
-            return self._detect_outliers_zscore(df)
-        return self._detect_outliers_iqr(df)
+        summary = outliers.summary(medians, top_features=OUTLIER_REPORT_FEATURES, top_examples=OUTLIER_REPORT_EXAMPLES)
+        counts = outliers.counts()
+        return {
+            "outliers": summary,
+            "counts": counts.iloc[:OUTLIER_REPORT_FEATURES].to_dict(),
+            "n_outliers": outliers.n_outliers,
+            "n_features": len(counts),
+            "boxplots": self._box_plots(data_before, list(summary.keys())) if data_before is not None else None
+        }
 
     @report_step(output=True)
-    def identify_missing_values(self: T) -> Dict[str, float]:
+    def identify_missing_values(self: T) -> Dict[str, Any]:
         """
-        Identify missing values in the dataset and return their percentages.
+        Identify missing values in the dataset and return their percentages per feature and per sample,
+        together with the most common missingness patterns.
 
         Returns:
-            Dict[str, float]: A dictionary of columns and their missing value percentages.
+            Dict[str, Any]: Missing value percentages of features ("features") and of the samples with
+            the most missing values ("samples"), the number of samples with missing values and the most
+            common patterns of features missing together ("patterns").
         """
-        return self._identify_missing_values(self.data)
+        if self.streaming_profile is not None:
+            # Streaming profiles only count missing values; patterns need the full missingness mask
+            rates = self.streaming_profile.feature_rates
+            feature_rates = rates[rates > 0].sort_values(ascending=False, kind="stable").to_dict()
+            sample_rates = self.streaming_profile.sample_rates
+            patterns = []
+        else:
+            profile = self._missingness_profile()
+            feature_rates = self._missing_values()
+            sample_rates = profile.sample_rates
+            patterns = profile.patterns(top_n=MISSINGNESS_REPORT_PATTERNS)
 
-    @report_step(snapshot="combined")
-    def handle_missing_values(self: T) -> None:
+        sample_rates = sample_rates[sample_rates > 0].sort_values(ascending=False, kind="stable")
+        return {
+            "features": feature_rates,
+            "samples": sample_rates.iloc[:MISSINGNESS_REPORT_SAMPLES].to_dict(),
+            "n_samples_missing": len(sample_rates),
+            "patterns": patterns
+        }
+
+    @report_step(output=True)
+    def sample_qc(self: T, method: str = "flag") -> Dict[str, Any]:
         """
-        Handle missing values by dropping columns with more than 30% missing data,
-        imputing categorical data with mode, and imputing numerical data with mean.
+        Compute per-sample QC metrics and flag outlier samples.
+
+        Samples whose total signal or detection rate lie more than the MAD threshold (3.5) away
+        from the median of all samples, or with at least `missing_threshold` percent (30 by
+        default) missing values, are flagged.
+
+        Args:
+            method (str): "flag" to only report flagged samples, or "filter" to also remove them
+                from the dataset. Defaults to "flag".
+
+        Returns:
+            Dict[str, Any]: The bounds of every metric ("summary"), the flagged samples with the lowest
+            detection rate ("flagged") and the number of samples and of flagged samples.
         """
-        missing_columns = self._identify_missing_values(self.data)
-        if not missing_columns:
-            return
+        metrics = self._sample_metrics()
+        missing_threshold = self.metadata.get("missing_threshold", 30.0)
+
+        bounds = {}
+        flags = pd.DataFrame(index=metrics.index)
+        for metric in ["total_signal", "detection_rate"]:
+            median, mad, lower, upper = QCMixin._mad_bounds(metrics[metric].to_numpy(), OUTLIER_THRESHOLDS["mad"])
+            bounds[metric] = [median, mad, lower, upper]
+            flags[metric] = (metrics[metric] < lower) | (metrics[metric] > upper)
+        median, mad, _, _ = QCMixin._mad_bounds(metrics["missing"].to_numpy(), OUTLIER_THRESHOLDS["mad"])
+        bounds["missing"] = [median, mad, np.nan, missing_threshold]
+        flags["missing"] = metrics["missing"] >= missing_threshold
+
+        summary = pd.DataFrame.from_dict(bounds, orient="index", columns=["median", "MAD", "lower", "upper"])
+        summary["flagged"] = flags.sum()
+        flagged = flags.any(axis=1).to_numpy()
+
+        flagged_metrics = metrics[flagged].copy()
+        flagged_metrics["reason"] = [
+            ", ".join(flags.columns[row]) for row in flags.to_numpy()[flagged]
+        ]
+        flagged_metrics = flagged_metrics.sort_values("detection_rate", kind="stable")
+
+        if method == "filter" and flagged.any():
+            click.echo(f"Removing {int(flagged.sum())} flagged samples")
+            keep = np.flatnonzero(~flagged)
+            if isinstance(self.data_numerical, NumericMatrix):
+                self.data_numerical = self.data_numerical.take_samples(keep)
+            self.data = self.data.iloc[keep]
+            self.missingness = None
 
-        # Drop columns with >= 30% missing data
-        for col, missing_percentage in missing_columns.items():
-            if missing_percentage >= 30:
-                self.data.drop(columns=[col], inplace=True)
+        return {
+            "summary": summary,
+            "flagged": flagged_metrics.iloc[:SAMPLE_QC_REPORT_SAMPLES],
+            "n_samples": len(metrics.index),
+            "n_flagged": int(flagged.sum()),
+            "removed": method == "filter"
+        }
+
+    @report_step(output=True)
+    def identify_duplicates(self: T, method: str = "flag") -> Dict[str, Any]:
+        """
+        Find duplicate and near-duplicate samples and features.
 
-        self._impute_mode()
-        self._impute_mean()
+        Exact duplicates are found by hashing every sample and feature. Near-duplicates, with a
+        correlation of at least 0.99 after standardizing features, are found by locality-sensitive
+        hashing of quantized values, so only samples or features sharing a hash are compared
+        rather than all pairs.
+
+        Args:
+            method (str): "flag" to only report duplicates, or "drop" to also keep only the first sample
+                and feature of every group of exact duplicates. Near-duplicates are only reported.
+                Defaults to "flag".
+
+        Returns:
+            Dict[str, Any]: The first groups of duplicate samples and features, the most correlated pairs
+            of near-duplicate samples and features, and the number of samples and features that
+            duplicate an earlier one.
+        """
+        sample_groups, feature_groups, features = self._exact_duplicates()
+        samples = self.data.index
+        n_columns = self.data.shape[1]
+        duplicate_samples = np.zeros(len(samples), dtype=bool)
+        for group in sample_groups:
+            duplicate_samples[group[1:]] = True
+        duplicate_features = np.zeros(len(features), dtype=bool)
+        for group in feature_groups:
+            duplicate_features[group[1:]] = True
+
+        # Numerical features are the numeric matrix, after the columns of the dataset, if there is one
+        if isinstance(self.data_numerical, NumericMatrix):
+            numerical = np.arange(n_columns, len(features))
+        else:
+            numerical = np.flatnonzero(
+                self.data.columns.isin(self.data.select_dtypes(include="number").columns)
+            )
+        near_samples = self._near_duplicates(duplicate_samples, by_samples=True)
+        near_features = self._near_duplicates(duplicate_features[numerical], by_samples=False)
+
+        if method == "drop" and (duplicate_samples.any() or duplicate_features.any()):
+            click.echo(f"Removing {int(duplicate_samples.sum())} duplicate samples "
+                       f"and {int(duplicate_features.sum())} duplicate features")
+            keep = np.flatnonzero(~duplicate_samples)
+            if isinstance(self.data_numerical, NumericMatrix):
+                self.data_numerical = self.data_numerical.take_samples(keep)
+                self.data_numerical.drop_features(list(features[n_columns:][duplicate_features[n_columns:]]))
+            self.data = self.data.iloc[keep, np.flatnonzero(~duplicate_features[:n_columns])]
+            self.missingness = None
+            if duplicate_features.any():
+                self._record_fit(FittedStep("identify_duplicates", method, {
+                    "dropped": features[duplicate_features].tolist()
+                }))
+
+        return {
+            "samples": [samples[group].tolist() for group in sample_groups[:DUPLICATE_REPORT_ITEMS]],
+            "features": [features[group].tolist() for group in feature_groups[:DUPLICATE_REPORT_ITEMS]],
+            "near_samples": near_samples[:DUPLICATE_REPORT_ITEMS],
+            "near_features": near_features[:DUPLICATE_REPORT_ITEMS],
+            "n_duplicate_samples": int(duplicate_samples.sum()),
+            "n_duplicate_features": int(duplicate_features.sum()),
+            "n_near_samples": len(near_samples),
+            "n_near_features": len(near_features),
+            "removed": method == "drop"
+        }
+
+    @report_step(snapshot="combined", output=True)
+    def handle_missing_values(self: T, method: str = "mean") -> Dict[str, Any]:
+        """
+        Handle missing values by dropping columns with at least `missing_threshold` percent
+        (30 by default) missing data, imputing categorical data with mode, and imputing numerical
+        data in place with the given method.
+
+        Args:
+            method (str): Fill value of numerical columns: "mean", "median", "mode", "constant"
+                (`imputation_constant` in the metadata, 0 by default) or "knn" (mean of the nearest
+                samples). Defaults to "mean".
+
+        Returns:
+            Dict[str, Any]: The drop threshold and the dropped and imputed columns.
+        """
+        threshold = self.metadata.get("missing_threshold", 30.0)
+        missing_columns = self._missing_values()
+        dropped = [col for col, missing_percentage in missing_columns.items() if missing_percentage >= threshold]
+        imputed = [col for col, missing_percentage in missing_columns.items() if missing_percentage < threshold]
+
+        # All columns over the threshold are dropped at once
+        dropped_set = set(dropped)
+        data_dropped = [col for col in self.data.columns if col in dropped_set]
+        if data_dropped:
+            self.data.drop(columns=data_dropped, inplace=True)
+        if isinstance(self.data_numerical, NumericMatrix):
+            self.data_numerical.drop_features([col for col in dropped if col not in set(data_dropped)])
+
+        imputed_set = set(imputed)
+        categorical = [col for col in self._categorical_columns() if col in imputed_set]
+        numerical = [
+            col for col in self.data.select_dtypes(include="number").columns if col in imputed_set
+        ]
+        modes = self._impute_categorical(categorical)
+        fills = self._impute_numerical(numerical, method=method)
+        self._record_fit(FittedStep("handle_missing_values", method, {
+            "dropped": dropped, "modes": modes, "features": fills.index.tolist(), "fill": fills.to_numpy()
+        }))
+
+        # Missing values have been dropped or filled, so the profile is out of date
+        self.missingness = None
+        return {"threshold": threshold, "dropped": dropped, "imputed": imputed}
 
     @report_step(snapshot="combined", output=True)
     def handle_outliers(self: T, method: str = "iqr") -> Dict[str, Any]:
         """
         Handle outliers in the dataset by replacing them with the column's median value.
 
+        All outliers are kept in `self.outliers` in sparse COO format; the report only
+        includes counts and examples for the features with the most outliers. In streaming
+        memory mode, outliers are only detected, against bounds estimated by the streaming profile.
+        In a sparse numeric matrix, only non-zero values are compared (see `_handle_sparse_outliers`).
+
         Args:
-            method (str): The method for detecting outliers ("iqr" or "zscore"). Defaults to "iqr".
+            method (str): The method for detecting outliers ("iqr", "zscore" or "mad"). Defaults to "iqr".
 
         Returns:
             Dict[str, Any]: A dictionary containing outlier information and optional visualizations.
         """
-        data_numerical = self.data.select_dtypes(include=["float", "int"])
-        if data_numerical.empty:
-            return {"outliers": {}, "boxplots": []}
+        if self.streaming_profile is not None and self.dataset_blocks is not None:
+            outliers, medians = self._stream_outliers(
+                self.streaming_profile, self.dataset_blocks, method=method.lower()
+            )
+            self.outliers = outliers
+            return self._outliers_report(outliers, None, medians)
 
-        outliers = self._detect_outliers(data_numerical, method=method)
+        if isinstance(self.data_numerical, NumericMatrix):
+            matrix = self.data_numerical
+            params = {}
+            if isinstance(matrix, SparseMatrix):
+                outliers, medians, lower, upper = QCMixin._handle_sparse_outliers(matrix, method=method.lower())
+                params["skip_zeros"] = True
+            else:
+                outliers, medians, lower, upper = QCMixin._handle_matrix_outliers(matrix, method=method.lower())
+            self.outliers = outliers
+            self._record_fit(FittedStep("handle_outliers", method.lower(), {
+                "features": matrix.columns.tolist(), "lower": lower, "upper": upper, "median": medians, **params
+            }))
+            # Box plots show the distribution before replacement
+            features = list(outliers.counts().index[:OUTLIER_REPORT_FEATURES])
+            data_before = QCMixin._values_before_outliers(outliers, matrix.to_frame(features=features))
+            return self._outliers_report(outliers, data_before, medians)
 
-        # Replace outliers with median value
-        for col, outliers_list in outliers.items():
-            median_value = self.data[col].median()
-            for index, _ in outliers_list:
-                self.data.at[index, col] = median_value
-
-        # Generate boxplots for visualization (if implemented)
-        boxplots = self._box_plots(data_numerical, list(outliers.keys()))
-
-        return {
-            "outliers": outliers,
-            "boxplots": boxplots
-        }
+        outliers, medians, lower, upper = self._handle_frame_outliers(method=method.lower())
+        self.outliers = outliers
+        self._record_fit(FittedStep("handle_outliers", method.lower(), {
+            "features": outliers.features.tolist(), "lower": lower, "upper": upper, "median": medians
+        }))
+        features = list(outliers.counts().index[:OUTLIER_REPORT_FEATURES])
+        return self._outliers_report(
+            outliers, QCMixin._values_before_outliers(outliers, self.data[features]), medians
+        )
@@ -0,0 +1,157 @@
+from typing import Any, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+
+
+class MissingnessProfile:
+    """
+    Missing values of a dataset stored as a packed bitmap, one bit per value, with
+    per-feature and per-sample counts.
+
+    The bitmap holds one row of `ceil(n_features / 8)` bytes per sample, so the profile uses
+    8 times less memory than a boolean mask of the dataset, and whole missingness patterns
+    of samples can be compared as byte strings.
+
+    Attributes:
+        bits (np.ndarray): uint8 array of shape (n_samples, ceil(n_features / 8)), bit set where a value is missing.
+        samples (pd.Index): Sample labels, one per row of `bits`.
+        features (pd.Index): Feature names, in bit order.
+        feature_counts (np.ndarray): Number of missing values of every feature.
+        sample_counts (np.ndarray): Number of missing values of every sample.
+    """
+
+    def __init__(
+            self,
+            bits: np.ndarray,
+            samples: pd.Index,
+            features: pd.Index,
+            feature_counts: np.ndarray,
+            sample_counts: np.ndarray
+    ) -> None:
+        """
+        Initialize the MissingnessProfile instance.
+
+        Args:
+            bits (np.ndarray): Packed missingness bitmap of shape (n_samples, ceil(n_features / 8)).
+            samples (pd.Index): Sample labels.
+            features (pd.Index): Feature names.
+            feature_counts (np.ndarray): Number of missing values of every feature.
+            sample_counts (np.ndarray): Number of missing values of every sample.
+        """
+        self.bits: np.ndarray = bits
+        self.samples: pd.Index = samples
+        self.features: pd.Index = features
+        self.feature_counts: np.ndarray = feature_counts
+        self.sample_counts: np.ndarray = sample_counts
+
+    def __repr__(self) -> str:
+        """
+        String representation of the MissingnessProfile instance.
+
+        Returns:
+            str: A string with the profile shape and number of missing values.
+        """
+        return (f"<MissingnessProfile(samples: {len(self.samples)}, features: {len(self.features)}, "
+                f"missing: {int(self.feature_counts.sum())})>")
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[np.ndarray], samples: pd.Index, features: pd.Index) -> "MissingnessProfile":
+        """
+        Build the profile in one pass over boolean missingness masks of consecutive column blocks.
+
+        Only one block mask and fewer than 8 leftover columns are held unpacked at a time.
+
+        Args:
+            blocks (Iterable[np.ndarray]): Boolean masks (samples x block features), True where a value is missing.
+            samples (pd.Index): Sample labels.
+            features (pd.Index): Feature names of all blocks, in order.
+
+        Returns:
+            MissingnessProfile: The missingness profile of the dataset.
+        """
+        n_samples = len(samples)
+        bits = np.zeros((n_samples, (len(features) + 7) // 8), dtype=np.uint8)
+        feature_counts = np.zeros(len(features), dtype=np.int64)
+        sample_counts = np.zeros(n_samples, dtype=np.int64)
+
+        pending = np.zeros((n_samples, 0), dtype=bool)
+        byte_offset = 0
+        feature_offset = 0
+        for block in blocks:
+            feature_counts[feature_offset:feature_offset + block.shape[1]] = block.sum(axis=0)
+            sample_counts += block.sum(axis=1)
+            feature_offset += block.shape[1]
+
+            # Columns are packed 8 at a time; the rest waits for the next block
+            block = np.concatenate([pending, block], axis=1)
+            n_packed = block.shape[1] // 8 * 8
+            packed = np.packbits(block[:, :n_packed], axis=1)
+            bits[:, byte_offset:byte_offset + packed.shape[1]] = packed
+            byte_offset += packed.shape[1]
+            pending = block[:, n_packed:]
+
+        if pending.shape[1]:
+            bits[:, byte_offset:] = np.packbits(pending, axis=1)
+        return cls(bits, pd.Index(samples), pd.Index(features), feature_counts, sample_counts)
+
+    def matches(self, samples: pd.Index, features: pd.Index) -> bool:
+        """
+        Check whether the profile was computed for a dataset with these samples and features.
+
+        Args:
+            samples (pd.Index): Sample labels of the dataset.
+            features (pd.Index): Feature names of the dataset.
+
+        Returns:
+            bool: True if samples and features are the same, in the same order.
+        """
+        return self.samples.equals(samples) and self.features.equals(features)
+
+    @property
+    def feature_rates(self) -> pd.Series:
+        """
+        Percentage of missing values of every feature.
+        """
+        return pd.Series(self.feature_counts / max(len(self.samples), 1) * 100, index=self.features)
+
+    @property
+    def sample_rates(self) -> pd.Series:
+        """
+        Percentage of missing values of every sample.
+        """
+        return pd.Series(self.sample_counts / max(len(self.features), 1) * 100, index=self.samples)
+
+    def feature_mask(self, position: int) -> np.ndarray:
+        """
+        Unpack the missingness mask of one feature.
+
+        Args:
+            position (int): Position of the feature.
+
+        Returns:
+            np.ndarray: Boolean array over samples, True where the value is missing.
+        """
+        return (self.bits[:, position // 8] >> (7 - position % 8) & 1).astype(bool)
+
+    def patterns(self, top_n: int = 10) -> List[Tuple[List[Any], int]]:
+        """
+        Find the most common missingness patterns, i.e. sets of features missing together in a sample.
+
+        Args:
+            top_n (int): Number of patterns to return. Defaults to 10.
+
+        Returns:
+            List[Tuple[List[Any], int]]: The missing features of every pattern and its number of samples,
+            most common first. Samples without missing values are not counted.
+        """
+        rows = self.bits[self.sample_counts > 0]
+        if rows.shape[0] == 0:
+            return []
+
+        patterns, counts = np.unique(rows, axis=0, return_counts=True)
+        order = np.argsort(-counts, kind="stable")[:top_n]
+        result = []
+        for pattern, count in zip(patterns[order], counts[order]):
+            missing = np.unpackbits(pattern, count=len(self.features)).astype(bool)
+            result.append((self.features[missing].tolist(), int(count)))
+        return result
@@ -0,0 +1,199 @@
+import os
+import tempfile
+from typing import Iterator, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+class NumericMatrix:
+    """
+    The numeric block of a dataset stored as a single contiguous 2-D float array
+    (samples x features), optionally memory-mapped to a file.
+
+    The array is column-major, so every feature is a contiguous slice and column-wise
+    statistics and transformations can be applied in place.
+
+    Attributes:
+        values (np.ndarray): 2-D float array of shape (n_samples, n_features).
+        samples (np.ndarray): Sample labels, one per row of `values`.
+        features (np.ndarray): Feature names, one per column of `values`.
+        memmap_dir (Optional[str]): Directory holding the memory-mapped file, or None if in memory.
+    """
+
+    # Number of columns processed at once by block-wise operations
+    BLOCK_SIZE: int = 1024
+
+    def __init__(
+            self,
+            values: np.ndarray,
+            samples: np.ndarray,
+            features: np.ndarray,
+            memmap_dir: Optional[str] = None
+    ) -> None:
+        """
+        Initialize the NumericMatrix instance.
+
+        Args:
+            values (np.ndarray): 2-D float array of shape (n_samples, n_features).
+            samples (np.ndarray): Sample labels.
+            features (np.ndarray): Feature names.
+            memmap_dir (Optional[str]): Directory used for memory-mapped arrays derived from this one.
+        """
+        self.values: np.ndarray = values
+        self.samples: np.ndarray = np.asarray(samples)
+        self.features: np.ndarray = np.asarray(features)
+        self.memmap_dir: Optional[str] = memmap_dir
+
+    def __repr__(self) -> str:
+        """
+        String representation of the NumericMatrix instance.
+
+        Returns:
+            str: A string with the matrix shape, dtype and storage.
+        """
+        storage = "memmap" if self.memmap_dir else "memory"
+        return f"<NumericMatrix(shape: {self.shape}, dtype: {self.values.dtype}, storage: {storage})>"
+
+    @staticmethod
+    def allocate(
+            shape: Tuple[int, int],
+            dtype: Union[str, np.dtype] = "float64",
+            memmap_dir: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Allocate an uninitialized column-major array, in memory or memory-mapped in a directory.
+
+        The memory-mapped file is unlinked as soon as it is mapped, so it does not outlive
+        the array and no files are left behind in the directory.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the array.
+            dtype (Union[str, np.dtype]): Data type of the array. Defaults to float64.
+            memmap_dir (Optional[str]): Directory for the backing file, or None to allocate in memory.
+
+        Returns:
+            np.ndarray: The allocated array.
+        """
+        if memmap_dir is None:
+            return np.empty(shape, dtype=dtype, order="F")
+
+        fd, path = tempfile.mkstemp(prefix="qcp_numeric_", suffix=".npy", dir=memmap_dir)
+        os.close(fd)
+        values = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape, fortran_order=True)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return values
+
+    @classmethod
+    def from_frame(
+            cls,
+            df: pd.DataFrame,
+            columns: Optional[pd.Index] = None,
+            dtype: Union[str, np.dtype] = "float64",
+            memmap_dir: Optional[str] = None
+    ) -> "NumericMatrix":
+        """
+        Build a NumericMatrix from numerical columns of a DataFrame.
+
+        Columns are copied block by block, so only one block is converted at a time.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the numerical columns.
+            columns (Optional[pd.Index]): Columns to include. Defaults to all columns of `df`.
+            dtype (Union[str, np.dtype]): Float data type of the matrix. Defaults to float64.
+            memmap_dir (Optional[str]): Directory for a memory-mapped backing file, or None.
+
+        Returns:
+            NumericMatrix: The numeric block of the DataFrame.
+        """
+        columns = df.columns if columns is None else columns
+        values = cls.allocate((len(df.index), len(columns)), dtype=dtype, memmap_dir=memmap_dir)
+        for start in range(0, len(columns), cls.BLOCK_SIZE):
+            stop = start + cls.BLOCK_SIZE
+            values[:, start:stop] = df[columns[start:stop]].to_numpy(dtype=dtype, na_value=np.nan)
+        return cls(values, df.index.to_numpy(), columns.to_numpy(), memmap_dir=memmap_dir)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self.features)
+
+    @property
+    def index(self) -> pd.Index:
+        return pd.Index(self.samples)
+
+    def blocks(self) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        Iterate over column blocks of the matrix.
+
+        Yields:
+            Tuple[slice, np.ndarray]: The column slice and a writable view of the block.
+        """
+        for start in range(0, self.shape[1], self.BLOCK_SIZE):
+            columns = slice(start, min(start + self.BLOCK_SIZE, self.shape[1]))
+            yield columns, self.values[:, columns]
+
+    def to_frame(self, n_rows: Optional[int] = None, features: Optional[list] = None) -> pd.DataFrame:
+        """
+        Expose the matrix (or part of it) as a DataFrame, for reporting and plotting.
+
+        Without `features`, the DataFrame shares memory with the matrix and must not be modified.
+
+        Args:
+            n_rows (Optional[int]): Only include the first `n_rows` samples.
+            features (Optional[list]): Only include these features (copied).
+
+        Returns:
+            pd.DataFrame: The matrix as a DataFrame indexed by samples.
+        """
+        rows = slice(None, n_rows)
+        if features is not None:
+            positions = self.columns.get_indexer(features)
+            return pd.DataFrame(
+                self.values[rows][:, positions], index=self.samples[rows], columns=self.features[positions]
+            )
+        return pd.DataFrame(self.values[rows], index=self.samples[rows], columns=self.features, copy=False)
+
+    def take_samples(self, positions: np.ndarray) -> "NumericMatrix":
+        """
+        Create a new matrix with the samples at the given row positions.
+
+        Args:
+            positions (np.ndarray): Row positions to keep, in order.
+
+        Returns:
+            NumericMatrix: A matrix with the same storage as this one.
+        """
+        values = self.allocate((len(positions), self.shape[1]), dtype=self.values.dtype, memmap_dir=self.memmap_dir)
+        for columns, block in self.blocks():
+            values[:, columns] = block[positions]
+        return NumericMatrix(values, self.samples[positions], self.features, memmap_dir=self.memmap_dir)
+
+    def drop_features(self, features: list) -> None:
+        """
+        Remove features from the matrix.
+
+        Args:
+            features (list): Names of the features to remove.
+        """
+        # Hash-based lookup; np.isin compares object arrays of names pairwise
+        keep = ~self.columns.isin(features)
+        if keep.all():
+            return
+
+        positions = np.flatnonzero(keep)
+        values = self.allocate((self.shape[0], len(positions)), dtype=self.values.dtype, memmap_dir=self.memmap_dir)
+        for start in range(0, len(positions), self.BLOCK_SIZE):
+            stop = start + self.BLOCK_SIZE
+            values[:, start:stop] = self.values[:, positions[start:stop]]
+        self.values = values
+        self.features = self.features[positions]
@@ -1,18 +1,41 @@
+import os
 from abc import ABC
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, List, Dict, Any, Union
+import numpy as np
 import pandas as pd
 import click
 from pathlib import Path
+from qcp_omics.models.missingness import MissingnessProfile
+from qcp_omics.models.numeric_matrix import NumericMatrix
+from qcp_omics.models.outliers import OutlierCoo
+from qcp_omics.models.sparse_matrix import SparseMatrix
+from qcp_omics.models.streaming_profile import StreamingProfile
+from qcp_omics.models.transform_state import FittedStep, TransformState
+from qcp_omics.report_generation.report_step import report_step
+from qcp_omics.utils.utils import save_dataset_blocks, OUTPUT_FORMATS
 
 class OmicsData(ABC):
     """
     A class for managing and processing omics datasets with associated metadata.
 
     Attributes:
-        data (pd.DataFrame): The primary dataset.
-        data_numerical (Optional[pd.DataFrame]): Subset of the dataset containing numerical data.
+        data (pd.DataFrame): The primary dataset. With a matrix numeric backend, it only holds
+            the non-numerical columns.
+        data_numerical (Optional[Union[pd.DataFrame, NumericMatrix]]): Subset of the dataset containing
+            numerical data. With a matrix numeric backend, it is a NumericMatrix from the start of the pipeline
+            (a SparseMatrix with the sparse backend).
         data_categorical (Optional[pd.DataFrame]): Subset of the dataset containing categorical data.
         test_set (Optional[pd.DataFrame]): A test split of the dataset for testing models.
+        outliers (Optional[OutlierCoo]): Outliers found by `handle_outliers`, in sparse COO format.
+        missingness (Optional[MissingnessProfile]): Missingness profile shared by the missing value steps,
+            reset when they change the dataset.
+        streaming_profile (Optional[StreamingProfile]): Profile of the dataset in streaming memory mode,
+            where the dataset itself is never loaded.
+        dataset_blocks (Optional[Callable[[], Iterator[pd.DataFrame]]]): In streaming memory mode, reads
+            the dataset again one block at a time.
+        transform_state (TransformState): Parameters fitted by the preprocessing steps, applied to the test
+            set and saved with the data files to transform new samples without refitting.
         metadata (dict): Metadata associated with the dataset, including dtypes and processing steps.
         report_data (List[Dict]): A collection of report data for further analysis.
     """
@@ -26,9 +49,14 @@ class OmicsData(ABC):
             metadata (Dict[str, Any]): Metadata containing additional information about the dataset.
         """
         self.data: pd.DataFrame = data
-        self.data_numerical: Optional[pd.DataFrame] = None
+        self.data_numerical: Optional[Union[pd.DataFrame, NumericMatrix]] = None
         self.data_categorical: Optional[pd.DataFrame] = None
         self.test_set: Optional[pd.DataFrame] = None
+        self.outliers: Optional[OutlierCoo] = None
+        self.missingness: Optional[MissingnessProfile] = None
+        self.streaming_profile: Optional[StreamingProfile] = None
+        self.dataset_blocks: Optional[Callable[[], Iterator[pd.DataFrame]]] = None
+        self.transform_state: TransformState = TransformState()
         self.metadata: Dict[str, Any] = metadata
         self.report_data: List[Dict] = []
 
@@ -52,36 +80,239 @@ class OmicsData(ABC):
     def map_dtypes(self) -> None:
         """
         Map the data types of columns in the dataset based on the metadata.
+        Columns that were already parsed with the right type are left untouched.
         """
         click.echo("Mapping the dtypes from metadata with the dataset")
         dtype_mapping = self.metadata.get("dtypes", {})
         for col, dtype in dtype_mapping.items():
             if col in self.data.columns:
+                current_dtype = self.data[col].dtype
                 try:
                     if dtype == "category":
-                        self.data[col] = self.data[col].astype("category")
+                        if not isinstance(current_dtype, pd.CategoricalDtype):
+                            self.data[col] = self.data[col].astype("category")
                     elif dtype == "int":
-                        self.data[col] = self.data[col].astype("int")
+                        if not pd.api.types.is_integer_dtype(current_dtype):
+                            self.data[col] = self.data[col].astype("int")
                     elif dtype == "float":
-                        self.data[col] = self.data[col].astype("float")
+                        if not pd.api.types.is_float_dtype(current_dtype):
+                            self.data[col] = self.data[col].astype("float")
                 except ValueError as e:
                     click.echo(f"Error casting column '{col}' to type '{dtype}': {e}")
 
+    # Object columns with at most this ratio of unique values are stored as category in compact memory mode
+    CATEGORY_UNIQUE_RATIO: float = 0.5
+
+    @property
+    def compact(self) -> bool:
+        """
+        Whether the metadata requests the compact memory mode.
+        """
+        return self.metadata.get("memory_mode", "default") == "compact"
+
+    @property
+    def float_dtype(self) -> np.dtype:
+        """
+        Float data type used for numerical features: float32 in compact memory mode, float64 otherwise.
+        """
+        return np.dtype(np.float32 if self.compact else np.float64)
+
+    @property
+    def n_workers(self) -> int:
+        """
+        Number of worker threads of parallel steps: `n_workers` in the metadata, or the number of CPUs.
+        """
+        return self.metadata.get("n_workers") or os.cpu_count() or 1
+
+    def compact_floats(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Downcast float64 (and float16) columns to float32 in compact memory mode.
+
+        Args:
+            df (pd.DataFrame): DataFrame produced by a processing step.
+
+        Returns:
+            pd.DataFrame: The DataFrame with compact float columns, or unchanged outside compact mode.
+        """
+        if not self.compact:
+            return df
+        float_columns = df.select_dtypes(include=["float64", "float16"]).columns
+        if float_columns.empty:
+            return df
+        return df.astype({col: np.float32 for col in float_columns})
+
+    def _categorical_columns(self) -> pd.Index:
+        """
+        Categorical columns of the dataset, excluding string columns that are only stored as
+        category to save memory.
+
+        Returns:
+            pd.Index: Names of the categorical columns.
+        """
+        dtype_mapping = self.metadata.get("dtypes", {})
+        columns = self.data.select_dtypes(include=["category"]).columns
+        return columns[[dtype_mapping.get(col) not in ("str", "object") for col in columns]]
+
+    @staticmethod
+    def _memory_usage(df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Memory usage of a DataFrame in bytes per column block.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to measure.
+
+        Returns:
+            Dict[str, int]: Bytes used by numerical, categorical and other columns.
+        """
+        usage = df.memory_usage(deep=True, index=False)
+        numerical = df.select_dtypes(include=["number"]).columns
+        categorical = df.select_dtypes(include=["category"]).columns
+        return {
+            "numerical": int(usage[numerical].sum()),
+            "categorical": int(usage[categorical].sum()),
+            "other": int(usage.drop(numerical.union(categorical)).sum())
+        }
+
+    @report_step(output=True)
+    def compact_dtypes(self) -> pd.DataFrame:
+        """
+        Downcast float64 columns to float32, integer columns to the smallest integer type
+        holding their values and low-cardinality string columns to category.
+
+        Returns:
+            pd.DataFrame: Memory usage per column block before and after downcasting.
+        """
+        click.echo("Downcasting the dataset to compact dtypes")
+        before = self._memory_usage(self.data)
+
+        for col in self.data.columns:
+            values = self.data[col]
+            if pd.api.types.is_float_dtype(values.dtype):
+                self.data[col] = values.astype(np.float32)
+            elif pd.api.types.is_integer_dtype(values.dtype):
+                self.data[col] = pd.to_numeric(values, downcast="integer")
+            elif values.dtype == object and len(values) > 0:
+                if values.nunique(dropna=True) <= self.CATEGORY_UNIQUE_RATIO * len(values):
+                    self.data[col] = values.astype("category")
+
+        after = self._memory_usage(self.data)
+        footprint = pd.DataFrame({"before (bytes)": before, "after (bytes)": after})
+        footprint.loc["total"] = footprint.sum()
+        footprint["reduction (%)"] = (
+            (1 - footprint["after (bytes)"] / footprint["before (bytes)"].replace(0, np.nan)) * 100
+        ).round(1).fillna(0)
+        return footprint
+
+    def build_numeric_matrix(self) -> None:
+        """
+        Move the numerical columns of the dataset into a NumericMatrix if the metadata
+        `numeric_backend` is "array" (in memory) or "memmap" (memory-mapped in the output directory),
+        or into a SparseMatrix if it is "sparse".
+        """
+        backend = self.metadata.get("numeric_backend", "dataframe")
+        if backend == "dataframe":
+            return
+
+        click.echo(f"Building the numeric matrix ({backend})")
+        numeric_columns = self.data.select_dtypes(include="number").columns
+        memmap_dir = self.metadata["output_path"] if backend == "memmap" else None
+        matrix_class = SparseMatrix if backend == "sparse" else NumericMatrix
+        matrix = matrix_class.from_frame(
+            self.data, columns=numeric_columns, dtype=self.float_dtype, memmap_dir=memmap_dir
+        )
+        self.data_numerical = matrix
+        self.data = self.data.drop(columns=numeric_columns)
+        if isinstance(matrix, SparseMatrix):
+            click.echo(f"Stored {matrix.density:.1%} of the numerical values")
+
+    # Steps working on a sparse numeric matrix; the others first convert it to a dense one
+    SPARSE_STEPS: List[str] = [
+        "identify_missing_values", "sample_qc", "handle_missing_values", "handle_outliers", "split_train_test",
+        "split_numerical_categorical", "filter_low_variance", "scale_numerical_features",
+        "transform_numerical_features", "descriptive_statistics", "pairwise_correlations_numerical",
+        "evaluate_distribution_features", "dimensionality_reduction"
+    ]
+
+    def _densify(self, reason: str) -> None:
+        """
+        Convert a sparse numeric matrix to a dense one, for operations without a sparse implementation.
+
+        Args:
+            reason (str): Why the matrix is converted, shown to the user.
+        """
+        if isinstance(self.data_numerical, SparseMatrix):
+            click.echo(f"{reason}; converting the sparse numeric matrix to a dense one.")
+            self.data_numerical = self.data_numerical.to_dense()
+
+    # Steps computed from the streaming profile; the others need the dataset in memory
+    STREAMING_STEPS: List[str] = ["identify_missing_values", "handle_outliers", "descriptive_statistics"]
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Whether the metadata requests the streaming memory mode.
+        """
+        return self.metadata.get("memory_mode", "default") == "streaming"
+
+    def profile_stream(self, dataset_blocks: Callable[[], Iterator[pd.DataFrame]]) -> None:
+        """
+        Build the streaming profile of the dataset in one pass over its blocks.
+
+        Args:
+            dataset_blocks (Callable[[], Iterator[pd.DataFrame]]): Returns an iterator over the blocks of
+                the dataset (see `iter_dataset_blocks`); it is kept for steps that need another pass.
+        """
+        click.echo("Profiling the dataset in streaming mode")
+        numeric = [col for col, dtype in self.metadata.get("dtypes", {}).items() if dtype in ("float", "int")]
+        self.dataset_blocks = dataset_blocks
+        self.streaming_profile = StreamingProfile.from_blocks(
+            dataset_blocks(), numeric, row_blocks=self.metadata.get("features_cols", True)
+        )
+
+    def _combined_data(self, n_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Return the dataset with all its columns, joining the numeric matrix back if there is one.
+
+        Args:
+            n_rows (Optional[int]): Only include the first `n_rows` samples.
+
+        Returns:
+            pd.DataFrame: The combined dataset.
+        """
+        data = self.data if n_rows is None else self.data.head(n_rows)
+        if not isinstance(self.data_numerical, NumericMatrix):
+            return data
+        return pd.concat([self.data_numerical.to_frame(n_rows=n_rows), data], axis=1)
+
     @staticmethod
-    def _visualize_data_snapshot(df: pd.DataFrame) -> str:
+    def _visualize_data_snapshot(df: Union[pd.DataFrame, NumericMatrix]) -> str:
         """
         Generate an HTML snapshot of the DataFrame for visualization purposes.
 
         Args:
-            df (pd.DataFrame): The DataFrame to visualize.
+            df (Union[pd.DataFrame, NumericMatrix]): The DataFrame or numeric matrix to visualize.
 
         Returns:
             str: An HTML table representation of the DataFrame.
         """
+        if isinstance(df, NumericMatrix):
+            df = df.to_frame(n_rows=25)
         limited_df = df if len(df.index) <= 25 else df.head(25)
 
         return limited_df.to_html(classes="table table-striped table-bordered table-hover")
 
+    def _record_fit(self, fitted: FittedStep) -> None:
+        """
+        Store the parameters fitted by a step in the transform state, and push the test set through
+        them if the dataset has already been split, so it is transformed like the training data.
+
+        Args:
+            fitted (FittedStep): The parameters fitted by the step.
+        """
+        self.transform_state.add(fitted)
+        if self.test_set is not None and not self.test_set.empty:
+            self.test_set = self.compact_floats(self.transform_state.apply_step(self.test_set, fitted))
+
     def execute_steps(self) -> None:
         """
         Execute a series of processing steps as defined in the metadata.
@@ -92,7 +323,11 @@ class OmicsData(ABC):
             method = step.get("method")
             if step_name:
                 step_impl = getattr(self, step_name, None)
-                if callable(step_impl):
+                if self.streaming and step_name not in self.STREAMING_STEPS:
+                    click.echo(f"Step '{step_name}' needs the whole dataset and is skipped in streaming mode.")
+                elif callable(step_impl):
+                    if step_name not in self.SPARSE_STEPS:
+                        self._densify(f"Step '{step_name}' has no sparse implementation")
                     if method:
                         click.echo(f"Executing step '{step_name}' with method '{method}'...")
                         step_impl(method=method)
@@ -104,37 +339,63 @@ class OmicsData(ABC):
             else:
                 click.echo("Step definition is missing the 'step' key and will be skipped.")
 
+    # Name of the fitted transform state saved in the output directory
+    TRANSFORM_STATE_FILE: str = "transform_state.npz"
+
     def save_data_files(self) -> None:
         """
-        Save train and test data files in CSV format to the specified output path.
-        - Combines `data_numerical` and `data_categorical` into a single train dataset if both are non-empty.
+        Save train and test data files to the specified output path, in the format given by
+        `output_format` in the metadata (CSV by default), keeping the sample index.
+        - Writes `data_numerical` and `data_categorical` side by side as the train dataset if either is non-empty.
         - Saves `test_set` separately if it is not empty.
+        Outputs whose step did not run (the attribute is None) are skipped.
 
-        Logs success or failure of each save operation.
+        Both files are written concurrently, along with the fitted transform state (`transform_state.npz`)
+        if any step was fitted. Logs success or failure of each save operation.
         """
 
         out_path = Path(self.metadata["output_path"])
         out_path.mkdir(parents=True, exist_ok=True)
 
-        train_path = out_path / "train_data.csv"
-        test_path = out_path / "test_data.csv"
+        ext = OUTPUT_FORMATS[self.metadata.get("output_format", "csv")]
+        train_path = out_path / f"train_data{ext}"
+        test_path = out_path / f"test_data{ext}"
 
-        try:
-            if not self.data_numerical.empty or not self.data_categorical.empty:
-                if not self.data_numerical.empty and not self.data_categorical.empty:
-                    train_df = pd.concat([self.data_numerical, self.data_categorical], axis=1)
-                else:
-                    train_df = self.data_numerical if not self.data_numerical.empty else self.data_categorical
+        data_numerical = self.data_numerical
+        if isinstance(data_numerical, NumericMatrix):
+            data_numerical = data_numerical.to_frame()
 
-                train_df.to_csv(train_path, index=False)
-                click.echo(f"Train set successfully saved to {train_path}")
-            else:
-                click.echo(f"No train set created to be saved to {out_path}")
+        # Steps splitting the dataset may not have run, leaving these attributes unset
+        train_blocks = [
+            block for block in (data_numerical, self.data_categorical) if block is not None and not block.empty
+        ]
+        outputs = {}
+        if train_blocks:
+            outputs["Train set"] = (train_path, train_blocks)
+        else:
+            click.echo(f"No train set created to be saved to {out_path}")
 
-            if not self.test_set.empty:
-                self.test_set.to_csv(test_path, index=False)
-                click.echo(f"Test set successfully saved to {test_path}")
-            else:
-                click.echo(f"No test set created to be saved to {out_path}")
-        except Exception as e:
-            click.echo(f"An error occurred while saving data files: {e}")
+        if self.test_set is not None and not self.test_set.empty:
+            outputs["Test set"] = (test_path, [self.test_set])
+        else:
+            click.echo(f"No test set created to be saved to {out_path}")
+
+        if not self.transform_state.empty:
+            state_path = out_path / self.TRANSFORM_STATE_FILE
+            try:
+                self.transform_state.save(str(state_path))
+                click.echo(f"Transform state successfully saved to {state_path}")
+            except Exception as e:
+                click.echo(f"An error occurred while saving the transform state: {e}")
+
+        with ThreadPoolExecutor(max_workers=max(len(outputs), 1)) as executor:
+            futures = {
+                name: executor.submit(save_dataset_blocks, blocks, str(path))
+                for name, (path, blocks) in outputs.items()
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                    click.echo(f"{name} successfully saved to {outputs[name][0]}")
+                except Exception as e:
+                    click.echo(f"An error occurred while saving data files: {e}")
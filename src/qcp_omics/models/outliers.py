@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, NamedTuple, Tuple
+import numpy as np
+import pandas as pd
+
+
+class OutlierCoo(NamedTuple):
+    """
+    Outliers of a numerical dataset in sparse coordinate (COO) format.
+
+    Only the positions and original values of the outliers are stored, sorted by column,
+    so the memory used grows with the number of outliers rather than the dataset size.
+
+    Attributes:
+        rows (np.ndarray): Row (sample) position of every outlier.
+        cols (np.ndarray): Column (feature) position of every outlier.
+        values (np.ndarray): Original value of every outlier, before replacement.
+        samples (np.ndarray): Sample labels of the dataset, indexed by row position.
+        features (np.ndarray): Feature names of the dataset, indexed by column position.
+    """
+
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+    samples: np.ndarray
+    features: np.ndarray
+
+    @classmethod
+    def from_mask(
+            cls,
+            mask: np.ndarray,
+            values: np.ndarray,
+            samples: np.ndarray,
+            features: np.ndarray,
+            col_offset: int = 0
+    ) -> "OutlierCoo":
+        """
+        Collect the outliers flagged in a boolean mask.
+
+        Args:
+            mask (np.ndarray): 2-D boolean array, True where a value is an outlier.
+            values (np.ndarray): 2-D array of values with the shape of `mask`.
+            samples (np.ndarray): Sample labels of the dataset.
+            features (np.ndarray): Feature names of the dataset.
+            col_offset (int): Column position of the first column of `mask` in the dataset,
+                when the mask covers a block of columns.
+
+        Returns:
+            OutlierCoo: The outliers of the mask.
+        """
+        cols, rows = np.nonzero(mask.T)
+        return cls(rows, cols + col_offset, values[rows, cols], np.asarray(samples), np.asarray(features))
+
+    @classmethod
+    def concat(cls, parts: List["OutlierCoo"], samples: np.ndarray, features: np.ndarray) -> "OutlierCoo":
+        """
+        Combine outliers found in consecutive column blocks of the same dataset.
+
+        Args:
+            parts (List[OutlierCoo]): Outliers of every block, in column order.
+            samples (np.ndarray): Sample labels of the dataset.
+            features (np.ndarray): Feature names of the dataset.
+
+        Returns:
+            OutlierCoo: The outliers of the whole dataset.
+        """
+        if not parts:
+            empty = np.empty(0, dtype=np.intp)
+            return cls(empty, empty, np.empty(0), np.asarray(samples), np.asarray(features))
+        return cls(
+            np.concatenate([part.rows for part in parts]),
+            np.concatenate([part.cols for part in parts]),
+            np.concatenate([part.values for part in parts]),
+            np.asarray(samples),
+            np.asarray(features)
+        )
+
+    @property
+    def n_outliers(self) -> int:
+        return len(self.values)
+
+    def _ranked_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        counts = np.bincount(self.cols, minlength=len(self.features))
+        positions = np.flatnonzero(counts)
+        positions = positions[np.argsort(-counts[positions], kind="stable")]
+        return positions, counts[positions]
+
+    def counts(self) -> pd.Series:
+        """
+        Count the outliers of every feature.
+
+        Returns:
+            pd.Series: Number of outliers per feature with at least one, sorted in descending order.
+        """
+        positions, counts = self._ranked_positions()
+        return pd.Series(counts, index=self.features[positions])
+
+    def summary(
+            self,
+            centers: np.ndarray,
+            top_features: int = 20,
+            top_examples: int = 5
+    ) -> Dict[Any, List[Tuple[Any, Any]]]:
+        """
+        Select examples of outliers for the features with the most outliers.
+
+        Args:
+            centers (np.ndarray): Central value (e.g. median) of every feature; the outliers
+                furthest from it are used as examples.
+            top_features (int): Number of features to include. Defaults to 20.
+            top_examples (int): Number of examples per feature. Defaults to 5.
+
+        Returns:
+            Dict[Any, List[Tuple[Any, Any]]]: Feature name to a list of (sample, value) examples.
+        """
+        summary = {}
+        positions, _ = self._ranked_positions()
+        for position in positions[:top_features]:
+            # Outliers are sorted by column, so those of a feature are contiguous
+            selected = np.arange(*np.searchsorted(self.cols, [position, position + 1]))
+            distance = np.abs(self.values[selected] - centers[position])
+            selected = selected[np.argsort(-distance, kind="stable")[:top_examples]]
+            summary[self.features[position]] = list(
+                zip(self.samples[self.rows[selected]].tolist(), self.values[selected].tolist())
+            )
+        return summary
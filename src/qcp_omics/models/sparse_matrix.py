@@ -0,0 +1,188 @@
+from typing import Iterator, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from qcp_omics.models.numeric_matrix import NumericMatrix
+
+
+class SparseMatrix(NumericMatrix):
+    """
+    The numeric block of a dataset stored as a compressed sparse column (CSC) matrix
+    (samples x features), for count data where most values are zeros.
+
+    Only non-zero values are stored; missing values are stored explicitly as NaN. Column blocks
+    are exposed as dense copies, so steps that only read blocks work unchanged, while steps that
+    modify values work on the stored values (`values.data`) and leave the zeros implicit.
+
+    Attributes:
+        values (sparse.csc_matrix): Sparse float matrix of shape (n_samples, n_features).
+        samples (np.ndarray): Sample labels, one per row of `values`.
+        features (np.ndarray): Feature names, one per column of `values`.
+    """
+
+    values: sparse.csc_matrix
+
+    def __init__(self, values: sparse.csc_matrix, samples: np.ndarray, features: np.ndarray) -> None:
+        """
+        Initialize the SparseMatrix instance.
+
+        Args:
+            values (sparse.csc_matrix): Sparse float matrix of shape (n_samples, n_features).
+            samples (np.ndarray): Sample labels.
+            features (np.ndarray): Feature names.
+        """
+        super().__init__(values, samples, features)
+
+    def __repr__(self) -> str:
+        """
+        String representation of the SparseMatrix instance.
+
+        Returns:
+            str: A string with the matrix shape, dtype and density.
+        """
+        return f"<SparseMatrix(shape: {self.shape}, dtype: {self.values.dtype}, density: {self.density:.1%})>"
+
+    @classmethod
+    def from_frame(
+            cls,
+            df: pd.DataFrame,
+            columns: Optional[pd.Index] = None,
+            dtype: Union[str, np.dtype] = "float64",
+            memmap_dir: Optional[str] = None
+    ) -> "SparseMatrix":
+        """
+        Build a SparseMatrix from numerical columns of a DataFrame.
+
+        Columns are converted block by block, so only one dense block exists at a time.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the numerical columns.
+            columns (Optional[pd.Index]): Columns to include. Defaults to all columns of `df`.
+            dtype (Union[str, np.dtype]): Float data type of the matrix. Defaults to float64.
+            memmap_dir (Optional[str]): Unused; sparse matrices are always held in memory.
+
+        Returns:
+            SparseMatrix: The numeric block of the DataFrame.
+        """
+        columns = df.columns if columns is None else columns
+        blocks = [
+            sparse.csc_matrix(df[columns[start:start + cls.BLOCK_SIZE]].to_numpy(dtype=dtype, na_value=np.nan))
+            for start in range(0, len(columns), cls.BLOCK_SIZE)
+        ]
+        values = sparse.hstack(blocks, format="csc", dtype=dtype) if blocks \
+            else sparse.csc_matrix((len(df.index), 0), dtype=dtype)
+        return cls(values, df.index.to_numpy(), columns.to_numpy())
+
+    @property
+    def empty(self) -> bool:
+        return 0 in self.shape
+
+    @property
+    def density(self) -> float:
+        """
+        Fraction of the values that are stored (non-zero or missing).
+        """
+        return self.values.nnz / max(self.shape[0] * self.shape[1], 1)
+
+    def stored_columns(self) -> np.ndarray:
+        """
+        Column position of every stored value, in the order of `values.data`.
+
+        Returns:
+            np.ndarray: One column position per stored value.
+        """
+        return np.repeat(np.arange(self.shape[1]), np.diff(self.values.indptr))
+
+    def blocks(self, fill_value: float = 0.0) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        Iterate over column blocks of the matrix, as dense copies.
+
+        Writing to a block does not change the matrix.
+
+        Args:
+            fill_value (float): Value of the entries that are not stored, e.g. NaN to only see the
+                stored values. Defaults to 0.
+
+        Yields:
+            Tuple[slice, np.ndarray]: The column slice and a dense copy of the block.
+        """
+        for start in range(0, self.shape[1], self.BLOCK_SIZE):
+            columns = slice(start, min(start + self.BLOCK_SIZE, self.shape[1]))
+            block = self.values[:, columns]
+            if fill_value == 0:
+                yield columns, block.toarray(order="F")
+                continue
+            dense = np.full(block.shape, fill_value, dtype=block.dtype, order="F")
+            block = block.tocoo()
+            dense[block.row, block.col] = block.data
+            yield columns, dense
+
+    def to_frame(self, n_rows: Optional[int] = None, features: Optional[list] = None) -> pd.DataFrame:
+        """
+        Copy the matrix (or part of it) to a dense DataFrame, for reporting, plotting and saving.
+
+        Args:
+            n_rows (Optional[int]): Only include the first `n_rows` samples.
+            features (Optional[list]): Only include these features.
+
+        Returns:
+            pd.DataFrame: The matrix as a DataFrame indexed by samples.
+        """
+        rows = slice(None, n_rows)
+        values = self.values[rows]
+        columns = self.features
+        if features is not None:
+            positions = self.columns.get_indexer(features)
+            values = values[:, positions]
+            columns = columns[positions]
+        return pd.DataFrame(values.toarray(), index=self.samples[rows], columns=columns)
+
+    def to_dense(self) -> NumericMatrix:
+        """
+        Convert the matrix to a dense, in-memory NumericMatrix.
+
+        Returns:
+            NumericMatrix: The matrix with every value stored.
+        """
+        return NumericMatrix(self.values.toarray(order="F"), self.samples, self.features)
+
+    def take_samples(self, positions: np.ndarray) -> "SparseMatrix":
+        """
+        Create a new matrix with the samples at the given row positions.
+
+        Args:
+            positions (np.ndarray): Row positions to keep, in order.
+
+        Returns:
+            SparseMatrix: A sparse matrix of the samples.
+        """
+        return SparseMatrix(self.values[positions].tocsc(), self.samples[positions], self.features)
+
+    def drop_features(self, features: list) -> None:
+        """
+        Remove features from the matrix.
+
+        Args:
+            features (list): Names of the features to remove.
+        """
+        keep = ~self.columns.isin(features)
+        if keep.all():
+            return
+
+        positions = np.flatnonzero(keep)
+        self.values = self.values[:, positions].tocsc()
+        self.features = self.features[positions]
+
+    def fill_missing(self, fill: np.ndarray) -> None:
+        """
+        Replace the missing values of every feature in place, dropping fill values of 0 from storage.
+
+        Args:
+            fill (np.ndarray): The fill value of every feature.
+        """
+        data = self.values.data
+        missing = np.flatnonzero(np.isnan(data))
+        if not len(missing):
+            return
+        data[missing] = fill[self.stored_columns()[missing]]
+        self.values.eliminate_zeros()
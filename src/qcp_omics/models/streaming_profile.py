@@ -0,0 +1,530 @@
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+# Capacity of the top level of the quantile sketch; the rank error is roughly 2 / SKETCH_SIZE
+SKETCH_SIZE: int = 200
+
+# Lower levels of the quantile sketch hold 2/3 of the items of the level above, down to this size
+_MIN_LEVEL_SIZE: int = 8
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style quantile sketch of the columns of a dataset read in row chunks.
+
+    Items are kept in levels, level h holding items of weight 2**h. When a column holds more
+    items in a level than the level capacity, its items are sorted and every other one is
+    promoted to the next level, so the sketch keeps O(k) items per column however many rows
+    are added. All columns share the levels, stored as 2-D arrays (items x columns) padded
+    with NaN, so updates and queries are vectorized over columns. Quantiles are exact as long
+    as no compaction happened, i.e. for columns with at most `k` values.
+
+    Attributes:
+        k (int): Capacity of the top level.
+        levels (List[np.ndarray]): Items of every level, NaN where a column has no item.
+    """
+
+    def __init__(self, n_columns: int, k: int = SKETCH_SIZE, seed: int = 0) -> None:
+        """
+        Initialize an empty sketch.
+
+        Args:
+            n_columns (int): Number of columns.
+            k (int): Capacity of the top level. Defaults to SKETCH_SIZE.
+            seed (int): Seed of the random offsets of compactions. Defaults to 0.
+        """
+        self.k: int = k
+        self.levels: List[np.ndarray] = [np.empty((0, n_columns))]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def n_columns(self) -> int:
+        return self.levels[0].shape[1]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), _MIN_LEVEL_SIZE)
+
+    def _compact(self, level: int) -> None:
+        """
+        Halve the items of the columns over capacity in a level, promoting every other
+        sorted item to the next level with twice the weight.
+        """
+        values = np.sort(self.levels[level], axis=0)
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+        n_pairs = np.where(counts > self._capacity(level), counts // 2, 0)
+
+        offset = int(self._rng.integers(2))
+        promoted = values[offset:offset + 2 * n_pairs.max():2]
+        promoted = np.where(np.arange(len(promoted))[:, np.newaxis] < n_pairs, promoted, np.nan)
+
+        # Items not paired stay in the level, moved to the top of their column
+        n_kept = counts - 2 * n_pairs
+        rows = np.arange(n_kept.max())[:, np.newaxis]
+        kept = np.take_along_axis(values, np.minimum(2 * n_pairs + rows, len(values) - 1), axis=0)
+        self.levels[level] = np.where(rows < n_kept, kept, np.nan)
+
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty((0, self.n_columns)))
+        self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                self._compact(level)
+            level += 1
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add a chunk of rows to the sketch.
+
+        Args:
+            values (np.ndarray): 2-D float array (rows x columns), NaN where a value is missing.
+        """
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Add the items of a sketch of other rows of the same columns, level by level.
+
+        Args:
+            other (QuantileSketch): Sketch of the other rows.
+        """
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty((0, self.n_columns)))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    @classmethod
+    def hstack(cls, sketches: Sequence["QuantileSketch"], k: int = SKETCH_SIZE) -> "QuantileSketch":
+        """
+        Combine sketches of consecutive blocks of columns of the same rows.
+
+        Args:
+            sketches (Sequence[QuantileSketch]): Sketches of every block, in column order.
+            k (int): Capacity of the top level of the combined sketch. Defaults to SKETCH_SIZE.
+
+        Returns:
+            QuantileSketch: The sketch of all columns.
+        """
+        sketch = cls(sum(part.n_columns for part in sketches), k=k)
+        n_levels = max((len(part.levels) for part in sketches), default=1)
+        levels = []
+        for level in range(n_levels):
+            parts = [part.levels[level] if level < len(part.levels) else np.empty((0, part.n_columns))
+                     for part in sketches]
+            n_items = max(len(part) for part in parts)
+            levels.append(np.hstack([
+                np.pad(part, ((0, n_items - len(part)), (0, 0)), constant_values=np.nan) for part in parts
+            ]))
+        if levels:
+            sketch.levels = levels
+        return sketch
+
+    def quantiles(self, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles of every column.
+
+        Quantiles are linearly interpolated between the two closest weighted ranks, which
+        matches `np.nanpercentile` while all items still have weight 1.
+
+        Args:
+            quantiles (Sequence[float]): Quantiles to compute, between 0 and 1.
+
+        Returns:
+            np.ndarray: Array of shape (len(quantiles), n_columns); NaN for columns without values.
+        """
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        weights = np.where(np.isnan(values), 0, weights[:, np.newaxis])
+
+        order = np.argsort(values, axis=0)
+        values = np.take_along_axis(values, order, axis=0)
+        cumulative = np.cumsum(np.take_along_axis(weights, order, axis=0), axis=0)
+        total = cumulative[-1] if len(cumulative) else np.zeros(self.n_columns)
+        last = np.maximum(len(values) - 1, 0)
+
+        result = np.full((len(quantiles), self.n_columns), np.nan)
+        if len(values) == 0:
+            return result
+        for i, q in enumerate(quantiles):
+            position = q * np.maximum(total - 1, 0)
+            lower = np.floor(position)
+            # The item holding a rank is the first one whose cumulative weight exceeds it
+            low = np.minimum(np.count_nonzero(cumulative <= lower, axis=0), last)
+            high = np.minimum(np.count_nonzero(cumulative <= lower + 1, axis=0), last)
+            low_values = np.take_along_axis(values, low[np.newaxis], axis=0)[0]
+            high_values = np.take_along_axis(values, high[np.newaxis], axis=0)[0]
+            high_values = np.where(lower + 1 < total, high_values, low_values)
+            result[i] = low_values + (high_values - low_values) * (position - lower)
+        result[:, total == 0] = np.nan
+        return result
+
+
+class Moments(NamedTuple):
+    """
+    Count and central moment sums of every column, merged chunk by chunk with the parallel
+    form of Welford's algorithm (Chan et al., extended to third and fourth moments by Pébay).
+
+    Attributes:
+        n_values (np.ndarray): Number of non-missing values.
+        mean (np.ndarray): Mean of the values.
+        m2 (np.ndarray): Sum of squared deviations from the mean.
+        m3 (np.ndarray): Sum of cubed deviations from the mean.
+        m4 (np.ndarray): Sum of deviations from the mean to the fourth power.
+    """
+
+    n_values: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    m3: np.ndarray
+    m4: np.ndarray
+
+    @classmethod
+    def empty(cls, n_columns: int) -> "Moments":
+        zeros = np.zeros(n_columns)
+        return cls(zeros.copy(), zeros.copy(), zeros.copy(), zeros.copy(), zeros.copy())
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "Moments":
+        """
+        Compute the moments of a chunk of rows.
+
+        Args:
+            values (np.ndarray): 2-D float array (rows x columns), NaN where a value is missing.
+
+        Returns:
+            Moments: The moments of every column of the chunk.
+        """
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+        deviations = np.where(present, values - mean, 0.0)
+        squared = deviations ** 2
+        return cls(
+            count, mean, squared.sum(axis=0), (squared * deviations).sum(axis=0), (squared ** 2).sum(axis=0)
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["Moments"]) -> "Moments":
+        """
+        Combine the moments of consecutive blocks of columns.
+        """
+        return cls(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+    def merge(self, other: "Moments") -> "Moments":
+        """
+        Merge the moments of other rows of the same columns.
+
+        Args:
+            other (Moments): Moments of the other rows.
+
+        Returns:
+            Moments: The moments of all rows.
+        """
+        n_a, n_b = self.n_values, other.n_values
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            ratio = np.where(n > 0, n_b / n, 0.0)
+            mean = self.mean + delta * ratio
+            # n_a * n_b / n, written so that it stays finite for large counts
+            weight = n_a * ratio
+            m2 = self.m2 + other.m2 + delta ** 2 * weight
+            m3 = (
+                self.m3 + other.m3
+                + delta ** 3 * weight * np.where(n > 0, (n_a - n_b) / n, 0.0)
+                + 3 * delta * np.where(n > 0, (n_a * other.m2 - n_b * self.m2) / n, 0.0)
+            )
+            m4 = (
+                self.m4 + other.m4
+                + delta ** 4 * weight * np.where(n > 0, (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 2, 0.0)
+                + 6 * delta ** 2 * np.where(n > 0, (n_a ** 2 * other.m2 + n_b ** 2 * self.m2) / n ** 2, 0.0)
+                + 4 * delta * np.where(n > 0, (n_a * other.m3 - n_b * self.m3) / n, 0.0)
+            )
+        return Moments(n, mean, m2, m3, m4)
+
+    def std(self) -> np.ndarray:
+        """
+        Sample standard deviation (ddof=1); NaN for columns with fewer than 2 values.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n_values > 1, np.sqrt(self.m2 / (self.n_values - 1)), np.nan)
+
+    def skewness(self) -> np.ndarray:
+        """
+        Unbiased skewness, as computed by `pd.DataFrame.skew`.
+        """
+        n = self.n_values
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = n * np.sqrt(n - 1) / (n - 2) * self.m3 / self.m2 ** 1.5
+        result = np.where(self.m2 == 0, 0.0, result)
+        return np.where(n < 3, np.nan, result)
+
+    def kurtosis(self) -> np.ndarray:
+        """
+        Unbiased excess kurtosis, as computed by `pd.DataFrame.kurt`.
+        """
+        n = self.n_values
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = (
+                n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2)
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            )
+        result = np.where(self.m2 == 0, 0.0, result)
+        return np.where(n < 4, np.nan, result)
+
+
+class StreamingProfile:
+    """
+    Quality control profile of a dataset built one chunk at a time, without holding the
+    dataset in memory: missing values of every feature and sample, and moments, range and
+    a quantile sketch of every numerical feature.
+
+    Profiles of chunks of rows are combined with `merge`, and profiles of chunks of features
+    (of the same samples) with `concat`.
+
+    Attributes:
+        features (pd.Index): All features of the dataset.
+        numeric (pd.Index): Numerical features, profiled beyond missing values.
+        samples (pd.Index): Sample labels, in row order.
+        feature_counts (np.ndarray): Number of missing values of every feature.
+        sample_counts (np.ndarray): Number of missing values of every sample.
+        moments (Moments): Moments of every numerical feature.
+        minimum (np.ndarray): Minimum of every numerical feature.
+        maximum (np.ndarray): Maximum of every numerical feature.
+        sketch (QuantileSketch): Quantile sketch of every numerical feature.
+    """
+
+    def __init__(
+            self,
+            features: pd.Index,
+            numeric: pd.Index,
+            samples: pd.Index,
+            feature_counts: np.ndarray,
+            sample_counts: np.ndarray,
+            moments: Moments,
+            minimum: np.ndarray,
+            maximum: np.ndarray,
+            sketch: QuantileSketch
+    ) -> None:
+        """
+        Initialize the StreamingProfile instance.
+
+        Args:
+            features (pd.Index): All features of the dataset.
+            numeric (pd.Index): Numerical features.
+            samples (pd.Index): Sample labels.
+            feature_counts (np.ndarray): Number of missing values of every feature.
+            sample_counts (np.ndarray): Number of missing values of every sample.
+            moments (Moments): Moments of every numerical feature.
+            minimum (np.ndarray): Minimum of every numerical feature.
+            maximum (np.ndarray): Maximum of every numerical feature.
+            sketch (QuantileSketch): Quantile sketch of every numerical feature.
+        """
+        self.features: pd.Index = features
+        self.numeric: pd.Index = numeric
+        self.samples: pd.Index = samples
+        self.feature_counts: np.ndarray = feature_counts
+        self.sample_counts: np.ndarray = sample_counts
+        self.moments: Moments = moments
+        self.minimum: np.ndarray = minimum
+        self.maximum: np.ndarray = maximum
+        self.sketch: QuantileSketch = sketch
+
+    def __repr__(self) -> str:
+        """
+        String representation of the StreamingProfile instance.
+
+        Returns:
+            str: A string with the profile shape.
+        """
+        return (f"<StreamingProfile(samples: {len(self.samples)}, features: {len(self.features)}, "
+                f"numerical: {len(self.numeric)})>")
+
+    @classmethod
+    def from_frame(
+            cls, df: pd.DataFrame, numeric: Iterable[str], sketch_size: int = SKETCH_SIZE
+    ) -> "StreamingProfile":
+        """
+        Profile one chunk of a dataset.
+
+        Args:
+            df (pd.DataFrame): The chunk, with samples in rows and features in columns.
+            numeric (Iterable[str]): Numerical features of the dataset; those in `df` are profiled.
+            sketch_size (int): Capacity of the quantile sketch. Defaults to SKETCH_SIZE.
+
+        Returns:
+            StreamingProfile: The profile of the chunk.
+        """
+        numeric_set = set(numeric)
+        numeric_columns = df.columns[[col in numeric_set for col in df.columns]]
+        missing = df.isna().to_numpy()
+        values = df[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        sketch = QuantileSketch(len(numeric_columns), k=sketch_size)
+        sketch.update(values)
+        with np.errstate(invalid="ignore"):
+            minimum = np.fmin.reduce(values, axis=0, initial=np.inf)
+            maximum = np.fmax.reduce(values, axis=0, initial=-np.inf)
+        return cls(
+            df.columns, numeric_columns, df.index, missing.sum(axis=0), missing.sum(axis=1),
+            Moments.from_values(values), minimum, maximum, sketch
+        )
+
+    @classmethod
+    def from_blocks(
+            cls,
+            blocks: Iterable[pd.DataFrame],
+            numeric: Iterable[str],
+            row_blocks: bool = True,
+            sketch_size: int = SKETCH_SIZE
+    ) -> Optional["StreamingProfile"]:
+        """
+        Profile a dataset read block by block.
+
+        Args:
+            blocks (Iterable[pd.DataFrame]): Blocks of the dataset, with samples in rows and features in columns.
+            numeric (Iterable[str]): Numerical features of the dataset.
+            row_blocks (bool): True if blocks are consecutive samples with all features, False if they
+                are consecutive features with all samples. Defaults to True.
+            sketch_size (int): Capacity of the quantile sketch. Defaults to SKETCH_SIZE.
+
+        Returns:
+            Optional[StreamingProfile]: The profile of the dataset, or None if there are no blocks.
+        """
+        numeric = list(numeric)
+        if not row_blocks:
+            parts = [cls.from_frame(block, numeric, sketch_size=sketch_size) for block in blocks]
+            return cls.concat(parts, sketch_size=sketch_size) if parts else None
+
+        profile = None
+        for block in blocks:
+            part = cls.from_frame(block, numeric, sketch_size=sketch_size)
+            profile = part if profile is None else profile.merge(part)
+        return profile
+
+    def merge(self, other: "StreamingProfile") -> "StreamingProfile":
+        """
+        Combine with the profile of the next samples of the same features.
+
+        Args:
+            other (StreamingProfile): Profile of the next samples.
+
+        Returns:
+            StreamingProfile: The profile of the samples of both, updated in place.
+        """
+        self.samples = self.samples.append(other.samples)
+        self.feature_counts = self.feature_counts + other.feature_counts
+        self.sample_counts = np.concatenate([self.sample_counts, other.sample_counts])
+        self.moments = self.moments.merge(other.moments)
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @classmethod
+    def concat(cls, parts: Sequence["StreamingProfile"], sketch_size: int = SKETCH_SIZE) -> "StreamingProfile":
+        """
+        Combine profiles of consecutive blocks of features of the same samples.
+
+        Args:
+            parts (Sequence[StreamingProfile]): Profiles of every block, in feature order.
+            sketch_size (int): Capacity of the combined quantile sketch. Defaults to SKETCH_SIZE.
+
+        Returns:
+            StreamingProfile: The profile of all features.
+        """
+        return cls(
+            parts[0].features.append([part.features for part in parts[1:]]),
+            parts[0].numeric.append([part.numeric for part in parts[1:]]),
+            parts[0].samples,
+            np.concatenate([part.feature_counts for part in parts]),
+            np.sum([part.sample_counts for part in parts], axis=0),
+            Moments.concat([part.moments for part in parts]),
+            np.concatenate([part.minimum for part in parts]),
+            np.concatenate([part.maximum for part in parts]),
+            QuantileSketch.hstack([part.sketch for part in parts], k=sketch_size)
+        )
+
+    @property
+    def feature_rates(self) -> pd.Series:
+        """
+        Percentage of missing values of every feature.
+        """
+        return pd.Series(self.feature_counts / max(len(self.samples), 1) * 100, index=self.features)
+
+    @property
+    def sample_rates(self) -> pd.Series:
+        """
+        Percentage of missing values of every sample.
+        """
+        return pd.Series(self.sample_counts / max(len(self.features), 1) * 100, index=self.samples)
+
+    def quantiles(self, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles of every numerical feature from the sketch.
+
+        Args:
+            quantiles (Sequence[float]): Quantiles to compute, between 0 and 1.
+
+        Returns:
+            np.ndarray: Array of shape (len(quantiles), n_numeric).
+        """
+        return self.sketch.quantiles(quantiles)
+
+    def statistics(self) -> pd.DataFrame:
+        """
+        Descriptive statistics of every numerical feature, with the columns of `DataFrame.describe`
+        plus kurtosis and skewness. Quartiles are estimated from the quantile sketch.
+
+        Returns:
+            pd.DataFrame: A DataFrame with one row of statistics per numerical feature.
+        """
+        count = self.moments.n_values
+        has_values = count > 0
+        quartiles = self.quantiles([0.25, 0.5, 0.75])
+        return pd.DataFrame(
+            np.column_stack([
+                count,
+                np.where(has_values, self.moments.mean, np.nan),
+                self.moments.std(),
+                np.where(has_values, self.minimum, np.nan),
+                *quartiles,
+                np.where(has_values, self.maximum, np.nan),
+                self.moments.kurtosis(),
+                self.moments.skewness(),
+            ]),
+            index=self.numeric,
+            columns=["count", "mean", "std", "min", "25%", "50%", "75%", "max", "kurtosis", "skewness"]
+        )
+
+    def outlier_bounds(self, method: str = "iqr", threshold: float = 3.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Range of non-outlier values of every numerical feature.
+
+        Args:
+            method (str): "iqr" for the quartiles -/+ 1.5 times the interquartile range, or "zscore" for the
+                mean -/+ `threshold` standard deviations. Defaults to "iqr".
+            threshold (float): The z-score threshold. Defaults to 3.0.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Lower and upper bounds of every numerical feature.
+
+        Raises:
+            ValueError: If the method cannot be computed from the profile.
+        """
+        if method == "iqr":
+            q1, q3 = self.quantiles([0.25, 0.75])
+            iqr = q3 - q1
+            return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        if method == "zscore":
+            std = self.moments.std()
+            return self.moments.mean - threshold * std, self.moments.mean + threshold * std
+        raise ValueError(f"Outlier method '{method}' cannot be computed from a streaming profile.")
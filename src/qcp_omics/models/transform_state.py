@@ -0,0 +1,253 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+import numpy as np
+import pandas as pd
+from scipy.special import boxcox
+
+# Version of the saved transform state format, checked when loading
+STATE_FORMAT_VERSION: int = 1
+
+# Elementwise transformations of numerical features, applied in place with NumPy ufuncs
+ELEMENTWISE_TRANSFORMS: Dict[str, np.ufunc] = {
+    "log2": np.log2,
+    "log1p": np.log1p,
+    "asinh": np.arcsinh,
+    "sqrt": np.sqrt
+}
+
+
+class FittedStep(NamedTuple):
+    """
+    Parameters fitted by one preprocessing step.
+
+    Parameters are applied in this order, each only if the step fitted it:
+    - "dropped": features removed from the dataset;
+    - "modes": fill value of missing values of every categorical feature;
+    - "fill": fill value of missing values of every numerical feature;
+    - "lower", "upper" and "median": values outside the bounds are replaced with the median, except
+      zeros if "skip_zeros" is set (bounds fitted on the non-zero values of a sparse matrix);
+    - "center" and "scale": values are centered and divided by the scale;
+    - "shift", "transformed" and "lambdas": values are shifted, then the transformed features go
+      through the step's method (Box-Cox or Yeo-Johnson with one lambda per feature, or an
+      elementwise transformation of `ELEMENTWISE_TRANSFORMS`).
+
+    Attributes:
+        step (str): Name of the step.
+        method (Optional[str]): Method the step ran with.
+        params (Dict[str, Any]): Fitted parameters. NumPy arrays hold one value per feature of the
+            "features" list; other values must be JSON serializable.
+    """
+
+    step: str
+    method: Optional[str]
+    params: Dict[str, Any]
+
+
+def yeo_johnson(values: np.ndarray, lambdas: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    Apply the Yeo-Johnson transformation to every column of an array, vectorized over columns.
+
+    Matches `scipy.stats.yeojohnson` with a given lambda, which only takes one lambda and a 1-D array.
+
+    Args:
+        values (np.ndarray): Values to transform (samples x features).
+        lambdas (Union[float, np.ndarray]): One lambda, or one lambda per column.
+
+    Returns:
+        np.ndarray: The transformed values; NaN values stay NaN.
+    """
+    lambdas = np.broadcast_to(np.asarray(lambdas, dtype=np.float64), values.shape[-1:])
+    with np.errstate(invalid="ignore"):
+        positive = np.log1p(np.where(values >= 0, values, 0))
+        negative = np.log1p(np.where(values >= 0, 0, -values))
+    # Positive and negative values are transformed separately; each term is 0 for the other values
+    result = np.expm1(lambdas * positive) / np.where(lambdas == 0, 1, lambdas)
+    result[:, lambdas == 0] = positive[:, lambdas == 0]
+    negative_part = np.expm1((2 - lambdas) * negative) / np.where(lambdas == 2, 1, 2 - lambdas)
+    negative_part[:, lambdas == 2] = negative[:, lambdas == 2]
+    result -= negative_part
+    return result
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars (e.g. category values) are saved as the matching Python values
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TransformState:
+    """
+    Parameters fitted by the preprocessing steps of a pipeline, in the order the steps ran.
+
+    Applying the state pushes new samples (the test set, or later batches) through the same
+    transformations as the training data, with vectorized NumPy operations and no refitting.
+    The state is saved as a compressed `.npz` file holding the fitted arrays and a JSON header
+    with everything else, so loading it never unpickles objects.
+
+    Attributes:
+        steps (List[FittedStep]): Fitted steps, in the order they ran.
+    """
+
+    def __init__(self, steps: Optional[List[FittedStep]] = None) -> None:
+        """
+        Initialize the TransformState instance.
+
+        Args:
+            steps (Optional[List[FittedStep]]): Fitted steps, in the order they ran.
+        """
+        self.steps: List[FittedStep] = list(steps) if steps else []
+
+    def __repr__(self) -> str:
+        """
+        String representation of the TransformState instance.
+
+        Returns:
+            str: A string with the names of the fitted steps.
+        """
+        return f"<TransformState(steps: {[fitted.step for fitted in self.steps]})>"
+
+    @property
+    def empty(self) -> bool:
+        """
+        Whether no step has been fitted yet.
+        """
+        return not self.steps
+
+    def add(self, fitted: FittedStep) -> None:
+        """
+        Append the parameters fitted by a step.
+
+        Args:
+            fitted (FittedStep): The fitted step.
+        """
+        self.steps.append(fitted)
+
+    def save(self, path: str) -> None:
+        """
+        Save the state to a compressed `.npz` file.
+
+        Args:
+            path (str): Path of the file; NumPy adds the `.npz` extension if it is missing.
+        """
+        steps = []
+        arrays: Dict[str, Any] = {}
+        for position, fitted in enumerate(self.steps):
+            params = {}
+            names = []
+            for name, value in fitted.params.items():
+                if isinstance(value, np.ndarray):
+                    arrays[f"{position}.{name}"] = value
+                    names.append(name)
+                else:
+                    params[name] = value
+            steps.append({"step": fitted.step, "method": fitted.method, "params": params, "arrays": names})
+
+        header = json.dumps({"version": STATE_FORMAT_VERSION, "steps": steps}, default=_json_default)
+        np.savez_compressed(path, header=np.array(header), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "TransformState":
+        """
+        Load a state saved with `save`.
+
+        Args:
+            path (str): Path of the `.npz` file.
+
+        Returns:
+            TransformState: The loaded state.
+
+        Raises:
+            ValueError: If the file was saved in another format version.
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            header = json.loads(archive["header"].item())
+            if header.get("version") != STATE_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported transform state version {header.get('version')}, expected {STATE_FORMAT_VERSION}."
+                )
+            steps = []
+            for position, entry in enumerate(header["steps"]):
+                params = dict(entry["params"])
+                for name in entry["arrays"]:
+                    params[name] = archive[f"{position}.{name}"]
+                steps.append(FittedStep(entry["step"], entry["method"], params))
+        return cls(steps)
+
+    def apply(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Push samples through every fitted step, in order.
+
+        Args:
+            data (pd.DataFrame): Samples (rows) with the features of the dataset the state was fitted on.
+
+        Returns:
+            pd.DataFrame: The transformed samples; `data` is left unchanged.
+        """
+        for fitted in self.steps:
+            data = self.apply_step(data, fitted)
+        return data
+
+    @staticmethod
+    def apply_step(data: pd.DataFrame, fitted: FittedStep) -> pd.DataFrame:
+        """
+        Push samples through the parameters fitted by one step.
+
+        Numerical features are converted to one float array, transformed with vectorized
+        operations and written back at once.
+
+        Args:
+            data (pd.DataFrame): Samples (rows) with the features of the dataset the state was fitted on.
+            fitted (FittedStep): The fitted step.
+
+        Returns:
+            pd.DataFrame: The transformed samples; `data` is left unchanged.
+
+        Raises:
+            ValueError: If features the step was fitted on are missing from `data`.
+        """
+        params = fitted.params
+        data = data.drop(columns=params.get("dropped", []), errors="ignore")
+
+        modes = {col: value for col, value in params.get("modes", {}).items() if col in data.columns}
+        if modes:
+            # Categorical columns of a batch only accept the fitted mode once it is one of their categories
+            for col, value in modes.items():
+                column = data[col]
+                if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+                    data[col] = column.cat.add_categories([value])
+            data = data.fillna(modes)
+
+        if "features" not in params:
+            return data
+        features = pd.Index(params["features"])
+        missing = features.difference(data.columns)
+        if len(missing):
+            raise ValueError(
+                f"Step '{fitted.step}' was fitted on features missing from the data: {list(missing[:5])}"
+            )
+
+        values = data[features].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if "fill" in params:
+                np.copyto(values, np.broadcast_to(params["fill"], values.shape), where=np.isnan(values))
+            if "median" in params:
+                outliers = (values < params["lower"]) | (values > params["upper"])
+                if params.get("skip_zeros"):
+                    outliers &= values != 0
+                np.copyto(values, np.broadcast_to(params["median"], values.shape), where=outliers)
+            if "scale" in params:
+                values -= params["center"]
+                values /= params["scale"]
+            if "shift" in params:
+                values += params["shift"]
+                transformed = np.flatnonzero(params["transformed"])
+                if fitted.method == "box-cox":
+                    values[:, transformed] = boxcox(values[:, transformed], params["lambdas"][transformed])
+                elif fitted.method == "yeo-johnson":
+                    values[:, transformed] = yeo_johnson(values[:, transformed], params["lambdas"][transformed])
+                elif fitted.method in ELEMENTWISE_TRANSFORMS:
+                    ELEMENTWISE_TRANSFORMS[fitted.method](values, out=values, where=params["transformed"])
+
+        data[features] = values
+        return data
@@ -35,7 +35,7 @@ def report_step(
             try:
                 # Capture the specified data snapshot
                 if snapshot == "combined":
-                    data_snapshot = self._visualize_data_snapshot(self.data)
+                    data_snapshot = self._visualize_data_snapshot(self._combined_data(n_rows=25))
                 elif snapshot == "split":
                     data_snapshot = (
                         self._visualize_data_snapshot(self.data_numerical),
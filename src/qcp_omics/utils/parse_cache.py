@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import click
+import numpy as np
+import pandas as pd
+from qcp_omics.utils.utils import release_dataset
+
+
+# Name of the cache directory created inside the output path
+CACHE_DIR_NAME: str = ".qcp_cache"
+
+# Total size of cached datasets kept on disk; least recently used entries are evicted beyond it
+CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+# Bumped whenever the layout of cache entries changes, so stale entries are never read
+CACHE_VERSION: int = 2
+
+# Name of the file holding the index, the non-float columns and the column order of a cache entry
+FRAME_FILE: str = "frame.npz"
+
+_HASH_BLOCK_SIZE: int = 1024 * 1024
+
+
+def dataset_hash(dataset_path: str) -> str:
+    """
+    Hash the content of a dataset file.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(dataset_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(dataset_path: str, dtypes: Optional[Dict[str, str]], features_cols: bool) -> str:
+    """
+    Build the key of a parsed dataset from the file content and the metadata used to parse it.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes of the dataset features.
+        features_cols (bool): Whether features are in columns in the file.
+
+    Returns:
+        str: The cache key.
+    """
+    params = json.dumps(
+        {"version": CACHE_VERSION, "dtypes": dtypes or {}, "features_cols": features_cols}, sort_keys=True
+    )
+    params_hash = hashlib.blake2b(params.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{dataset_hash(dataset_path)}-{params_hash}"
+
+
+def _entry_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+
+def _encode_values(values: pd.Series, prefix: str, arrays: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add the arrays encoding a column (or index) to `arrays`, without object arrays.
+
+    Args:
+        values (pd.Series): The values to encode.
+        prefix (str): Prefix of the array names.
+        arrays (Dict[str, np.ndarray]): Arrays of the entry, updated in place.
+
+    Returns:
+        Dict[str, Any]: JSON description needed to decode the arrays.
+
+    Raises:
+        ValueError: If the values cannot be stored without pickling them.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        arrays[f"{prefix}.codes"] = values.cat.codes.to_numpy()
+        categories = _encode_values(pd.Series(values.cat.categories), f"{prefix}.categories", arrays)
+        return {"kind": "category", "ordered": bool(values.cat.ordered), "categories": categories}
+
+    if values.dtype == object:
+        missing = values.isna().to_numpy()
+        present = values[~missing]
+        if not all(isinstance(value, str) for value in present):
+            raise ValueError(f"'{values.name}' holds values other than strings")
+        arrays[f"{prefix}.missing"] = missing
+        arrays[prefix] = np.array(values.where(~missing, "").tolist(), dtype=str)
+        return {"kind": "object"}
+
+    array = values.to_numpy()
+    if array.dtype == object:
+        raise ValueError(f"'{values.name}' has unsupported dtype {values.dtype}")
+    arrays[prefix] = array
+    return {"kind": "array"}
+
+
+def _decode_values(description: Dict[str, Any], prefix: str, archive: Any) -> Any:
+    """
+    Decode values encoded with `_encode_values`.
+
+    Args:
+        description (Dict[str, Any]): JSON description returned by `_encode_values`.
+        prefix (str): Prefix of the array names.
+        archive (Any): The loaded `.npz` archive.
+
+    Returns:
+        Any: The values, as an array or a Categorical.
+    """
+    if description["kind"] == "category":
+        categories = _decode_values(description["categories"], f"{prefix}.categories", archive)
+        return pd.Categorical.from_codes(
+            archive[f"{prefix}.codes"], categories=categories, ordered=description["ordered"]
+        )
+    if description["kind"] == "object":
+        values = archive[prefix].astype(object)
+        values[archive[f"{prefix}.missing"]] = np.nan
+        return values
+    return archive[prefix]
+
+
+def store_dataset(df: pd.DataFrame, entry: Path) -> None:
+    """
+    Store a parsed dataset in a cache entry directory.
+
+    Float64 columns are written as one column-major NumPy array that can be memory-mapped
+    back. The remaining columns and the index are written to an `.npz` file with a JSON header
+    holding the column order, without pickling any object.
+
+    Args:
+        df (pd.DataFrame): The parsed dataset.
+        entry (Path): Directory of the cache entry; it is replaced if it exists.
+
+    Raises:
+        ValueError: If a column holds values that cannot be stored without pickling them.
+    """
+    numeric = [col for col in df.columns if df[col].dtype == np.float64]
+    numeric_set = set(numeric)
+
+    arrays: Dict[str, Any] = {}
+    header = {
+        "columns": list(df.columns),
+        "numeric": numeric,
+        "columns_name": df.columns.name,
+        "index": _encode_values(pd.Series(df.index, name=df.index.name), "index", arrays),
+        "index_name": df.index.name,
+        "others": [
+            _encode_values(df.iloc[:, position], f"column{position}", arrays)
+            if col not in numeric_set else None
+            for position, col in enumerate(df.columns)
+        ]
+    }
+
+    tmp_entry = entry.with_name(entry.name + ".tmp")
+    shutil.rmtree(tmp_entry, ignore_errors=True)
+    tmp_entry.mkdir(parents=True)
+
+    if numeric:
+        values = np.lib.format.open_memmap(
+            tmp_entry / "numeric.npy", mode="w+", dtype=np.float64, shape=(len(df.index), len(numeric)),
+            fortran_order=True
+        )
+        for position, col in enumerate(numeric):
+            values[:, position] = df[col].to_numpy()
+        values.flush()
+        del values
+
+    np.savez(tmp_entry / FRAME_FILE, header=np.array(json.dumps(header)), **arrays)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp_entry, entry)
+
+
+def load_entry(entry: Path) -> pd.DataFrame:
+    """
+    Load a parsed dataset from a cache entry directory.
+
+    The float block is memory-mapped copy-on-write: it is read lazily from disk and changes
+    made by the pipeline never reach the cache file.
+
+    Args:
+        entry (Path): Directory of the cache entry.
+
+    Returns:
+        pd.DataFrame: The parsed dataset.
+    """
+    with np.load(entry / FRAME_FILE, allow_pickle=False) as archive:
+        header = json.loads(archive["header"].item())
+        index = pd.Index(_decode_values(header["index"], "index", archive), name=header["index_name"])
+        others = {
+            position: _decode_values(description, f"column{position}", archive)
+            for position, description in enumerate(header["others"]) if description is not None
+        }
+
+    if header["numeric"]:
+        values = np.load(entry / "numeric.npy", mmap_mode="c")
+        df = pd.DataFrame(values, index=index, columns=header["numeric"], copy=False)
+    else:
+        df = pd.DataFrame(index=index)
+
+    # Inserting columns at their position keeps the memory-mapped block as it is
+    for position, values in others.items():
+        df.insert(position, header["columns"][position], values)
+    df.columns.name = header["columns_name"]
+    return df
+
+
+def evict(cache_dir: Path, max_bytes: int) -> List[Path]:
+    """
+    Remove least recently used cache entries until the cache fits in `max_bytes`.
+
+    Args:
+        cache_dir (Path): The cache directory.
+        max_bytes (int): Maximum total size of the cache entries.
+
+    Returns:
+        List[Path]: The evicted entries.
+    """
+    entries: List[Tuple[float, int, Path]] = []
+    for entry in cache_dir.iterdir():
+        if entry.is_dir() and not entry.name.endswith(".tmp"):
+            entries.append((entry.stat().st_mtime, _entry_size(entry), entry))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    for _, size, entry in sorted(entries, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        evicted.append(entry)
+    return evicted
+
+
+def load_dataset_cached(
+        dataset_path: str,
+        cache_dir: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        features_cols: bool = True,
+        max_bytes: int = CACHE_MAX_BYTES
+) -> pd.DataFrame:
+    """
+    Load a dataset through the on-disk parse cache.
+
+    On a hit the parsed dataset is memory-mapped from the cache instead of parsing the file again.
+    On a miss the file is parsed with `release_dataset` and stored, after evicting least recently used
+    entries to make room for it within `max_bytes`; datasets larger than `max_bytes` are not stored.
+    Cache errors are reported and never stop the pipeline.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        cache_dir (str): Directory holding the cache entries.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes passed on to the parser.
+        chunksize (Optional[int]): Parser chunk size passed on to the parser.
+        features_cols (bool): File orientation passed on to the parser.
+        max_bytes (int): Maximum total size of the cache.
+
+    Returns:
+        pd.DataFrame: The parsed dataset.
+    """
+    cache_path = Path(cache_dir)
+    try:
+        entry = cache_path / cache_key(dataset_path, dtypes, features_cols)
+        if (entry / FRAME_FILE).exists():
+            df = load_entry(entry)
+            os.utime(entry)
+            click.echo(f"Loaded the parsed dataset from the cache: {entry}")
+            return df
+    except Exception as e:
+        click.echo(f"Could not read the dataset cache ({e}), parsing the dataset")
+        entry = None
+
+    df = release_dataset(dataset_path, dtypes=dtypes, chunksize=chunksize, features_cols=features_cols)
+    if entry is None:
+        return df
+
+    try:
+        size = int(df.memory_usage(deep=True).sum())
+        if size > max_bytes:
+            click.echo(f"The parsed dataset ({size} bytes) exceeds the cache size ({max_bytes} bytes), not caching it")
+            return df
+        cache_path.mkdir(parents=True, exist_ok=True)
+        evict(cache_path, max_bytes - size)
+        store_dataset(df, entry)
+    except Exception as e:
+        click.echo(f"Could not write the dataset cache ({e})")
+    return df
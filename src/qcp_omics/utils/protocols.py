@@ -1,21 +1,90 @@
-from typing import Protocol, TypedDict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Protocol, Tuple, TypedDict, Optional, Union
+import numpy as np
 import pandas as pd
+from qcp_omics.models.missingness import MissingnessProfile
+from qcp_omics.models.numeric_matrix import NumericMatrix
+from qcp_omics.models.outliers import OutlierCoo
+from qcp_omics.models.streaming_profile import StreamingProfile
+from qcp_omics.models.transform_state import FittedStep, TransformState
 
 class HasData(Protocol):
     """
     Protocol for objects that contain datasets and metadata.
 
+    Declares the attributes and the helpers that the mixins use on each other through `self`.
+
     Attributes:
         data (pd.DataFrame): The main dataset.
-        data_numerical (pd.DataFrame): Subset of the dataset containing only numerical features.
-        data_categorical (pd.DataFrame): Subset of the dataset containing only categorical features.
-        test_set (pd.DataFrame): Test split of the data.
+        data_numerical (Optional[Union[pd.DataFrame, NumericMatrix]]): Subset of the dataset containing only
+            numerical features, once split off or moved into a numeric matrix.
+        data_categorical (Optional[pd.DataFrame]): Subset of the dataset containing only categorical features.
+        test_set (Optional[pd.DataFrame]): Test split of the data.
+        outliers (Optional[OutlierCoo]): Outliers found by the outlier handling step.
+        missingness (Optional[MissingnessProfile]): Missingness profile of the current dataset, if computed.
+        streaming_profile (Optional[StreamingProfile]): Profile of the dataset in streaming memory mode.
+        dataset_blocks (Optional[Callable[[], Iterator[pd.DataFrame]]]): Reads the dataset block by block
+            in streaming memory mode.
+        transform_state (TransformState): Parameters fitted by the preprocessing steps.
         metadata (dict): Dictionary containing metadata about the dataset.
         report_data (list[dict]): List of dictionaries containing report-related data.
     """
     data: pd.DataFrame
-    data_numerical: pd.DataFrame
-    data_categorical: pd.DataFrame
-    test_set: pd.DataFrame
+    data_numerical: Optional[Union[pd.DataFrame, NumericMatrix]]
+    data_categorical: Optional[pd.DataFrame]
+    test_set: Optional[pd.DataFrame]
+    outliers: Optional[OutlierCoo]
+    missingness: Optional[MissingnessProfile]
+    streaming_profile: Optional[StreamingProfile]
+    dataset_blocks: Optional[Callable[[], Iterator[pd.DataFrame]]]
+    transform_state: TransformState
     metadata: dict
     report_data: list[dict]
+
+    # OmicsData
+    @property
+    def float_dtype(self) -> np.dtype: ...
+    @property
+    def n_workers(self) -> int: ...
+    def compact_floats(self, df: pd.DataFrame) -> pd.DataFrame: ...
+    def _categorical_columns(self) -> pd.Index: ...
+    def _densify(self, reason: str) -> None: ...
+    def _record_fit(self, fitted: FittedStep) -> None: ...
+
+    # QCMixin
+    def _missing_values(self) -> Dict[str, float]: ...
+    def _missingness_blocks(self) -> Iterator[np.ndarray]: ...
+    def _missingness_profile(self) -> MissingnessProfile: ...
+    def _sample_chunks(self) -> Iterator[np.ndarray]: ...
+    def _sample_metrics(self) -> pd.DataFrame: ...
+    def _value_hash_blocks(self) -> Iterator[np.ndarray]: ...
+    def _exact_duplicates(self) -> Tuple[List[np.ndarray], List[np.ndarray], pd.Index]: ...
+    def _near_duplicates(self, exclude: np.ndarray, by_samples: bool) -> List[Tuple[Any, Any, float]]: ...
+    def _impute_categorical(self, columns: List[str]) -> Dict[Any, Any]: ...
+    def _impute_numerical(self, columns: List[str], method: str = "mean") -> pd.Series: ...
+    def _impute_knn(self, columns: List[str]) -> pd.Series: ...
+    def _knn_fill(self, values: np.ndarray, n_neighbors: int = 5) -> None: ...
+    def _handle_frame_outliers(self, method: str = "iqr") -> Tuple[OutlierCoo, np.ndarray, np.ndarray, np.ndarray]: ...
+    def _stream_outliers(
+            self,
+            profile: StreamingProfile,
+            dataset_blocks: Callable[[], Iterator[pd.DataFrame]],
+            method: str = "iqr"
+    ) -> Tuple[OutlierCoo, np.ndarray]: ...
+    def _outliers_report(
+            self, outliers: OutlierCoo, data_before: Optional[pd.DataFrame], medians: np.ndarray
+    ) -> Dict[str, Any]: ...
+
+    # PreprocessingMixin
+    def _numerical_blocks(self) -> Iterator[Tuple[pd.Index, np.ndarray]]: ...
+    def _feature_variability(self) -> pd.DataFrame: ...
+    def _transform_chunks(self, transform: Callable[[slice, np.ndarray], None]) -> None: ...
+    def _sample_batches(self, batch_size: int) -> Iterator[np.ndarray]: ...
+    def _run_pca(self, method: str = "full") -> Optional[Dict[str, np.ndarray]]: ...
+
+    # VisualizationMixin
+    @staticmethod
+    def _box_plots(df: pd.DataFrame, columns: list[str]) -> str: ...
+    @staticmethod
+    def _heatmap(corr_df: pd.DataFrame) -> str: ...
+    @staticmethod
+    def _histograms(df: pd.DataFrame) -> str: ...
@@ -1,16 +1,306 @@
+import bz2
 import click
+import csv
+import functools
+import gzip
+import importlib.util
+import io
+import lzma
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import os
 import json
-from typing import Any, List, Dict
+from typing import Any, IO, Iterable, Iterator, List, Literal, Dict, NamedTuple, Optional, Sequence, Tuple
+
+
+# Dataset file formats keyed by file extension
+DATASET_FORMATS: Dict[str, str] = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+
+# Compression applied on top of text formats, keyed by file extension
+COMPRESSION_EXTENSIONS: Dict[str, str] = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+# Output formats selectable in metadata and the file extension they are written with
+OUTPUT_FORMATS: Dict[str, str] = {
+    "csv": ".csv",
+    "tsv": ".tsv",
+    "csv.gz": ".csv.gz",
+    "tsv.gz": ".tsv.gz",
+    "csv.bz2": ".csv.bz2",
+    "tsv.bz2": ".tsv.bz2",
+    "csv.xz": ".csv.xz",
+    "tsv.xz": ".tsv.xz",
+    "csv.zst": ".csv.zst",
+    "tsv.zst": ".tsv.zst",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+TEXT_SEPARATORS: Dict[str, str] = {"csv": ",", "tsv": "\t"}
+
+# Parser dtypes for metadata dtypes. Other dtypes are left to inference ("int" and
+# "bool" cannot hold missing values) and are cast by "map_dtypes" afterwards.
+PARSER_DTYPES: Dict[str, str] = {
+    "float": "float64",
+    "category": "category",
+}
+COLUMNAR_FORMATS: List[str] = ["parquet", "feather"]
+
+# Rows parsed at once when reading a file with features in rows
+TRANSPOSE_CHUNKSIZE: int = 1000
+
+# Rows read at once when streaming a file with features in columns
+STREAM_CHUNKSIZE: int = 1000
+
+# Rows written at once when saving a dataset to a text file
+WRITE_CHUNKSIZE: int = 10000
+
+# Parsed datasets shared between callers so a file is only parsed once,
+# keyed by (absolute path, size, mtime) so a modified file is re-parsed.
+_DATASET_CACHE: Dict[Tuple[Any, ...], pd.DataFrame] = {}
+
+
+def get_dataset_format(dataset_path: str) -> Tuple[str, Optional[str]]:
+    """
+    Detect the file format and compression of a dataset from its extension.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+
+    Returns:
+        Tuple[str, Optional[str]]: The file format and the compression, or None if uncompressed.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    root, ext = os.path.splitext(dataset_path.lower())
+    compression = COMPRESSION_EXTENSIONS.get(ext)
+    if compression is not None:
+        root, format_ext = os.path.splitext(root)
+        ext = format_ext + ext
+    else:
+        format_ext = ext
+
+    fmt = DATASET_FORMATS.get(format_ext)
+    if fmt is None or (compression is not None and fmt in COLUMNAR_FORMATS):
+        raise ValueError(f"Unsupported file extension: {ext}")
+
+    return fmt, compression
+
+
+def zstandard_available() -> bool:
+    """
+    Check whether the optional zstandard dependency needed for .zst files is installed.
+
+    Returns:
+        bool: True if zstandard can be imported.
+    """
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def pyarrow_available() -> bool:
+    """
+    Check whether the optional pyarrow dependency needed for columnar formats is installed.
+
+    Returns:
+        bool: True if pyarrow can be imported.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _restore_index(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Use the first column as index for columnar files stored without a pandas index,
+    matching how text files are read.
+
+    Args:
+        df (pd.DataFrame): DataFrame read from a columnar file.
+
+    Returns:
+        pd.DataFrame: DataFrame indexed by sample or feature identifiers.
+    """
+    if isinstance(df.index, pd.RangeIndex) and len(df.columns) > 0:
+        return df.set_index(df.columns[0])
+    return df
+
+
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate typed chunks of a dataset, unifying categories so that categorical
+    columns are not upcast to object.
+
+    Args:
+        chunks (List[pd.DataFrame]): Chunks read from the same file.
+
+    Returns:
+        pd.DataFrame: The concatenated dataset.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    for col, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[col] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
 
+    return pd.concat(chunks)
 
-def load_dataset(dataset_path: str) -> pd.DataFrame:
+
+def _read_text(
+        dataset_path: str,
+        fmt: str,
+        compression: Optional[str],
+        parser_dtypes: Dict[str, str],
+        chunksize: Optional[int]
+) -> pd.DataFrame:
+    """
+    Parse a CSV/TSV file with the given column dtypes, optionally in chunks.
     """
-    Load a dataset from a file path, supporting CSV and TSV formats.
+    reader = pd.read_table(
+        dataset_path,
+        sep=TEXT_SEPARATORS[fmt],
+        index_col=0,
+        compression=compression,
+        dtype=parser_dtypes or None,
+        chunksize=chunksize
+    )
+    if chunksize is None:
+        return reader
+
+    with reader:
+        return _concat_chunks(list(reader))
+
+
+def _numeric_categories(values: pd.Series) -> pd.Series:
+    """
+    Convert string categories parsed from text to numbers if they all are numeric (e.g. 0/1 labels).
+
+    Args:
+        values (pd.Series): A categorical Series.
+
+    Returns:
+        pd.Series: The Series with numeric categories where possible.
+    """
+    categories = values.cat.categories
+    numeric_categories = pd.to_numeric(categories, errors="coerce")
+    if len(categories) > 0 and not numeric_categories.isna().any():
+        return values.cat.rename_categories(numeric_categories)
+    return values
+
+
+def _features_to_columns(
+        chunks: Iterable[pd.DataFrame],
+        features: Sequence[str],
+        dtypes: Dict[str, str]
+) -> pd.DataFrame:
+    """
+    Build a samples x features DataFrame from chunks of a file with features in rows.
+
+    Rows of numerical features are written straight into one float array laid out the way
+    pandas stores a numerical block, so the result is created without transposing a
+    mixed-dtype frame and without an object-dtype copy of the whole dataset.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Consecutive row chunks of the file, indexed by feature.
+        features (Sequence[str]): All features of the file, in order.
+        dtypes (Dict[str, str]): Metadata dtypes of the features.
+
+    Returns:
+        pd.DataFrame: The dataset with samples in rows and features in columns.
+    """
+    features = list(features)
+    is_numeric = np.array([dtypes.get(feature) in ("float", "int") for feature in features], dtype=bool)
+    # Row of every numerical feature in the float array, by position in the file, so repeated labels keep their rows
+    slots = np.cumsum(is_numeric) - 1
+    values: Optional[np.ndarray] = None
+    samples: Optional[pd.Index] = None
+    features_name = None
+    others: Dict[int, np.ndarray] = {}
+    failed: List[int] = []
+
+    start = 0
+    for chunk in chunks:
+        if values is None:
+            samples = chunk.columns
+            features_name = chunk.index.name
+            values = np.empty((int(is_numeric.sum()), len(samples)), dtype=np.float64)
+
+        positions = np.arange(start, start + len(chunk.index))
+        start += len(chunk.index)
+        numeric = is_numeric[positions]
+        rows = chunk.to_numpy()
+        try:
+            values[slots[positions[numeric]]] = rows[numeric].astype(np.float64)
+        except ValueError:
+            for position, row in zip(positions[numeric], rows[numeric]):
+                try:
+                    values[slots[position]] = row.astype(np.float64)
+                except ValueError as e:
+                    feature = features[position]
+                    click.echo(f"Error casting feature '{feature}' to type '{dtypes[feature]}': {e}")
+                    failed.append(position)
+                    others[position] = row
+        for position, row in zip(positions[~numeric], rows[~numeric]):
+            others[position] = row
+
+    if values is None:
+        return pd.DataFrame(columns=features)
+
+    numeric_positions = np.flatnonzero(is_numeric)
+    if failed:
+        keep = ~np.isin(numeric_positions, failed)
+        values = values[keep]
+        numeric_positions = numeric_positions[keep]
+
+    # values.T is column-major, which is how pandas stores a block, so no copy is made
+    columns = [features[position] for position in numeric_positions]
+    df = pd.DataFrame(values.T, index=samples, columns=columns, copy=False)
+    # Inserted in file order, every other feature goes back to its position in the file
+    for position in sorted(others):
+        series = pd.Series(others[position], index=samples)
+        if dtypes.get(features[position]) == "category":
+            series = _numeric_categories(series.astype("category"))
+        df.insert(int(position), features[position], series, allow_duplicates=True)
+    df.columns.name = features_name
+    return df
+
+
+def load_dataset(
+        dataset_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        features_cols: bool = True
+) -> pd.DataFrame:
+    """
+    Load a dataset from a file path, supporting CSV and TSV (optionally compressed with gzip,
+    bz2, xz or zstd), Parquet and Feather/Arrow IPC formats. Compressed files are decompressed
+    while being parsed, without writing a decompressed copy to disk.
+
+    For text formats, the metadata dtypes are passed to the parser so that columns are
+    created with their final type (e.g. categorical columns never go through object dtype).
+
+    Files with features in rows (`features_cols=False`) are always returned with samples in rows.
+    When dtypes are given, they are read directly into that layout; otherwise the parsed file is
+    transposed as a whole.
 
     Args:
         dataset_path (str): Path to the dataset file.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes of the dataset features.
+        chunksize (Optional[int]): If set, text files are parsed in chunks of this many rows.
+        features_cols (bool): Whether features are in columns (True) or rows (False) in the file.
 
     Returns:
         pd.DataFrame: Loaded dataset as a pandas DataFrame.
@@ -18,12 +308,424 @@ def load_dataset(dataset_path: str) -> pd.DataFrame:
     Raises:
         ValueError: If the file extension is not supported.
     """
-    _, ext = os.path.splitext(dataset_path)
-    sep = "," if ext == ".csv" else "\t"
-    if ext not in [".csv", ".tsv"]:
-        raise ValueError(f"Unsupported file extension: {ext}")
+    fmt, compression = get_dataset_format(dataset_path)
+    if not features_cols and not dtypes:
+        return load_dataset(dataset_path, chunksize=chunksize).T
+    transpose = not features_cols
+
+    if fmt in COLUMNAR_FORMATS:
+        read = pd.read_parquet if fmt == "parquet" else pd.read_feather
+        df = _restore_index(read(dataset_path))
+        if transpose:
+            return _features_to_columns([df], df.index.astype(str), dtypes or {})
+        return df
+
+    if transpose:
+        # Rows are parsed as strings one chunk at a time and converted feature by feature
+        reader = pd.read_table(
+            dataset_path,
+            sep=TEXT_SEPARATORS[fmt],
+            index_col=0,
+            compression=compression,
+            dtype=str,
+            chunksize=chunksize or TRANSPOSE_CHUNKSIZE
+        )
+        with reader:
+            return _features_to_columns(reader, probe_dataset(dataset_path).rows, dtypes or {})
+
+    parser_dtypes = {
+        col: PARSER_DTYPES[dtype] for col, dtype in (dtypes or {}).items() if dtype in PARSER_DTYPES
+    }
+    try:
+        df = _read_text(dataset_path, fmt, compression, parser_dtypes, chunksize)
+    except ValueError as e:
+        if not parser_dtypes:
+            raise
+        click.echo(f"Could not parse the dataset with metadata dtypes ({e}), falling back to inferred dtypes")
+        return _read_text(dataset_path, fmt, compression, {}, chunksize)
+
+    # The parser creates string categories; restore numeric ones (e.g. 0/1 labels)
+    for col, dtype in parser_dtypes.items():
+        if dtype == "category" and col in df.columns:
+            df[col] = _numeric_categories(df[col])
+
+    return df
+
+
+def _iter_columnar(dataset_path: str, fmt: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a Parquet/Feather file in batches of at most `chunksize` rows.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        parquet_file = pq.ParquetFile(dataset_path)
+        schema = parquet_file.schema_arrow
+        batches = parquet_file.iter_batches(batch_size=chunksize)
+    else:
+        reader = ipc.open_file(pa.memory_map(dataset_path))
+        schema = reader.schema
+        batches = (
+            reader.get_batch(i).slice(start, chunksize)
+            for i in range(reader.num_record_batches)
+            for start in range(0, reader.get_batch(i).num_rows, chunksize)
+        )
+    for batch in batches:
+        yield _restore_index(pa.Table.from_batches([batch], schema=schema).to_pandas())
+
+
+def iter_dataset_blocks(
+        dataset_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        features_cols: bool = True
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a dataset one block at a time, without loading it as a whole.
+
+    Every block has samples in rows and features in columns. With features in columns, blocks
+    are consecutive chunks of samples with all features; with features in rows, they are
+    consecutive chunks of features with all samples.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes of the dataset features.
+        chunksize (Optional[int]): Number of file rows per block. Defaults to STREAM_CHUNKSIZE, or
+            TRANSPOSE_CHUNKSIZE for files with features in rows.
+        features_cols (bool): Whether features are in columns (True) or rows (False) in the file.
+
+    Yields:
+        pd.DataFrame: The next block of the dataset.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    fmt, compression = get_dataset_format(dataset_path)
+    dtypes = dtypes or {}
+    chunksize = chunksize or (STREAM_CHUNKSIZE if features_cols else TRANSPOSE_CHUNKSIZE)
+
+    if fmt in COLUMNAR_FORMATS:
+        chunks = _iter_columnar(dataset_path, fmt, chunksize)
+    else:
+        parser_dtypes = {col: PARSER_DTYPES[dtype] for col, dtype in dtypes.items() if dtype in PARSER_DTYPES}
+        chunks = pd.read_table(
+            dataset_path,
+            sep=TEXT_SEPARATORS[fmt],
+            index_col=0,
+            compression=compression,
+            dtype=(parser_dtypes or None) if features_cols else str,
+            chunksize=chunksize
+        )
+
+    for chunk in chunks:
+        if features_cols:
+            yield chunk
+        else:
+            yield _features_to_columns([chunk], chunk.index.astype(str), dtypes)
+
+
+def save_dataset(df: pd.DataFrame, dataset_path: str, index: bool = True) -> None:
+    """
+    Save a dataset to a file path, choosing the format from the file extension.
 
-    return pd.read_table(dataset_path, sep=sep, index_col=0)
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        dataset_path (str): Path to the output file.
+        index (bool): Whether to write the index. Defaults to True.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    save_dataset_blocks([df], dataset_path, index=index)
+
+
+def save_dataset_blocks(blocks: List[pd.DataFrame], dataset_path: str, index: bool = True) -> None:
+    """
+    Save DataFrames sharing the same index side by side as one dataset, without concatenating them.
+
+    Text files are written in chunks of `WRITE_CHUNKSIZE` rows (compressed on the fly for
+    compressed extensions), so only one chunk of the combined rows exists at a time. Parquet and
+    Feather files are assembled from the Arrow columns of each block. The index is written as
+    the first column, which is how `load_dataset` reads it back.
+
+    Args:
+        blocks (List[pd.DataFrame]): DataFrames with identical indexes; their columns are written in order.
+        dataset_path (str): Path to the output file.
+        index (bool): Whether to write the index. Defaults to True.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    fmt, compression = get_dataset_format(dataset_path)
+    blocks = [block for block in blocks if len(block.columns) > 0] or blocks[:1]
+
+    if fmt in COLUMNAR_FORMATS:
+        import pyarrow as pa
+
+        arrays, names = [], []
+        if index:
+            arrays.append(pa.array(blocks[0].index.to_numpy()))
+            names.append(str(blocks[0].index.name or "index"))
+        for block in blocks:
+            table = pa.Table.from_pandas(block, preserve_index=False)
+            arrays.extend(table.columns)
+            names.extend(table.column_names)
+        table = pa.Table.from_arrays(arrays, names=names)
+
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, dataset_path)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, dataset_path)
+        return
+
+    n_rows = len(blocks[0].index)
+    with _open_text(dataset_path, compression, mode="w") as f:
+        for start in range(0, max(n_rows, 1), WRITE_CHUNKSIZE):
+            rows = slice(start, start + WRITE_CHUNKSIZE)
+            chunk = pd.concat([block.iloc[rows] for block in blocks], axis=1) if len(blocks) > 1 else blocks[0].iloc[rows]
+            chunk.to_csv(f, sep=TEXT_SEPARATORS[fmt], index=index, header=start == 0, lineterminator="\n")
+
+
+def _dataset_key(dataset_path: str) -> Tuple[str, int, int]:
+    """
+    Build the cache key identifying a dataset file on disk.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+
+    Returns:
+        Tuple[str, int, int]: Absolute path, size in bytes and modification time in nanoseconds.
+    """
+    stat = os.stat(dataset_path)
+    return os.path.abspath(dataset_path), stat.st_size, stat.st_mtime_ns
+
+
+def get_dataset(
+        dataset_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        features_cols: bool = True
+) -> pd.DataFrame:
+    """
+    Return the parsed dataset, loading it on first access and reusing it afterwards.
+
+    Only one dataset is kept in memory: loading a new file (or a modified version
+    of the same file) evicts any previously cached one. Callers must not modify
+    the returned DataFrame; use `release_dataset` to take ownership of it.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes passed on to `load_dataset`.
+        chunksize (Optional[int]): Parser chunk size passed on to `load_dataset`.
+        features_cols (bool): File orientation passed on to `load_dataset`.
+
+    Returns:
+        pd.DataFrame: Loaded dataset as a pandas DataFrame.
+    """
+    key = _dataset_key(dataset_path) + (tuple(sorted((dtypes or {}).items())), chunksize, features_cols)
+    df = _DATASET_CACHE.get(key)
+    if df is None:
+        _DATASET_CACHE.clear()
+        df = load_dataset(dataset_path, dtypes=dtypes, chunksize=chunksize, features_cols=features_cols)
+        _DATASET_CACHE[key] = df
+    return df
+
+
+def release_dataset(
+        dataset_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+        features_cols: bool = True
+) -> pd.DataFrame:
+    """
+    Remove the dataset from the shared cache and return it to the caller.
+
+    The returned DataFrame is owned by the caller and can be modified in place.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        dtypes (Optional[Dict[str, str]]): Metadata dtypes passed on to `load_dataset`.
+        chunksize (Optional[int]): Parser chunk size passed on to `load_dataset`.
+        features_cols (bool): File orientation passed on to `load_dataset`.
+
+    Returns:
+        pd.DataFrame: Loaded dataset as a pandas DataFrame.
+    """
+    df = get_dataset(dataset_path, dtypes=dtypes, chunksize=chunksize, features_cols=features_cols)
+    _DATASET_CACHE.clear()
+    return df
+
+
+class DatasetProbe(NamedTuple):
+    """
+    Lightweight description of a dataset file, obtained without loading it into a DataFrame.
+
+    Attributes:
+        columns (Tuple[str, ...]): Column names from the header, excluding the index column.
+        rows (Tuple[str, ...]): Index labels (first column) of every row.
+        n_rows (int): Number of data rows.
+        sample (Optional[pd.DataFrame]): The first rows of the dataset, if sampling was requested.
+    """
+    columns: Tuple[str, ...]
+    rows: Tuple[str, ...]
+    n_rows: int
+    sample: Optional[pd.DataFrame]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n_rows, len(self.columns)
+
+
+def _open_text(dataset_path: str, compression: Optional[str], mode: Literal["r", "w"] = "r") -> IO[str]:
+    """
+    Open a text dataset for streaming, compressing or decompressing it on the fly if needed.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        compression (Optional[str]): Compression of the file, or None if uncompressed.
+        mode (Literal["r", "w"]): "r" to read the file or "w" to write it. Defaults to "r".
+
+    Returns:
+        IO[str]: A text stream over the file content.
+    """
+    if compression == "gzip":
+        return io.TextIOWrapper(gzip.GzipFile(dataset_path, mode), encoding="utf-8", newline="")
+    if compression == "bz2":
+        return io.TextIOWrapper(bz2.BZ2File(dataset_path, mode), encoding="utf-8", newline="")
+    if compression == "xz":
+        return io.TextIOWrapper(lzma.LZMAFile(dataset_path, mode), encoding="utf-8", newline="")
+    if compression == "zstd":
+        import zstandard
+
+        if mode == "w":
+            writer = zstandard.ZstdCompressor().stream_writer(open(dataset_path, "wb"), closefd=True)
+            return io.TextIOWrapper(writer, encoding="utf-8", newline="")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(dataset_path, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8", newline="")
+    return open(dataset_path, mode, encoding="utf-8", newline="")
+
+
+def _probe_text(dataset_path: str, fmt: str, compression: Optional[str]) -> Tuple[Tuple[str, ...], Tuple[str, ...], int]:
+    """
+    Stream a CSV/TSV file once, collecting its header, index labels and row count.
+
+    Only the first field of each data row is parsed.
+    """
+    sep = TEXT_SEPARATORS[fmt]
+    with _open_text(dataset_path, compression) as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line], delimiter=sep), [])
+        index = []
+        for line in f:
+            if not line.strip():
+                continue
+            label = line.partition(sep)[0]
+            if label.startswith('"'):
+                label = next(csv.reader([line], delimiter=sep))[0]
+            index.append(label.rstrip("\r\n"))
+
+    return tuple(header[1:]), tuple(index), len(index)
+
+
+def _probe_columnar(
+        dataset_path: str, fmt: str, sample_rows: int
+) -> Tuple[Tuple[str, ...], Tuple[str, ...], int, Optional[pd.DataFrame]]:
+    """
+    Read the schema of a Parquet/Feather file, its index column and optionally its first rows.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        schema = pq.read_schema(dataset_path)
+        read_columns = pq.read_table
+    else:
+        schema = ipc.open_file(pa.memory_map(dataset_path)).schema
+        read_columns = functools.partial(feather.read_table, memory_map=True)
+
+    pandas_metadata = schema.pandas_metadata or {}
+    index_columns = [col for col in pandas_metadata.get("index_columns", []) if isinstance(col, str)]
+    index_column = index_columns[0] if index_columns else schema.names[0]
+    columns = [name for name in schema.names if name != index_column and name not in index_columns]
+    index = read_columns(dataset_path, columns=[index_column]).column(0).to_pylist()
+
+    sample = None
+    if sample_rows > 0:
+        if fmt == "parquet":
+            batch = next(pq.ParquetFile(dataset_path).iter_batches(batch_size=sample_rows))
+        else:
+            batch = ipc.open_file(pa.memory_map(dataset_path)).get_batch(0).slice(0, sample_rows)
+        sample = _restore_index(pa.Table.from_batches([batch], schema=schema).to_pandas())
+
+    return tuple(columns), tuple(str(label) for label in index), len(index), sample
+
+
+@functools.lru_cache(maxsize=4)
+def _probe_dataset(key: Tuple[str, int, int], sample_rows: int) -> DatasetProbe:
+    dataset_path = key[0]
+    fmt, compression = get_dataset_format(dataset_path)
+
+    if fmt in COLUMNAR_FORMATS:
+        columns, rows, n_rows, sample = _probe_columnar(dataset_path, fmt, sample_rows)
+    else:
+        columns, rows, n_rows = _probe_text(dataset_path, fmt, compression)
+        sample = None
+        if sample_rows > 0:
+            sample = pd.read_table(
+                dataset_path, sep=TEXT_SEPARATORS[fmt], index_col=0, nrows=sample_rows, compression=compression
+            )
+
+    return DatasetProbe(columns=columns, rows=rows, n_rows=n_rows, sample=sample)
+
+
+def probe_dataset(dataset_path: str, sample_rows: int = 0) -> DatasetProbe:
+    """
+    Collect the header, index labels and row count of a dataset in a single streaming pass,
+    without materializing it as a DataFrame. Results are cached per file version.
+
+    Args:
+        dataset_path (str): Path to the dataset file.
+        sample_rows (int): Number of leading rows to parse into `DatasetProbe.sample`
+            for dtype checks. Defaults to 0 (no sample).
+
+    Returns:
+        DatasetProbe: The dataset header, index labels, row count and optional sample.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    return _probe_dataset(_dataset_key(dataset_path), sample_rows)
+
+
+def check_dtype_plausibility(values: pd.Series, dtype: str) -> bool:
+    """
+    Check whether sampled values of a column can be cast to the declared dtype.
+
+    Only numeric dtypes are checked; "str", "object", "bool" and "category" accept any value.
+
+    Args:
+        values (pd.Series): Sampled values of the column.
+        dtype (str): Declared dtype from the metadata.
+
+    Returns:
+        bool: True if the values are plausible for the dtype.
+    """
+    if dtype not in ("int", "float"):
+        return True
+
+    values = values.dropna()
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.isna().any():
+        return False
+    if dtype == "int":
+        return bool((numeric % 1 == 0).all())
+    return True
 
 
 def handle_json_input(input_path: str) -> Dict[str, Any]:
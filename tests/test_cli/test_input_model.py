@@ -1,3 +1,4 @@
+import gzip
 import os
 import pytest
 from pydantic import ValidationError
@@ -119,6 +120,38 @@ def test_dataset_path_wrong_extension(minimal_valid_input, tmp_path):
         Input(**bad_input)
 
 
+def test_dataset_path_compressed_csv(minimal_valid_input, tmp_path):
+    file_path = tmp_path / "test_dataset.csv.gz"
+    with gzip.open(file_path, "wt", encoding="utf-8") as f:
+        f.write("id,col1,col2\nsmpl1,v1,v2\nsmpl2,v3,v4\nsmpl3,v5,v6\n")
+    good_input = minimal_valid_input.copy()
+    good_input["dataset_path"] = str(file_path)
+    model = Input(**good_input)
+    assert model.dataset_path == str(file_path)
+
+
+def test_validation_sample_rows_implausible_dtype(minimal_valid_input):
+    bad_input = minimal_valid_input.copy()
+    bad_input["dtypes"] = {"col1": "float", "col2": "str"}
+    bad_input["validation_sample_rows"] = 2
+    with pytest.raises(ValidationError, match="cannot be cast to dtype 'float'"):
+        Input(**bad_input)
+
+
+# TESTS FOR OUTPUT_FORMAT
+
+def test_output_format_default(minimal_valid_input):
+    model = Input(**minimal_valid_input)
+    assert model.output_format == "csv"
+
+
+def test_output_format_invalid(minimal_valid_input):
+    bad_input = minimal_valid_input.copy()
+    bad_input["output_format"] = "xlsx"
+    with pytest.raises(ValidationError, match="Incorrect output format value"):
+        Input(**bad_input)
+
+
 # TESTS FOR METADATA_PATH
 
 def test_metadata_path_does_not_exist(minimal_valid_input):
@@ -304,6 +337,24 @@ def test_steps_to_run_method_required_not_provided(minimal_valid_input):
         Input(**bad_input)
 
 
+def test_steps_to_run_default_method(minimal_valid_input):
+    input_data = minimal_valid_input.copy()
+    input_data["is_raw"] = False
+    input_data["steps_to_run"] = [{"step": "handle_missing_values"}, {"step": "handle_outliers", "method": "mad"}]
+    assert Input(**input_data).steps_to_run[0] == {"step": "handle_missing_values"}
+
+    input_data["steps_to_run"] = [{"step": "handle_missing_values", "method": "knn-like"}]
+    with pytest.raises(ValidationError, match="invalid method 'knn-like'"):
+        Input(**input_data)
+
+
+@pytest.mark.parametrize("threshold", [0, 120])
+def test_missing_threshold_invalid(minimal_valid_input, threshold):
+    bad_input = minimal_valid_input.copy()
+    bad_input["missing_threshold"] = threshold
+    with pytest.raises(ValidationError, match="missing_threshold must be a percentage"):
+        Input(**bad_input)
+
 def test_steps_to_run_invalid_method(minimal_valid_input):
     bad_input = minimal_valid_input.copy()
     bad_input["steps_to_run"] = [{"step": "handle_outliers", "method": "INVALID"}]
@@ -339,3 +390,36 @@ def test_is_raw_true_wrong_order(minimal_valid_input):
     with pytest.raises(ValidationError, match="steps_to_run error"):
         Input(**bad_input)
 
+
+def test_is_raw_true_without_optional_steps(minimal_valid_input):
+    optional = {step["step"] for step in ALL_STEPS if step.get("optional")}
+    minimal_valid_input["steps_to_run"] = [
+        step for step in minimal_valid_input["steps_to_run"] if step["step"] not in optional
+    ]
+    assert Input(**minimal_valid_input).is_raw is True
+
+
+@pytest.mark.parametrize("dataset_type, valid", [("genomics", True), ("proteomics", False)])
+def test_highly_variable_features_genomics_only(minimal_valid_input, dataset_type, valid):
+    minimal_valid_input["dataset_type"] = dataset_type
+    for step in minimal_valid_input["steps_to_run"]:
+        if step["step"] == "filter_low_variance":
+            step["method"] = "highly_variable"
+    if valid:
+        assert Input(**minimal_valid_input).dataset_type == "genomics"
+    else:
+        with pytest.raises(ValidationError, match="only available for genomics datasets"):
+            Input(**minimal_valid_input)
+
+
+@pytest.mark.parametrize("method,valid", [("IQR", True), ("zscore", True), ("mad", False)])
+def test_streaming_outlier_methods(minimal_valid_input, method, valid):
+    minimal_valid_input["memory_mode"] = "streaming"
+    for step in minimal_valid_input["steps_to_run"]:
+        if step["step"] == "handle_outliers":
+            step["method"] = method
+    if valid:
+        assert Input(**minimal_valid_input).memory_mode == "streaming"
+    else:
+        with pytest.raises(ValidationError, match="not available in streaming memory mode"):
+            Input(**minimal_valid_input)
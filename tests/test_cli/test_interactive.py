@@ -38,6 +38,11 @@ def test_interactive_flow(tmp_path, metadata_content, dataset_content):
         "1",
         "1",
         "1",
+        "1",
+        "1",
+        "1",
+        "1",
+        "1",
         "1"
     ]) + "\n"
 
@@ -1,4 +1,5 @@
 import pytest
+import pandas as pd
 from click.testing import CliRunner
 from qcp_omics.cli.cli import qcp
 
@@ -58,3 +59,61 @@ def test_metadata_command_valid_json(tmp_path, dataset_content, dtypes):
     result = runner.invoke(qcp, ["metadata", str(metadata_file)])
     assert result.exit_code == 0, f"Command failed unexpectedly: {result.output}"
     assert "Input validation successful." in result.output or "Shape mismatch warning overridden." in result.output
+
+
+@pytest.mark.parametrize("args,cached", [([], True), (["--no-cache"], False)])
+def test_metadata_command_cache(tmp_path, args, cached):
+    runner = CliRunner()
+    dataset_path = write_test_files(tmp_path, "id,col1,col2\nsmpl1,v1,v2\nsmpl2,v3,v4\nsmpl3,v5,v6\n")
+    output_path = tmp_path / "out"
+    output_path.mkdir(exist_ok=True)
+    metadata_file = tmp_path / "input.json"
+    metadata_file.write_text(metadata_base % {
+        "ds_path": dataset_path,
+        "md_path": metadata_file,
+        "out_path": output_path,
+        "dtypes": '{"col1":"str","col2":"str"}'
+    }, encoding="utf-8")
+
+    result = runner.invoke(qcp, ["metadata", str(metadata_file), *args])
+    assert result.exit_code == 0, f"Command failed unexpectedly: {result.output}"
+    assert (output_path / ".qcp_cache").exists() is cached
+
+    result = runner.invoke(qcp, ["metadata", str(metadata_file), *args])
+    assert ("Loaded the parsed dataset from the cache" in result.output) is cached
+
+
+def test_apply_command(tmp_path):
+    runner = CliRunner()
+    dataset_path = write_test_files(
+        tmp_path,
+        "id,col1,col2,col3\n" + "".join(f"s{i},c{i % 3},{i + 1.5},{(i * 7) % 11 + 0.5}\n" for i in range(10))
+    )
+    output_path = tmp_path / "out"
+    output_path.mkdir(exist_ok=True)
+    metadata_file = tmp_path / "input.json"
+    metadata_file.write_text(metadata_base % {
+        "ds_path": dataset_path,
+        "md_path": metadata_file,
+        "out_path": output_path,
+        "dtypes": '{"col1":"category","col2":"float","col3":"float"}'
+    }, encoding="utf-8")
+
+    result = runner.invoke(qcp, ["apply", str(metadata_file), str(dataset_path)])
+    assert result.exit_code != 0
+    assert "No transform state found" in result.output
+
+    result = runner.invoke(qcp, ["metadata", str(metadata_file)])
+    assert result.exit_code == 0, f"Command failed unexpectedly: {result.output}"
+    assert (output_path / "transform_state.npz").exists()
+
+    batch_path = tmp_path / "batch.csv"
+    batch_path.write_text("id,col1,col2,col3\nn1,c0,2.5,3.5\nn2,,4.5,\n", encoding="utf-8")
+    result = runner.invoke(qcp, ["apply", str(metadata_file), str(batch_path)])
+    assert result.exit_code == 0, f"Command failed unexpectedly: {result.output}"
+
+    transformed = pd.read_csv(output_path / "batch_transformed.csv", index_col=0)
+    test_set = pd.read_csv(output_path / "test_data.csv", index_col=0)
+    assert list(transformed.index) == ["n1", "n2"]
+    assert sorted(transformed.columns) == sorted(test_set.columns)
+    assert transformed.notna().all().all()
@@ -1,5 +1,8 @@
 import pytest
+import numpy as np
 import pandas as pd
+from scipy import stats
+from sklearn.decomposition import PCA
 from qcp_omics.models.clinical_data import ClinicalData
 
 
@@ -69,6 +72,83 @@ def test_transform_numerical_features_log2(small_dataset):
     assert not dummy.data_numerical.isnull().values.any()
 
 
+def test_transform_numerical_features_upcasts_integer_chunks(monkeypatch):
+    data = pd.DataFrame({
+        "I1": [1, 3, 7, 15], "F1": [0.5, 1.5, 2.5, 3.5], "I2": np.array([2, 4, 6, 8], dtype=np.int16),
+        "F2": np.array([1.0, 2.0, 4.0, 8.0], dtype=np.float32), "I3": [0, 1, 2, 3]
+    }, index=["s1", "s2", "s3", "s4"])
+    monkeypatch.setattr("qcp_omics.mixins.preprocessing_mixin.TRANSFORM_CHUNK_SIZE", 2)
+    dummy = DummyPreprocessing(data, {"dtypes": {}, "steps_to_run": [], "n_workers": 2})
+    dummy.split_numerical_categorical()
+    dummy.transform_numerical_features(method="log1p")
+
+    assert dummy.data_numerical.dtypes.tolist() == [np.float64, np.float64, np.float64, np.float32, np.float64]
+    np.testing.assert_allclose(dummy.data_numerical.to_numpy(), np.log1p(data.to_numpy(dtype=np.float64)), rtol=1e-6)
+
+
+@pytest.mark.parametrize("method,estimate", [("box-cox", stats.boxcox), ("yeo-johnson", stats.yeojohnson)])
+def test_power_lambdas_match_scipy(method, estimate):
+    rng = np.random.default_rng(0)
+    columns = [rng.lognormal(0, 1, 200), rng.gamma(2, 3, 200), rng.uniform(1, 2, 200), 1 / rng.uniform(0.01, 1, 200)]
+    if method == "yeo-johnson":
+        columns += [rng.normal(0, 3, 200), -rng.lognormal(0, 1, 200)]
+    values = np.column_stack(columns)
+    values[5, 0] = np.nan
+
+    lambdas = DummyPreprocessing._power_lambdas(values, method)
+    expected = [estimate(column[~np.isnan(column)])[1] for column in values.T]
+    np.testing.assert_allclose(lambdas, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_transform_numerical_features_yeo_johnson(n_workers):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(0, 2, (60, 700)), index=[f"s{i}" for i in range(60)])
+    data.columns = [f"G{i}" for i in range(700)]
+    data["Flat"] = -1.0
+    dummy = DummyPreprocessing(data, {"dtypes": {}, "steps_to_run": [], "n_workers": n_workers})
+    dummy.split_numerical_categorical()
+    dummy.transform_numerical_features(method="yeo-johnson")
+
+    # Negative values are transformed without a shift, and features without variance are left as is
+    for col in ["G0", "G350", "G699"]:
+        np.testing.assert_allclose(dummy.data_numerical[col], stats.yeojohnson(data[col])[0], rtol=1e-5, atol=1e-6)
+    assert (dummy.data_numerical["Flat"] == -1.0).all()
+    fitted = dummy.transform_state.steps[-1]
+    assert not fitted.params["transformed"][-1] and fitted.params["shift"].max() == 0
+
+
+@pytest.mark.parametrize("method,ufunc,target", [
+    ("log2", np.log2, 1.0), ("log1p", np.log1p, 0.0), ("sqrt", np.sqrt, 0.0), ("asinh", np.arcsinh, None)
+])
+@pytest.mark.parametrize("transform_shift", ["global", "per_column"])
+@pytest.mark.parametrize("backend", ["dataframe", "array"])
+def test_elementwise_transforms(method, ufunc, target, transform_shift, backend):
+    data = pd.DataFrame({
+        "Neg": [-3.0, -1.0, 0.0, 2.0, np.nan],
+        "Pos": [4.0, 9.0, 16.0, 1.0, 25.0],
+        "Int": [1, 2, 3, 4, 5],
+        "Flat": [5.0, 5.0, 5.0, 5.0, 5.0]
+    }, index=["s1", "s2", "s3", "s4", "s5"])
+    metadata = {"dtypes": {}, "steps_to_run": [], "numeric_backend": backend, "transform_shift": transform_shift}
+    dummy = DummyPreprocessing(data.copy(), metadata)
+    dummy.build_numeric_matrix()
+    dummy.split_numerical_categorical()
+    values = dummy.data_numerical.values if backend == "array" else None
+    dummy.transform_numerical_features(method=method)
+
+    result = dummy.data_numerical.to_frame() if backend == "array" else dummy.data_numerical
+    if backend == "array":
+        assert dummy.data_numerical.values is values
+    neg_shift = 0.0 if target is None else target - (-3.0)
+    pos_shift = neg_shift if transform_shift == "global" else 0.0
+    np.testing.assert_allclose(result["Neg"], ufunc(data["Neg"] + neg_shift))
+    np.testing.assert_allclose(result["Pos"], ufunc(data["Pos"] + pos_shift))
+    # Features without variance are shifted but not transformed
+    np.testing.assert_allclose(result["Flat"], data["Flat"] + pos_shift)
+    assert result["Int"].dtype == np.float64
+
+
 def test_dimensionality_reduction(small_dataset):
     dummy = DummyPreprocessing(small_dataset, metadata_base)
     dummy.split_train_test()
@@ -76,3 +156,136 @@ def test_dimensionality_reduction(small_dataset):
     result = dummy.dimensionality_reduction()
     assert "pca_data" in result
     assert "pca_plot" in result
+
+
+@pytest.mark.parametrize("method", ["full", "randomized", "incremental"])
+@pytest.mark.parametrize("backend", ["dataframe", "array"])
+def test_dimensionality_reduction_methods(method, backend, monkeypatch):
+    monkeypatch.setattr("qcp_omics.mixins.preprocessing_mixin.PCA_BATCH_SIZE", 25)
+    rng = np.random.default_rng(0)
+    # Three latent factors explain most of the variance
+    values = rng.normal(size=(120, 3)) * [10, 6, 3] @ rng.normal(size=(3, 40)) + rng.normal(size=(120, 40))
+    data = pd.DataFrame(values, index=[f"s{i}" for i in range(120)], columns=[f"G{i}" for i in range(40)])
+    metadata = {"dtypes": {}, "steps_to_run": [], "numeric_backend": backend, "pca_components": 0.95}
+    dummy = DummyPreprocessing(data, metadata)
+    dummy.build_numeric_matrix()
+    dummy.split_numerical_categorical()
+    result = dummy.dimensionality_reduction(method=method)
+
+    # Only the components explaining the requested variance are kept
+    expected = PCA(n_components=3).fit(values)
+    assert list(result["pca_data"].columns) == ["PC1", "PC2", "PC3"]
+    assert list(result["pca_data"].index) == list(data.index)
+    np.testing.assert_allclose(
+        np.abs(dummy._run_pca(method)["pca_data"]), np.abs(expected.transform(values)), rtol=1e-2, atol=1e-1
+    )
+
+    dummy.metadata["pca_components"] = 5
+    assert dummy._run_pca(method)["pca_data"].shape == (120, 5)
+
+
+@pytest.mark.parametrize("method", ["box-cox", "log2"])
+def test_compact_memory_mode_keeps_float32(small_dataset, method):
+    metadata = {**metadata_base, "memory_mode": "compact"}
+    dummy = DummyPreprocessing(small_dataset, metadata)
+    dummy.compact_dtypes()
+    dummy.split_train_test()
+    dummy.split_numerical_categorical()
+    dummy.scale_numerical_features(method="standard_scaler")
+    assert (dummy.data_numerical.dtypes == "float32").all()
+    dummy.transform_numerical_features(method=method)
+    assert (dummy.data_numerical.dtypes == "float32").all()
+
+
+def test_compact_memory_mode_keeps_integer_features(tmp_path):
+    data = pd.DataFrame({
+        "cnt": [3, 1, 4, 1, 5, 9, 2, 6, 5, 3],
+        "expr": [0.5, np.nan, 1.5, 2.0, 2.5, 3.0, 30.0, 4.0, 4.5, 5.0],
+        "Cat1": pd.Categorical(list("ABABABABAB")),
+    }, index=[f"s{i}" for i in range(10)])
+    steps = [
+        {"step": "handle_missing_values", "method": "median"},
+        {"step": "handle_outliers", "method": "IQR"},
+        {"step": "split_train_test"},
+        {"step": "split_numerical_categorical"},
+        {"step": "scale_numerical_features", "method": "standard_scaler"},
+        {"step": "transform_numerical_features", "method": "yeo-johnson"},
+    ]
+    metadata = {"dtypes": {}, "steps_to_run": steps, "memory_mode": "compact", "output_path": str(tmp_path)}
+    dummy = DummyPreprocessing(data, metadata)
+    dummy.compact_dtypes()
+    assert dummy.data["cnt"].dtype == np.int8
+
+    # Downcast integer features go through every numerical step and are saved
+    dummy.execute_steps()
+    assert list(dummy.data_numerical.columns) == ["cnt", "expr"]
+    assert (dummy.data_numerical.dtypes == "float32").all()
+    dummy.save_data_files()
+    train = pd.read_csv(tmp_path / "train_data.csv", index_col=0)
+    assert list(train.columns) == ["cnt", "expr", "Cat1"]
+    assert train["cnt"].notna().all()
+
+
+@pytest.fixture
+def variance_dataset():
+    rng = np.random.default_rng(0)
+    n = 100
+    df = pd.DataFrame({
+        "constant": np.full(n, 3.0),
+        "near_zero": np.r_[np.zeros(n - 2), [1.0, 2.0]],
+        "binary": np.tile([0.0, 1.0], n // 2),
+        "low": rng.normal(10, 0.1, size=n),
+        "high": rng.normal(10, 5.0, size=n),
+        "counts": rng.poisson(4, size=n).astype(float),
+    }, index=[f"s{i}" for i in range(n)])
+    df.iloc[5, 3] = np.nan
+    return df
+
+
+def test_block_variability(variance_dataset):
+    variability = DummyPreprocessing._block_variability(variance_dataset.to_numpy())
+    values = variance_dataset
+    np.testing.assert_allclose(variability[:, 1], values.mean())
+    np.testing.assert_allclose(variability[:, 2], values.var())
+    np.testing.assert_allclose(variability[:, 3], values.nunique() / values.count() * 100)
+    counts = values["near_zero"].value_counts()
+    assert variability[1, 4] == counts.iloc[0] / counts.iloc[1]
+    assert variability[0, 4] == np.inf
+    assert variability[2, 4] == 1.0
+
+
+@pytest.mark.parametrize("backend", ["dataframe", "array"])
+def test_filter_low_variance(variance_dataset, backend, monkeypatch):
+    monkeypatch.setattr("qcp_omics.mixins.preprocessing_mixin.VARIANCE_CHUNK_SIZE", 4)
+    metadata = {"dtypes": {}, "steps_to_run": [], "numeric_backend": backend}
+    dummy = DummyPreprocessing(variance_dataset, metadata)
+    if backend == "array":
+        dummy.build_numeric_matrix()
+    dummy.split_train_test()
+    dummy.split_numerical_categorical()
+    result = dummy.filter_low_variance(method="near_zero")
+
+    assert list(dummy.data_numerical.columns) == ["binary", "low", "high", "counts"]
+    assert list(dummy.test_set.columns) == ["binary", "low", "high", "counts"]
+    assert result["n_features"] == 6
+    assert (result["n_constant"], result["n_near_zero"], result["n_dropped"]) == (1, 1, 2)
+    assert result["kept"].index[0] == "high"
+
+
+def test_filter_highly_variable():
+    rng = np.random.default_rng(0)
+    means = rng.uniform(1, 100, size=200)
+    counts = rng.poisson(means, size=(300, 200)).astype(float)
+    # Overdispersed (negative binomial) genes vary more than their mean explains
+    counts[:, :5] = rng.negative_binomial(2, 2 / (2 + means[:5]), size=(300, 5))
+    df = pd.DataFrame(counts, columns=[f"g{i}" for i in range(200)])
+    metadata = {"dtypes": {}, "steps_to_run": [], "n_top_features": 5}
+    dummy = DummyPreprocessing(df, metadata)
+    dummy.split_numerical_categorical()
+    result = dummy.filter_low_variance(method="highly_variable")
+
+    assert sorted(dummy.data_numerical.columns) == ["g0", "g1", "g2", "g3", "g4"]
+    assert result["n_top"] == 5
+    assert result["n_dropped"] == 195
+    # Raw variance would have selected the Poisson genes with the highest means
+    assert df.var().nlargest(5).index.difference(["g0", "g1", "g2", "g3", "g4"]).size > 0
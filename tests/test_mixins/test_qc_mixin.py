@@ -1,6 +1,8 @@
 import pytest
+import numpy as np
 import pandas as pd
 from qcp_omics.models.clinical_data import ClinicalData
+from qcp_omics.models.missingness import MissingnessProfile
 
 
 metadata_base = {
@@ -25,11 +27,29 @@ def df_with_missing_and_outliers():
 
 def test_identify_missing_values(df_with_missing_and_outliers):
     dummy = DummyQC(df_with_missing_and_outliers, metadata_base)
-    missing_vals = dummy.identify_missing_values()
+    result = dummy.identify_missing_values()
+    missing_vals = result["features"]
     assert "A" in missing_vals
     assert missing_vals["A"] > 0
     assert "B" in missing_vals
     assert missing_vals["B"] > 0
+    assert result["samples"] == {"s3": pytest.approx(100 / 3), "s5": pytest.approx(100 / 3)}
+    assert result["n_samples_missing"] == 2
+    assert sorted(result["patterns"]) == [(["A"], 1), (["B"], 1)]
+
+
+def test_missingness_profile_is_shared(df_with_missing_and_outliers, monkeypatch):
+    dummy = DummyQC(df_with_missing_and_outliers, metadata_base)
+    dummy.identify_missing_values()
+    profile = dummy.missingness
+
+    monkeypatch.setattr(MissingnessProfile, "from_blocks", None)
+    assert dummy._missingness_profile() is profile
+    monkeypatch.undo()
+
+    dummy.handle_missing_values()
+    assert dummy.missingness is None
+    assert dummy._missing_values() == {}
 
 
 def test_handle_missing_values(df_with_missing_and_outliers):
@@ -38,6 +58,61 @@ def test_handle_missing_values(df_with_missing_and_outliers):
     assert dummy.data.isnull().sum().sum() == 0
 
 
+@pytest.mark.parametrize("method,expected", [
+    ("mean", 26.25),
+    ("median", 2.0),
+    ("mode", 2.0),
+    ("constant", -1.0),
+])
+def test_handle_missing_values_methods(df_with_missing_and_outliers, method, expected):
+    dummy = DummyQC(df_with_missing_and_outliers, {**metadata_base, "imputation_constant": -1.0})
+    result = dummy.handle_missing_values(method=method)
+    assert dummy.data.loc["s3", "A"] == expected
+    assert result["dropped"] == []
+    assert sorted(result["imputed"]) == ["A", "B"]
+
+
+def test_handle_missing_values_knn(monkeypatch):
+    from sklearn.impute import KNNImputer
+
+    monkeypatch.setattr("qcp_omics.mixins.qc_mixin.KNN_BLOCK_SIZE", 7)
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(40, 6))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    df = pd.DataFrame(values, columns=list("ABCDEF"), index=[f"s{i}" for i in range(40)])
+    dummy = DummyQC(df, {**metadata_base, "dtypes": {col: "float" for col in df.columns},
+                         "missing_threshold": 100, "knn_neighbors": 3})
+
+    dummy.handle_missing_values(method="knn")
+
+    expected = KNNImputer(n_neighbors=3).fit_transform(values)
+    np.testing.assert_allclose(dummy.data.to_numpy(), expected)
+
+def test_handle_missing_values_threshold():
+    df = pd.DataFrame({
+        "A": [1.0, None, None, 4.0],
+        "B": [1.0, 2.0, None, 4.0],
+        "G": pd.Categorical(["x", None, "y", "x"]),
+    }, index=["s1", "s2", "s3", "s4"])
+    dummy = DummyQC(df, {**metadata_base, "dtypes": {"A": "float", "B": "float", "G": "category"},
+                         "missing_threshold": 50})
+    result = dummy.handle_missing_values()
+
+    assert result["dropped"] == ["A"]
+    assert list(dummy.data.columns) == ["B", "G"]
+    assert dummy.data["G"].tolist() == ["x", "x", "y", "x"]
+    assert list(dummy.data["G"].cat.categories) == ["x", "y"]
+
+
+def test_nan_modes():
+    values = np.array([
+        [1.0, 2.0, np.nan],
+        [3.0, 1.0, np.nan],
+        [3.0, np.nan, np.nan],
+        [np.nan, 1.0, np.nan],
+    ])
+    np.testing.assert_array_equal(DummyQC._nan_modes(values), [3.0, 1.0, np.nan])
+
 def test_handle_outliers(df_with_missing_and_outliers):
     dummy = DummyQC(df_with_missing_and_outliers, metadata_base)
     result = dummy.handle_outliers(method="iqr")
@@ -45,6 +120,224 @@ def test_handle_outliers(df_with_missing_and_outliers):
     outliers_dict = result["outliers"]
     assert "A" in outliers_dict
     assert 100 not in dummy.data["A"].values
+    assert result["n_outliers"] == 1
+    assert result["counts"] == {"A": 1}
+    assert dummy.outliers.values.tolist() == [100.0]
+    assert dummy.outliers.samples[dummy.outliers.rows].tolist() == ["s4"]
 
     assert "boxplots" in result
     assert "html" in result["boxplots"]
+
+
+
+def _outlier_mask(values, method):
+    samples, features = np.arange(values.shape[0]), np.arange(values.shape[1])
+    outliers = DummyQC._replace_block_outliers(values.copy(), samples, features, method=method)[0]
+    mask = np.zeros(values.shape, dtype=bool)
+    mask[outliers.rows, outliers.cols] = True
+    np.testing.assert_array_equal(outliers.values, values[outliers.rows, outliers.cols])
+    return mask
+
+
+@pytest.mark.parametrize("method", ["iqr", "zscore", "mad"])
+def test_replace_block_outliers(df_with_missing_and_outliers, method):
+    values = df_with_missing_and_outliers.to_numpy(dtype=np.float64)
+    mask = _outlier_mask(values, method)
+
+    assert not mask[2, 0]
+    if method in ("iqr", "mad"):
+        assert mask.sum() == 1 and mask[3, 0]
+
+    block = values.astype(np.float32)
+    _, medians, _, _ = DummyQC._replace_block_outliers(
+        block, df_with_missing_and_outliers.index, df_with_missing_and_outliers.columns, method=method
+    )
+    np.testing.assert_allclose(block[mask], np.broadcast_to(medians, values.shape)[mask])
+    np.testing.assert_array_equal(block[~mask], values.astype(np.float32)[~mask])
+
+
+def test_mad_is_robust_to_masking():
+    # Two large values inflate the standard deviation enough to hide each other from the z-score
+    values = np.array([[1.0, 1.1, 0.9, 1.0, 1.2, 0.8, 1.0, 50.0, 52.0]]).T
+    assert not _outlier_mask(values, "zscore").any()
+    assert _outlier_mask(values, "mad")[:, 0].tolist() == [False] * 7 + [True, True]
+
+
+@pytest.mark.parametrize("method", ["iqr", "zscore", "mad"])
+def test_outlier_chunks(method, monkeypatch):
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=(40, 7))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    expected = DummyQC._outlier_bounds(values, method=method)
+    data = pd.DataFrame(values, index=[f"s{i}" for i in range(40)], columns=[f"G{i}" for i in range(7)])
+    dummy = DummyQC(data.copy(), metadata_base)
+    dummy.handle_outliers(method=method)
+
+    monkeypatch.setattr("qcp_omics.mixins.qc_mixin.OUTLIER_CHUNK_SIZE", 3)
+    np.testing.assert_array_equal(DummyQC._outlier_bounds(values, method=method), expected)
+    chunked = DummyQC(data.copy(), metadata_base)
+    chunked.handle_outliers(method=method)
+    pd.testing.assert_frame_equal(chunked.data, dummy.data)
+    for name in ["rows", "cols", "values"]:
+        np.testing.assert_array_equal(getattr(chunked.outliers, name), getattr(dummy.outliers, name))
+    assert chunked.outliers.n_outliers > 0
+
+
+def test_nan_quantiles_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(25, 6))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[:, 0] = np.nan
+    values[1:, 1] = np.nan
+
+    quantiles = DummyQC._nan_quantiles(values, [0.25, 0.5, 0.75])
+
+    with np.errstate(invalid="ignore"), pytest.warns(RuntimeWarning):
+        expected = np.nanpercentile(values, [25, 50, 75], axis=0)
+    np.testing.assert_allclose(quantiles, expected)
+
+def test_compact_memory_mode_keeps_dtypes(df_with_missing_and_outliers):
+    dummy = DummyQC(df_with_missing_and_outliers, {**metadata_base, "memory_mode": "compact"})
+    dummy.compact_dtypes()
+    dummy.handle_missing_values()
+    dummy.handle_outliers(method="iqr")
+    assert dummy.data.isnull().sum().sum() == 0
+    assert dummy.data.dtypes.astype(str).to_dict() == {"A": "float32", "B": "float32", "C": "int8"}
+
+
+@pytest.mark.parametrize("features_cols", [True, False])
+def test_streaming_qc_matches_in_memory(df_with_missing_and_outliers, features_cols):
+    df = df_with_missing_and_outliers.astype(float)
+    metadata = {**metadata_base, "memory_mode": "streaming", "features_cols": features_cols}
+    streamed = DummyQC(pd.DataFrame(), metadata)
+    if features_cols:
+        streamed.profile_stream(lambda: iter([df.iloc[:2], df.iloc[2:]]))
+    else:
+        streamed.profile_stream(lambda: iter([df[["A"]], df[["B", "C"]]]))
+    in_memory = DummyQC(df.copy(), metadata_base)
+
+    assert streamed.identify_missing_values() == {**in_memory.identify_missing_values(), "patterns": []}
+
+    result = streamed.handle_outliers(method="IQR")
+    assert result["n_outliers"] == 1
+    assert result["boxplots"] is None
+    assert streamed.outliers.samples[streamed.outliers.rows].tolist() == ["s4"]
+    assert streamed.outliers.values.tolist() == [100.0]
+
+
+@pytest.fixture
+def counts_dataset():
+    rng = np.random.default_rng(0)
+    counts = rng.poisson(50, size=(30, 40)).astype(float)
+    counts[counts < 45] = 0
+    counts[3] = rng.poisson(1, size=40)
+    counts[7, :20] = np.nan
+    index = [f"cell{i}" for i in range(30)]
+    df = pd.DataFrame(counts, index=index, columns=[f"g{i}" for i in range(40)])
+    df["batch"] = pd.Categorical(["a", "b"] * 15, categories=["a", "b"])
+    return df
+
+
+@pytest.mark.parametrize("method", ["flag", "filter"])
+def test_sample_qc(counts_dataset, method, monkeypatch):
+    metadata = {"dtypes": {}, "steps_to_run": [{"step": "sample_qc", "method": method}]}
+    expected_metrics = None
+    for chunk_size in [4096, 7]:
+        monkeypatch.setattr("qcp_omics.mixins.qc_mixin.SAMPLE_QC_CHUNK_SIZE", chunk_size)
+        dummy = DummyQC(counts_dataset.copy(), metadata)
+        metrics = dummy._sample_metrics()
+        if expected_metrics is not None:
+            pd.testing.assert_frame_equal(metrics, expected_metrics)
+        expected_metrics = metrics
+        result = dummy.sample_qc(method=method)
+
+    numeric = counts_dataset.drop(columns="batch")
+    np.testing.assert_allclose(metrics["total_signal"], numeric.sum(axis=1))
+    np.testing.assert_allclose(metrics["missing"], numeric.isna().mean(axis=1) * 100)
+    assert result["n_samples"] == 30
+    assert set(result["flagged"].index) == {"cell3", "cell7"}
+    assert result["flagged"].loc["cell7", "reason"].endswith("missing")
+    assert "total_signal" in result["flagged"].loc["cell3", "reason"]
+    assert result["summary"].loc["missing", "upper"] == 30.0
+
+    if method == "filter":
+        assert len(dummy.data.index) == 28
+        assert "cell3" not in dummy.data.index
+    else:
+        assert len(dummy.data.index) == 30
+
+
+def test_sample_qc_numeric_matrix(counts_dataset):
+    metadata = {"dtypes": {}, "steps_to_run": [], "numeric_backend": "array"}
+    expected = DummyQC(counts_dataset.copy(), metadata).sample_qc(method="filter")
+
+    dummy = DummyQC(counts_dataset.copy(), metadata)
+    dummy.build_numeric_matrix()
+    result = dummy.sample_qc(method="filter")
+
+    pd.testing.assert_frame_equal(result["summary"], expected["summary"])
+    pd.testing.assert_frame_equal(result["flagged"], expected["flagged"])
+    assert dummy.data_numerical.shape == (28, 40)
+    assert dummy.data.index.tolist() == dummy.data_numerical.index.tolist()
+
+
+@pytest.fixture
+def duplicated_dataset():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(40, 60))
+    values[9] = values[4] + rng.normal(scale=0.01, size=60)
+    values[:, 10] = values[:, 3]
+    values[:, 20] = 2 * values[:, 5] + 1 + rng.normal(scale=0.01, size=40)
+    values[2, 7] = np.nan
+    values[5] = values[2]
+    df = pd.DataFrame(values, index=[f"s{i}" for i in range(40)], columns=[f"g{i}" for i in range(60)])
+    df["batch"] = pd.Categorical(["a", "b"] * 20, categories=["a", "b"])
+    df.loc["s5", "batch"] = df.loc["s2", "batch"]
+    df["batch_copy"] = df["batch"]
+    return df
+
+
+@pytest.mark.parametrize("method", ["flag", "drop"])
+def test_identify_duplicates(duplicated_dataset, method, monkeypatch):
+    monkeypatch.setattr("qcp_omics.mixins.qc_mixin.DUPLICATE_CHUNK_SIZE", 16)
+    metadata = {"dtypes": {}, "steps_to_run": [{"step": "identify_duplicates", "method": method}]}
+    dummy = DummyQC(duplicated_dataset.copy(), metadata)
+    result = dummy.identify_duplicates(method=method)
+
+    assert result["samples"] == [["s2", "s5"]]
+    assert result["features"] == [["g3", "g10"], ["batch", "batch_copy"]]
+    assert [pair[:2] for pair in result["near_samples"]] == [("s4", "s9")]
+    assert [pair[:2] for pair in result["near_features"]] == [("g5", "g20")]
+    assert result["near_features"][0][2] > 0.99
+    assert result["n_duplicate_samples"] == 1
+    assert result["n_duplicate_features"] == 2
+
+    if method == "drop":
+        assert dummy.data.shape == (39, 60)
+        assert "s5" not in dummy.data.index
+        assert "g10" not in dummy.data.columns and "batch_copy" not in dummy.data.columns
+    else:
+        assert dummy.data.shape == (40, 62)
+
+
+def test_identify_duplicates_numeric_matrix(duplicated_dataset):
+    metadata = {"dtypes": {}, "steps_to_run": [], "numeric_backend": "array"}
+    expected = DummyQC(duplicated_dataset.copy(), metadata).identify_duplicates(method="drop")
+
+    dummy = DummyQC(duplicated_dataset.copy(), metadata)
+    dummy.build_numeric_matrix()
+    result = dummy.identify_duplicates(method="drop")
+
+    assert result["samples"] == expected["samples"]
+    assert sorted(result["features"]) == sorted(expected["features"])
+    assert result["near_samples"] == pytest.approx(expected["near_samples"])
+    assert dummy.data_numerical.shape == (39, 59)
+    assert dummy.data.index.tolist() == dummy.data_numerical.index.tolist()
+    assert "g10" not in dummy.data_numerical.columns
+
+
+def test_band_candidates_skip_large_buckets():
+    quantized = np.zeros((50, 8), dtype=np.int64)
+    quantized[[3, 17], 4:] = 1
+    pairs = DummyQC._band_candidates(quantized, n_bands=2)
+    assert pairs.tolist() == [[3, 17]]
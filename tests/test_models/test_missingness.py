@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from qcp_omics.models.missingness import MissingnessProfile
+
+
+@pytest.fixture
+def mask():
+    rng = np.random.default_rng(0)
+    mask = rng.random((12, 21)) < 0.3
+    mask[0] = False
+    mask[[1, 2, 3]] = mask[1]
+    return mask
+
+
+@pytest.mark.parametrize("block_sizes", [[21], [5, 3, 13], [8, 8, 5], [1] * 21])
+def test_from_blocks(mask, block_sizes):
+    samples = pd.Index([f"s{i}" for i in range(12)])
+    features = pd.Index([f"f{i}" for i in range(21)])
+    bounds = np.cumsum([0] + block_sizes)
+    blocks = [mask[:, start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    profile = MissingnessProfile.from_blocks(blocks, samples, features)
+
+    assert profile.bits.shape == (12, 3)
+    np.testing.assert_array_equal(np.unpackbits(profile.bits, axis=1, count=21).astype(bool), mask)
+    np.testing.assert_array_equal(profile.feature_counts, mask.sum(axis=0))
+    np.testing.assert_allclose(profile.sample_rates.to_numpy(), mask.mean(axis=1) * 100)
+    np.testing.assert_array_equal(profile.feature_mask(17), mask[:, 17])
+    assert profile.matches(samples, features)
+    assert not profile.matches(samples, features[:-1])
+
+
+def test_patterns(mask):
+    samples = pd.Index(range(12))
+    features = pd.Index([f"f{i}" for i in range(21)])
+    profile = MissingnessProfile.from_blocks([mask], samples, features)
+
+    missing_features, count = profile.patterns(top_n=1)[0]
+    assert count == 3
+    assert missing_features == features[mask[1]].tolist()
+    assert sum(count for _, count in profile.patterns(top_n=20)) == 11
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qcp_omics.models.clinical_data import ClinicalData
+from qcp_omics.models.numeric_matrix import NumericMatrix
+
+
+@pytest.fixture
+def numeric_df():
+    return pd.DataFrame({
+        "G1": [1.0, 2.0, np.nan, 4.0, 5.0],
+        "G2": [10, 20, 30, 40, 50],
+        "G3": [0.5, 0.1, 0.2, 0.3, 0.4]
+    }, index=["s1", "s2", "s3", "s4", "s5"])
+
+
+@pytest.mark.parametrize("memmap", [False, True])
+def test_from_frame(numeric_df, tmp_path, memmap):
+    matrix = NumericMatrix.from_frame(numeric_df, memmap_dir=str(tmp_path) if memmap else None)
+    assert matrix.shape == (5, 3)
+    assert matrix.values.flags["F_CONTIGUOUS"]
+    assert list(matrix.columns) == ["G1", "G2", "G3"]
+    assert list(matrix.index) == ["s1", "s2", "s3", "s4", "s5"]
+    pd.testing.assert_frame_equal(matrix.to_frame(), numeric_df.astype(float))
+    assert isinstance(matrix.values, np.memmap) is memmap
+    # The backing file is unlinked once mapped
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_take_samples_and_drop_features(numeric_df):
+    matrix = NumericMatrix.from_frame(numeric_df)
+    subset = matrix.take_samples(np.array([4, 0]))
+    assert list(subset.index) == ["s5", "s1"]
+    assert subset.values[:, 1].tolist() == [50.0, 10.0]
+
+    matrix.drop_features(["G2"])
+    assert list(matrix.columns) == ["G1", "G3"]
+    assert matrix.values[:, 1].tolist() == [0.5, 0.1, 0.2, 0.3, 0.4]
+
+
+def test_to_frame_shares_memory(numeric_df):
+    matrix = NumericMatrix.from_frame(numeric_df)
+    assert np.shares_memory(matrix.to_frame().to_numpy(), matrix.values)
+    assert matrix.to_frame(n_rows=2, features=["G3"]).shape == (2, 1)
+
+
+@pytest.mark.parametrize("backend,imputation", [("array", "mean"), ("memmap", "mean"), ("array", "knn")])
+def test_pipeline_matches_dataframe_backend(numeric_df, tmp_path, backend, imputation):
+    data = numeric_df.copy()
+    data["G2"] = data["G2"].astype(float)
+    data.loc["s2", "G3"] = 9.0
+    data["C1"] = pd.Series(["a", "b", "a", "b", "a"], index=data.index, dtype="category")
+    steps = [
+        {"step": "identify_missing_values"},
+        {"step": "handle_missing_values", "method": imputation},
+        {"step": "handle_outliers", "method": "IQR"},
+        {"step": "split_numerical_categorical"},
+        {"step": "scale_numerical_features", "method": "standard_scaler"},
+        {"step": "transform_numerical_features", "method": "log2"},
+    ]
+
+    results = {}
+    for numeric_backend in ["dataframe", backend]:
+        metadata = {"dtypes": {}, "steps_to_run": steps, "numeric_backend": numeric_backend,
+                    "output_path": str(tmp_path)}
+        model = ClinicalData(data.copy(), metadata)
+        model.build_numeric_matrix()
+        model.execute_steps()
+        results[numeric_backend] = model
+
+    expected, actual = results["dataframe"], results[backend]
+    assert isinstance(actual.data_numerical, NumericMatrix)
+    pd.testing.assert_frame_equal(actual.data_numerical.to_frame(), expected.data_numerical)
+    pd.testing.assert_frame_equal(actual.data_categorical, expected.data_categorical)
+    assert actual.report_data[0]["output"] == expected.report_data[0]["output"]
+    assert actual.report_data[2]["output"]["outliers"] == expected.report_data[2]["output"]["outliers"]
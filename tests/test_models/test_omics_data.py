@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 
 from qcp_omics.models.omics_data import OmicsData
@@ -51,6 +52,14 @@ def test_map_dtypes(sample_data, sample_metadata):
     assert str(od.data["GeneB"].dtype) == "float64"
 
 
+def test_map_dtypes_keeps_parsed_columns(sample_metadata):
+    data = pd.DataFrame({"GeneA": [1, 2, 3], "GeneB": [4.0, 5.0, 6.0]}, index=["S1", "S2", "S3"])
+    gene_b = data["GeneB"].to_numpy()
+    od = DummyOmicsData(data, sample_metadata)
+    od.map_dtypes()
+    assert np.shares_memory(od.data["GeneB"].to_numpy(), gene_b)
+
+
 def test_execute_steps(sample_data, sample_metadata):
     sample_metadata["features_cols"] = False
     od = DummyOmicsData(sample_data, sample_metadata)
@@ -83,3 +92,81 @@ def test_save_data_files(has_numerical, has_categorical, has_test, sample_data,
         assert test_path.exists() is True
     else:
         assert test_path.exists() is False
+
+
+def test_save_data_files_output_format(sample_data, sample_metadata, tmp_path):
+    sample_metadata["output_format"] = "csv.gz"
+    od = DummyOmicsData(sample_data, sample_metadata)
+    od.data_numerical = sample_data
+    od.data_categorical = pd.DataFrame()
+    od.test_set = sample_data
+
+    od.save_data_files()
+
+    assert (tmp_path / "train_data.csv.gz").exists()
+    assert (tmp_path / "test_data.csv.gz").exists()
+    train = pd.read_csv(tmp_path / "train_data.csv.gz", index_col=0)
+    pd.testing.assert_frame_equal(train, sample_data)
+
+
+def test_save_data_files_keeps_index(sample_data, sample_metadata, tmp_path):
+    od = DummyOmicsData(sample_data, sample_metadata)
+    od.data_numerical = sample_data
+    od.data_categorical = pd.DataFrame({"Group": ["a", "b", "a"]}, index=sample_data.index).astype("category")
+    od.test_set = sample_data.iloc[:1]
+
+    od.save_data_files()
+
+    train = pd.read_csv(tmp_path / "train_data.csv", index_col=0)
+    assert list(train.index) == ["S1", "S2", "S3"]
+    assert list(train.columns) == ["GeneA", "GeneB", "Group"]
+    assert list(pd.read_csv(tmp_path / "test_data.csv", index_col=0).index) == ["S1"]
+
+
+def test_compact_dtypes(tmp_path):
+    data = pd.DataFrame({
+        "GeneA": [1.5, 2.5, 3.5, 4.5],
+        "Count": [1, 2, 3, 4],
+        "Group": ["a", "b", "a", "b"],
+    }, index=["S1", "S2", "S3", "S4"])
+    metadata = {
+        "dtypes": {"GeneA": "float", "Count": "int", "Group": "str"},
+        "memory_mode": "compact",
+        "steps_to_run": [],
+    }
+    od = DummyOmicsData(data, metadata)
+    footprint = od.compact_dtypes()
+
+    assert od.data["GeneA"].dtype == np.float32
+    assert od.data["Count"].dtype == np.int8
+    assert isinstance(od.data["Group"].dtype, pd.CategoricalDtype)
+    assert footprint.loc["total", "after (bytes)"] < footprint.loc["total", "before (bytes)"]
+    assert od.report_data[-1]["step"] == "compact_dtypes"
+
+
+@pytest.mark.parametrize("memory_mode,expected", [("compact", np.float32), ("default", np.float64)])
+def test_compact_floats(memory_mode, expected):
+    data = pd.DataFrame({"GeneA": [1.5, 2.5], "Count": [1, 2]}, index=["S1", "S2"])
+    od = DummyOmicsData(data, {"dtypes": {}, "memory_mode": memory_mode, "steps_to_run": []})
+
+    compacted = od.compact_floats(data)
+
+    assert compacted["GeneA"].dtype == expected
+    assert compacted["Count"].dtype == np.int64
+
+
+@pytest.mark.parametrize("backend", ["dataframe", "array"])
+def test_save_data_files_without_split(backend, tmp_path):
+    from qcp_omics.models.genomics_data import GenomicsData
+
+    data = pd.DataFrame({"GeneA": [1.0, np.nan, 3.0], "GeneB": [4.0, 5.0, 6.0]}, index=["S1", "S2", "S3"])
+    steps = [{"step": "identify_missing_values"}, {"step": "handle_missing_values", "method": "median"}]
+    metadata = {"dtypes": {}, "steps_to_run": steps, "numeric_backend": backend, "output_path": str(tmp_path)}
+    od = GenomicsData(data, metadata)
+    od.build_numeric_matrix()
+    od.execute_steps()
+
+    # QC-only runs leave the split outputs unset, which are skipped instead of failing
+    od.save_data_files()
+    assert not (tmp_path / "test_data.csv").exists()
+    assert (tmp_path / "train_data.csv").exists() is (backend == "array")
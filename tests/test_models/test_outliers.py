@@ -0,0 +1,51 @@
+import numpy as np
+from qcp_omics.models.outliers import OutlierCoo
+
+
+def make_outliers():
+    values = np.array([
+        [1.0, 10.0, 0.0],
+        [50.0, 11.0, 0.0],
+        [2.0, -40.0, 0.0],
+        [-9.0, 12.0, 0.0],
+    ])
+    mask = np.array([
+        [False, False, False],
+        [True, False, False],
+        [False, True, False],
+        [True, False, False],
+    ])
+    return OutlierCoo.from_mask(mask, values, ["s1", "s2", "s3", "s4"], ["a", "b", "c"]), values
+
+
+def test_from_mask():
+    outliers, _ = make_outliers()
+    assert outliers.rows.tolist() == [1, 3, 2]
+    assert outliers.cols.tolist() == [0, 0, 1]
+    assert outliers.values.tolist() == [50.0, -9.0, -40.0]
+    assert outliers.n_outliers == 3
+
+
+def test_concat_blocks():
+    outliers, values = make_outliers()
+    samples, features = outliers.samples, outliers.features
+    mask = np.zeros(values.shape, dtype=bool)
+    mask[[1, 3], 0] = True
+    mask[2, 1] = True
+    parts = [
+        OutlierCoo.from_mask(mask[:, :1], values[:, :1], samples, features),
+        OutlierCoo.from_mask(mask[:, 1:], values[:, 1:], samples, features, col_offset=1),
+    ]
+
+    combined = OutlierCoo.concat(parts, samples, features)
+    assert combined.cols.tolist() == outliers.cols.tolist()
+    assert combined.values.tolist() == outliers.values.tolist()
+    assert OutlierCoo.concat([], samples, features).n_outliers == 0
+
+
+def test_counts_and_summary():
+    outliers, values = make_outliers()
+    assert outliers.counts().to_dict() == {"a": 2, "b": 1}
+
+    summary = outliers.summary(np.median(values, axis=0), top_features=1, top_examples=1)
+    assert summary == {"a": [("s2", 50.0)]}
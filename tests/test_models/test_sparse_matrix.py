@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+
+from qcp_omics.models.genomics_data import GenomicsData
+from qcp_omics.models.numeric_matrix import NumericMatrix
+from qcp_omics.models.sparse_matrix import SparseMatrix
+
+
+@pytest.fixture
+def counts_df():
+    rng = np.random.default_rng(0)
+    counts = rng.poisson(0.3, (60, 12)) * rng.integers(1, 20, (60, 12))
+    data = pd.DataFrame(
+        counts.astype(float), index=[f"s{i}" for i in range(60)], columns=[f"G{i}" for i in range(12)]
+    )
+    data.iloc[4, 0] = 500.0
+    data.iloc[[3, 8], 5] = np.nan
+    return data
+
+
+def test_from_frame(counts_df):
+    matrix = SparseMatrix.from_frame(counts_df)
+    assert sparse.isspmatrix_csc(matrix.values)
+    # Zeros are implicit, missing values are stored
+    assert matrix.values.nnz == np.count_nonzero(counts_df.fillna(1).to_numpy())
+    assert matrix.density < 0.5
+    pd.testing.assert_frame_equal(matrix.to_frame(), counts_df)
+    assert matrix.to_frame(n_rows=2, features=["G5"]).shape == (2, 1)
+
+    block = next(matrix.blocks(fill_value=np.nan))[1]
+    np.testing.assert_array_equal(np.isnan(block), (counts_df == 0).to_numpy() | counts_df.isna().to_numpy())
+    assert isinstance(matrix.to_dense(), NumericMatrix)
+
+
+def test_take_samples_drop_features_and_fill(counts_df):
+    matrix = SparseMatrix.from_frame(counts_df)
+    subset = matrix.take_samples(np.array([8, 0]))
+    pd.testing.assert_frame_equal(subset.to_frame(), counts_df.iloc[[8, 0]])
+
+    matrix.drop_features(["G1"])
+    assert "G1" not in matrix.columns and matrix.shape == (60, 11)
+
+    fill = np.zeros(matrix.shape[1])
+    matrix.fill_missing(fill)
+    assert not np.isnan(matrix.values.data).any()
+    assert matrix.values.nnz == np.count_nonzero(counts_df.drop(columns="G1").fillna(0).to_numpy())
+
+
+def test_pipeline_matches_array_backend(counts_df):
+    steps = [
+        {"step": "identify_missing_values"},
+        {"step": "sample_qc"},
+        {"step": "handle_missing_values", "method": "median"},
+        {"step": "split_numerical_categorical"},
+        {"step": "descriptive_statistics"},
+    ]
+    results = {}
+    for backend in ["array", "sparse"]:
+        model = GenomicsData(counts_df.copy(), {"dtypes": {}, "steps_to_run": steps, "numeric_backend": backend})
+        model.build_numeric_matrix()
+        model.execute_steps()
+        results[backend] = model
+
+    expected, actual = results["array"], results["sparse"]
+    assert isinstance(actual.data_numerical, SparseMatrix)
+    pd.testing.assert_frame_equal(actual.data_numerical.to_frame(), expected.data_numerical.to_frame())
+    for position in [0, 1, 3]:
+        output = actual.report_data[position]["output"]
+        assert output == expected.report_data[position]["output"]
+
+
+def test_sparse_preprocessing(counts_df):
+    steps = [
+        {"step": "handle_missing_values", "method": "constant"},
+        {"step": "handle_outliers", "method": "IQR"},
+        {"step": "split_train_test"},
+        {"step": "split_numerical_categorical"},
+        {"step": "scale_numerical_features", "method": "standard_scaler"},
+        {"step": "transform_numerical_features", "method": "log1p"},
+    ]
+    model = GenomicsData(counts_df.copy(), {"dtypes": {}, "steps_to_run": steps, "numeric_backend": "sparse"})
+    model.build_numeric_matrix()
+    model.execute_steps()
+
+    # Zeros are never outliers, so outliers are replaced with the median of the non-zero values
+    assert isinstance(model.data_numerical, SparseMatrix)
+    assert ("s4", "G0") in [(model.outliers.samples[row], model.outliers.features[col])
+                            for row, col in zip(model.outliers.rows, model.outliers.cols)]
+    assert (model.outliers.values != 0).all()
+    assert model.data_numerical.values.nnz == np.count_nonzero(counts_df.loc[model.data.index].fillna(0).to_numpy())
+
+    # New samples go through the same steps, keeping their zeros
+    state = model.transform_state
+    assert np.all(state.steps[2].params["center"] == 0)
+    applied = state.apply(counts_df)
+    pd.testing.assert_frame_equal(applied.loc[model.test_set.index], model.test_set, check_dtype=False)
+    train = model.data_numerical.to_frame()
+    pd.testing.assert_frame_equal(applied.loc[train.index], train, check_dtype=False)
+    assert (applied.to_numpy()[counts_df.fillna(0).to_numpy() == 0] == 0).all()
+
+
+def test_sparse_densifies_and_decomposes(counts_df):
+    data = counts_df.fillna(0)
+    model = GenomicsData(data, {"dtypes": {}, "steps_to_run": [], "numeric_backend": "sparse", "pca_components": 3})
+    model.build_numeric_matrix()
+    model.split_numerical_categorical()
+
+    # PCA is a truncated SVD of the uncentered values
+    expected = TruncatedSVD(n_components=3, random_state=42).fit_transform(data.to_numpy())
+    np.testing.assert_allclose(model._run_pca("full")["pca_data"], expected)
+
+    # Box-Cox does not keep zeros at 0
+    model.transform_numerical_features(method="box-cox")
+    assert type(model.data_numerical) is NumericMatrix
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from qcp_omics.models.streaming_profile import Moments, QuantileSketch, StreamingProfile
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=(60, 7))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    df = pd.DataFrame(values, index=[f"s{i}" for i in range(60)], columns=[f"f{i}" for i in range(7)])
+    df["group"] = pd.Categorical(rng.choice(["x", "y", None], size=60))
+    return df
+
+
+def expected_statistics(df):
+    expected = df.describe().T
+    expected["kurtosis"] = df.kurt()
+    expected["skewness"] = df.skew()
+    return expected
+
+
+@pytest.mark.parametrize("row_blocks", [True, False])
+def test_profile_matches_pandas(dataset, row_blocks):
+    if row_blocks:
+        blocks = [dataset.iloc[start:start + 16] for start in range(0, 60, 16)]
+    else:
+        blocks = [dataset.iloc[:, start:start + 3] for start in range(0, 8, 3)]
+    numeric = [f"f{i}" for i in range(7)]
+
+    profile = StreamingProfile.from_blocks(blocks, numeric, row_blocks=row_blocks)
+
+    assert profile.samples.equals(dataset.index)
+    assert profile.features.equals(dataset.columns)
+    pd.testing.assert_series_equal(profile.feature_rates, dataset.isna().mean() * 100)
+    pd.testing.assert_series_equal(profile.sample_rates, dataset.isna().mean(axis=1) * 100)
+    pd.testing.assert_frame_equal(
+        profile.statistics(), expected_statistics(dataset[numeric]), check_names=False
+    )
+
+
+def test_moments_merge_in_any_order():
+    rng = np.random.default_rng(0)
+    values = rng.normal(5, 2, size=(500, 3))
+    parts = [Moments.from_values(values[start:start + 70]) for start in range(0, 500, 70)]
+
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+    merged_reversed = parts[-1]
+    for part in parts[-2::-1]:
+        merged_reversed = merged_reversed.merge(part)
+
+    expected = Moments.from_values(values)
+    for actual in (merged, merged_reversed):
+        for name in Moments._fields:
+            np.testing.assert_allclose(getattr(actual, name), getattr(expected, name), rtol=1e-9)
+
+
+def test_sketch_rank_error_and_size():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=(100_000, 4))
+    values[:, 3] = np.nan
+    sketch = QuantileSketch(4, k=200)
+    for start in range(0, len(values), 3000):
+        sketch.update(values[start:start + 3000])
+
+    assert sum(len(level) for level in sketch.levels) < 1000
+    estimates = sketch.quantiles([0.01, 0.25, 0.5, 0.75, 0.99])
+    for column in range(3):
+        ranks = np.searchsorted(np.sort(values[:, column]), estimates[:, column]) / len(values)
+        np.testing.assert_allclose(ranks, [0.01, 0.25, 0.5, 0.75, 0.99], atol=0.01)
+    assert np.isnan(estimates[:, 3]).all()
+
+
+def test_sketch_merge_and_hstack():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(5000, 2))
+    first, second = QuantileSketch(2), QuantileSketch(2)
+    first.update(values[:2000])
+    second.update(values[2000:])
+    first.merge(second)
+    np.testing.assert_allclose(first.quantiles([0.5]), [np.median(values, axis=0)], atol=0.05)
+
+    small = QuantileSketch(1)
+    small.update(values[:10, :1])
+    stacked = QuantileSketch.hstack([first, small])
+    np.testing.assert_allclose(stacked.quantiles([0.5])[0, 2], np.median(values[:10, 0]))
+    np.testing.assert_allclose(stacked.quantiles([0.5])[0, 0], first.quantiles([0.5])[0, 0])
+
+
+def test_outlier_bounds(dataset):
+    profile = StreamingProfile.from_frame(dataset, [f"f{i}" for i in range(7)])
+    numeric = dataset.drop(columns="group")
+
+    lower, upper = profile.outlier_bounds("iqr")
+    q1, q3 = numeric.quantile(0.25), numeric.quantile(0.75)
+    np.testing.assert_allclose(lower, q1 - 1.5 * (q3 - q1))
+    np.testing.assert_allclose(upper, q3 + 1.5 * (q3 - q1))
+
+    lower, upper = profile.outlier_bounds("zscore", threshold=3.0)
+    np.testing.assert_allclose(upper, numeric.mean() + 3 * numeric.std())
+
+    with pytest.raises(ValueError, match="streaming profile"):
+        profile.outlier_bounds("mad")
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qcp_omics.models.clinical_data import ClinicalData
+from qcp_omics.models.transform_state import FittedStep, TransformState
+
+
+@pytest.fixture
+def raw_df():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(
+        {f"G{i}": rng.lognormal(1, 0.5, 40) for i in range(4)},
+        index=[f"s{i}" for i in range(40)]
+    )
+    data.iloc[[3, 11, 25], 1] = np.nan
+    data.iloc[[5, 30], 2] = 60.0
+    data["Flat"] = 1.0
+    data["C1"] = pd.Series(rng.choice(["a", "b"], 40), index=data.index, dtype="category")
+    data.iloc[[0, 7], -1] = np.nan
+    return data
+
+
+def test_save_and_load(tmp_path):
+    state = TransformState([
+        FittedStep("handle_missing_values", "mean", {
+            "dropped": ["X"], "modes": {"C1": "a"}, "features": ["G1", 2], "fill": np.array([1.5, 2.0])
+        }),
+        FittedStep("transform_numerical_features", "box-cox", {
+            "features": ["G1", 2], "shift": np.zeros(2), "transformed": np.array([True, False]),
+            "lambdas": np.array([0.5, np.nan])
+        })
+    ])
+    path = tmp_path / "state.npz"
+    state.save(str(path))
+    loaded = TransformState.load(str(path))
+
+    assert [fitted.step for fitted in loaded.steps] == ["handle_missing_values", "transform_numerical_features"]
+    assert loaded.steps[0].params["modes"] == {"C1": "a"}
+    assert loaded.steps[0].params["features"] == ["G1", 2]
+    np.testing.assert_array_equal(loaded.steps[1].params["lambdas"], [0.5, np.nan])
+    assert loaded.steps[1].params["transformed"].dtype == bool
+
+
+def test_apply_step_checks_features():
+    fitted = FittedStep("scale_numerical_features", "standard_scaler", {
+        "features": ["G1", "G2"], "center": np.zeros(2), "scale": np.ones(2)
+    })
+    with pytest.raises(ValueError, match="missing from the data"):
+        TransformState.apply_step(pd.DataFrame({"G1": [1.0]}), fitted)
+
+
+def test_apply_step_fills_mode_missing_from_categories():
+    fitted = FittedStep("handle_missing_values", "mean", {"modes": {"C1": "a"}})
+    batch = pd.DataFrame({"C1": pd.Categorical(["b", None, "c"])})
+
+    filled = TransformState.apply_step(batch, fitted)
+
+    assert filled["C1"].tolist() == ["b", "a", "c"]
+    assert isinstance(filled["C1"].dtype, pd.CategoricalDtype)
+    assert batch["C1"].cat.categories.tolist() == ["b", "c"]
+
+
+@pytest.mark.parametrize("backend,transformation", [
+    ("dataframe", "box-cox"), ("array", "box-cox"), ("dataframe", "yeo-johnson"), ("array", "yeo-johnson"),
+    ("dataframe", "log1p"), ("array", "asinh")
+])
+def test_apply_reproduces_pipeline(raw_df, backend, transformation):
+    metadata = {
+        "dtypes": {}, "numeric_backend": backend, "steps_to_run": [
+            {"step": "identify_missing_values"},
+            {"step": "handle_missing_values", "method": "median"},
+            {"step": "handle_outliers", "method": "iqr"},
+            {"step": "split_train_test"},
+            {"step": "split_numerical_categorical"},
+            {"step": "filter_low_variance", "method": "near_zero"},
+            {"step": "scale_numerical_features", "method": "robust_scaler"},
+            {"step": "transform_numerical_features", "method": transformation},
+        ]
+    }
+    model = ClinicalData(raw_df.copy(), metadata)
+    model.build_numeric_matrix()
+    model.execute_steps()
+
+    state = model.transform_state
+    assert [fitted.step for fitted in state.steps] == [
+        "handle_missing_values", "handle_outliers", "filter_low_variance",
+        "scale_numerical_features", "transform_numerical_features"
+    ]
+
+    # The test set went through the steps fitted after the split, and new samples through all of them
+    applied = state.apply(raw_df)
+    test_set = model.test_set
+    assert "Flat" not in test_set.columns
+    pd.testing.assert_frame_equal(applied.loc[test_set.index, test_set.columns], test_set, check_dtype=False)
+
+    data_numerical = model.data_numerical
+    if backend == "array":
+        data_numerical = data_numerical.to_frame()
+    pd.testing.assert_frame_equal(
+        applied.loc[data_numerical.index, data_numerical.columns], data_numerical, check_dtype=False
+    )
+    assert applied["C1"].notna().all()
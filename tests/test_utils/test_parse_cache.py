@@ -0,0 +1,109 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from qcp_omics.utils import parse_cache
+from qcp_omics.utils.parse_cache import cache_key, evict, load_dataset_cached, load_entry, store_dataset
+
+
+@pytest.fixture
+def dataset_file(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ID,Num,Group,Count,Other\nA,1.5,x,1,2.5\nB,,y,2,3.5\nC,3.5,x,3,4.5\n", encoding="utf-8")
+    return str(csv_file)
+
+
+DTYPES = {"Num": "float", "Group": "category", "Count": "int", "Other": "float"}
+
+
+def test_store_and_load_entry(tmp_path, dataset_file):
+    df = pd.read_csv(dataset_file, index_col=0)
+    df["Group"] = df["Group"].astype("category")
+    entry = tmp_path / "cache" / "entry"
+
+    store_dataset(df, entry)
+    loaded = load_entry(entry)
+
+    pd.testing.assert_frame_equal(loaded, df)
+    # The float columns are views of the memory-mapped cache file
+    base = loaded["Num"].to_numpy()
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert base is not None
+
+
+def test_load_dataset_cached_hit(tmp_path, dataset_file, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    first = load_dataset_cached(dataset_file, cache_dir, dtypes=DTYPES)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("dataset parsed again")
+
+    monkeypatch.setattr(parse_cache, "release_dataset", fail)
+    second = load_dataset_cached(dataset_file, cache_dir, dtypes=DTYPES)
+    pd.testing.assert_frame_equal(second, first)
+
+    # Changes made by the pipeline stay in memory
+    second.loc["A", "Num"] = 100.0
+    pd.testing.assert_frame_equal(load_dataset_cached(dataset_file, cache_dir, dtypes=DTYPES), first)
+
+
+def test_cache_key_depends_on_content_and_metadata(tmp_path, dataset_file):
+    key = cache_key(dataset_file, DTYPES, True)
+    assert cache_key(dataset_file, DTYPES, False) != key
+    assert cache_key(dataset_file, {**DTYPES, "Count": "float"}, True) != key
+
+    with open(dataset_file, "a", encoding="utf-8") as f:
+        f.write("D,4.5,y,4,5.5\n")
+    assert cache_key(dataset_file, DTYPES, True) != key
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache_dir = tmp_path / "cache"
+    df = pd.DataFrame({"Value": np.arange(100, dtype=np.float64)})
+    for i, name in enumerate(["old", "recent", "new"]):
+        store_dataset(df, cache_dir / name)
+        os.utime(cache_dir / name, (i, i))
+    entry_size = sum(f.stat().st_size for f in (cache_dir / "old").iterdir())
+
+    evicted = evict(cache_dir, 2 * entry_size)
+
+    assert evicted == [cache_dir / "old"]
+    assert sorted(p.name for p in cache_dir.iterdir()) == ["new", "recent"]
+
+
+def test_store_dataset_without_pickle(tmp_path):
+    df = pd.DataFrame({
+        "Label": ["a", np.nan, "c"],
+        "Group": pd.Categorical(["x", "y", "x"], categories=["y", "x"], ordered=True),
+        "Count": np.array([1, 2, 3], dtype=np.int16),
+        "Flag": [True, False, True],
+    }, index=pd.Index(["S1", "S2", "S3"], name="ID"))
+    entry = tmp_path / "cache" / "entry"
+
+    store_dataset(df, entry)
+    with np.load(entry / parse_cache.FRAME_FILE, allow_pickle=False) as archive:
+        assert all(archive[name].dtype != object for name in archive.files)
+    pd.testing.assert_frame_equal(load_entry(entry), df)
+
+    df["Label"] = [1, "b", 2.5]
+    with pytest.raises(ValueError):
+        store_dataset(df, tmp_path / "cache" / "mixed")
+
+
+def test_load_dataset_cached_skips_oversized_dataset(tmp_path, dataset_file, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    stored = []
+    monkeypatch.setattr(parse_cache, "store_dataset", lambda df, entry: stored.append(entry))
+
+    load_dataset_cached(dataset_file, str(cache_dir), dtypes=DTYPES, max_bytes=16)
+    assert stored == []
+
+    # Older entries are evicted before the new one is stored, never the new one itself
+    monkeypatch.undo()
+    old = cache_dir / "old"
+    store_dataset(pd.DataFrame({"Value": np.arange(100, dtype=np.float64)}), old)
+    df = load_dataset_cached(dataset_file, str(cache_dir), dtypes=DTYPES, max_bytes=int(1.5 * 1024))
+    assert not old.exists()
+    assert [p.name for p in cache_dir.iterdir()] == [cache_key(dataset_file, DTYPES, True)]
+    pd.testing.assert_frame_equal(load_dataset_cached(dataset_file, str(cache_dir), dtypes=DTYPES), df)
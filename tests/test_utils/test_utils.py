@@ -1,7 +1,20 @@
+import gzip
 import pytest
+import numpy as np
 import pandas as pd
 from click import UsageError
-from qcp_omics.utils.utils import load_dataset, handle_json_input
+from qcp_omics.utils.utils import (
+    load_dataset,
+    save_dataset,
+    save_dataset_blocks,
+    get_dataset_format,
+    handle_json_input,
+    get_dataset,
+    release_dataset,
+    iter_dataset_blocks,
+    probe_dataset,
+    check_dtype_plausibility
+)
 
 
 def test_load_dataset_csv(tmp_path):
@@ -31,6 +44,229 @@ def test_load_dataset_unsupported_ext(tmp_path):
         load_dataset(str(txt_file))
 
 
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_load_dataset_with_dtypes(tmp_path, chunksize):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ID,Num,Cat,Label\nA,1,x,0\nB,,y,1\nC,3,x,1\nD,4,z,0\nE,5,y,0\n", encoding="utf-8")
+
+    df = load_dataset(str(csv_file), dtypes={"Num": "float", "Cat": "category", "Label": "category"}, chunksize=chunksize)
+    assert df.shape == (5, 3)
+    assert df["Num"].dtype == "float64"
+    assert isinstance(df["Cat"].dtype, pd.CategoricalDtype)
+    assert list(df["Cat"].cat.categories) == ["x", "y", "z"]
+    assert list(df["Label"].cat.categories) == [0, 1]
+    assert list(df.index) == ["A", "B", "C", "D", "E"]
+
+
+def test_load_dataset_with_implausible_dtypes(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ID,Num\nA,1\nB,x\n", encoding="utf-8")
+
+    df = load_dataset(str(csv_file), dtypes={"Num": "float"})
+    assert df["Num"].tolist() == ["1", "x"]
+
+
+@pytest.mark.parametrize("file_name,expected", [
+    ("data.csv", ("csv", None)),
+    ("data.TSV", ("tsv", None)),
+    ("data.csv.gz", ("csv", "gzip")),
+    ("data.tsv.bz2", ("tsv", "bz2")),
+    ("data.csv.xz", ("csv", "xz")),
+    ("data.TSV.ZST", ("tsv", "zstd")),
+    ("data.parquet", ("parquet", None)),
+    ("data.arrow", ("feather", None)),
+])
+def test_get_dataset_format(file_name, expected):
+    assert get_dataset_format(file_name) == expected
+
+
+def test_get_dataset_format_compressed_columnar():
+    with pytest.raises(ValueError, match="Unsupported file extension: .parquet.gz"):
+        get_dataset_format("data.parquet.gz")
+
+
+@pytest.mark.parametrize("file_name", [
+    "data.csv", "data.tsv.gz", "data.csv.bz2", "data.tsv.xz", "data.csv.zst", "data.parquet", "data.feather"
+])
+def test_save_and_load_dataset_roundtrip(tmp_path, file_name):
+    if file_name.endswith((".parquet", ".feather")):
+        pytest.importorskip("pyarrow")
+    if file_name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    df = pd.DataFrame({"Value": [1.5, 2.5], "Other": [3, 4]}, index=pd.Index(["A", "B"], name="ID"))
+    path = str(tmp_path / file_name)
+
+    save_dataset(df, path)
+    loaded = load_dataset(path)
+    pd.testing.assert_frame_equal(loaded, df)
+
+
+@pytest.mark.parametrize("file_name", ["data.csv", "data.tsv.gz", "data.csv.zst", "data.parquet", "data.feather"])
+def test_save_dataset_blocks(tmp_path, file_name, monkeypatch):
+    if file_name.endswith((".parquet", ".feather")):
+        pytest.importorskip("pyarrow")
+    if file_name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    monkeypatch.setattr("qcp_omics.utils.utils.WRITE_CHUNKSIZE", 2)
+    index = pd.Index(["A", "B", "C"], name="ID")
+    numerical = pd.DataFrame({"Value": [1.5, 2.5, 3.5]}, index=index)
+    categorical = pd.DataFrame({"Group": pd.Categorical(["x", "y", "x"])}, index=index)
+    path = str(tmp_path / file_name)
+
+    save_dataset_blocks([numerical, categorical, pd.DataFrame(index=index)], path)
+    loaded = load_dataset(path)
+    expected = pd.concat([numerical, categorical], axis=1)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize("file_name,chunksize", [("data.csv", None), ("data.csv", 2), ("data.csv.gz", None)])
+def test_load_dataset_features_in_rows(tmp_path, file_name, chunksize):
+    content = "Feature,S1,S2,S3\nA,1,2,3\nGroup,x,y,x\nB,4.5,,6\nLabel,0,1,1\n"
+    path = tmp_path / file_name
+    if file_name.endswith(".gz"):
+        with gzip.open(path, "wt") as f:
+            f.write(content)
+    else:
+        path.write_text(content, encoding="utf-8")
+    dtypes = {"A": "int", "Group": "category", "B": "float", "Label": "category"}
+
+    df = load_dataset(str(path), dtypes=dtypes, chunksize=chunksize, features_cols=False)
+    assert list(df.index) == ["S1", "S2", "S3"]
+    assert list(df.columns) == ["A", "Group", "B", "Label"]
+    assert df["A"].tolist() == [1.0, 2.0, 3.0]
+    assert np.isnan(df.loc["S2", "B"])
+    assert list(df["Group"].cat.categories) == ["x", "y"]
+    assert list(df["Label"].cat.categories) == [0, 1]
+
+
+def test_load_dataset_features_in_rows_numeric(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("Feature,S1,S2\nA,1,2\nB,3,4\n", encoding="utf-8")
+
+    df = load_dataset(str(csv_file), dtypes={"A": "float", "B": "float"}, features_cols=False)
+    expected = load_dataset(str(csv_file)).T.astype("float64")
+    pd.testing.assert_frame_equal(df, expected, check_names=False)
+    # The numerical block is a single float array, not a transposed copy per column
+    assert df._mgr.nblocks == 1
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_load_dataset_features_in_rows_duplicate_features(tmp_path, chunksize):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("Feature,S1,S2,S3\nA,1,2,3\nG,x,y,x\nB,4,5,6\nA,7,8,9\nG,y,y,x\n", encoding="utf-8")
+
+    df = load_dataset(str(csv_file), dtypes={"A": "float", "B": "float", "G": "category"},
+                      chunksize=chunksize, features_cols=False)
+    # Every row of a repeated feature is kept, in file order
+    assert list(df.columns) == ["A", "G", "B", "A", "G"]
+    np.testing.assert_array_equal(df.iloc[:, [0, 2, 3]].to_numpy(), [[1, 4, 7], [2, 5, 8], [3, 6, 9]])
+    assert df.iloc[:, 1].tolist() == ["x", "y", "x"] and df.iloc[:, 4].tolist() == ["y", "y", "x"]
+
+
+def test_load_dataset_features_in_rows_without_dtypes(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("Feature,S1,S2\nA,1,2\nB,x,y\n", encoding="utf-8")
+
+    df = load_dataset(str(csv_file), features_cols=False)
+    assert list(df.index) == ["S1", "S2"]
+    assert df["B"].tolist() == ["x", "y"]
+
+
+@pytest.mark.parametrize("file_name", ["data.csv", "data.tsv.gz", "data.parquet", "data.feather"])
+@pytest.mark.parametrize("features_cols", [True, False])
+def test_iter_dataset_blocks(tmp_path, file_name, features_cols):
+    if file_name.endswith((".parquet", ".feather")):
+        pytest.importorskip("pyarrow")
+    index = pd.Index([f"S{i}" for i in range(5)], name="ID")
+    df = pd.DataFrame({"A": [1.0, 2.0, np.nan, 4.0, 5.0], "B": [0.5, 1.5, 2.5, 3.5, np.nan]}, index=index)
+    dtypes = {"A": "float", "B": "float"}
+    path = str(tmp_path / file_name)
+    save_dataset(df if features_cols else df.T, path)
+
+    blocks = list(iter_dataset_blocks(path, dtypes=dtypes, chunksize=2, features_cols=features_cols))
+
+    if features_cols:
+        assert [len(block.index) for block in blocks] == [2, 2, 1]
+        combined = pd.concat(blocks)
+    else:
+        assert [list(block.columns) for block in blocks] == [["A", "B"]]
+        combined = blocks[0]
+    pd.testing.assert_frame_equal(combined, df, check_names=False, check_index_type=False)
+
+
+def test_get_dataset_parses_once(tmp_path, monkeypatch):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ID,Value\nA,1\nB,2\n", encoding="utf-8")
+
+    calls = []
+    original_read_table = pd.read_table
+    monkeypatch.setattr(pd, "read_table", lambda *a, **kw: calls.append(a) or original_read_table(*a, **kw))
+
+    first = get_dataset(str(csv_file))
+    second = get_dataset(str(csv_file))
+    assert first is second
+    assert len(calls) == 1
+
+    released = release_dataset(str(csv_file))
+    assert released is first
+    assert len(calls) == 1
+
+
+def test_get_dataset_reloads_modified_file(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("ID,Value\nA,1\nB,2\n", encoding="utf-8")
+    first = get_dataset(str(csv_file))
+
+    csv_file.write_text("ID,Value\nA,1\nB,2\nC,3\n", encoding="utf-8")
+    second = get_dataset(str(csv_file))
+    assert second is not first
+    assert second.shape == (3, 1)
+    release_dataset(str(csv_file))
+
+
+@pytest.mark.parametrize("file_name", [
+    "data.csv", "data.tsv.gz", "data.csv.bz2", "data.tsv.xz", "data.csv.zst", "data.parquet", "data.feather"
+])
+def test_probe_dataset(tmp_path, file_name):
+    if file_name.endswith((".parquet", ".feather")):
+        pytest.importorskip("pyarrow")
+    if file_name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    df = pd.DataFrame(
+        {"G1": [1.0, 2.0, 3.0], "G2": ["a", "b", "c"]},
+        index=pd.Index(["s1", "s2", "s3"], name="ID")
+    )
+    path = str(tmp_path / file_name)
+    save_dataset(df, path)
+
+    probe = probe_dataset(path, sample_rows=2)
+    assert probe.columns == ("G1", "G2")
+    assert probe.rows == ("s1", "s2", "s3")
+    assert probe.shape == (3, 2)
+    assert probe.sample.shape == (2, 2)
+    assert list(probe.sample.index) == ["s1", "s2"]
+
+
+def test_probe_dataset_quoted_index(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text('ID,Value\n"A,1",1\nB,2\n\n', encoding="utf-8")
+
+    probe = probe_dataset(str(csv_file))
+    assert probe.rows == ("A,1", "B")
+    assert probe.sample is None
+
+
+@pytest.mark.parametrize("values,dtype,expected", [
+    (["1", "2", None], "int", True),
+    (["1.5", "2"], "int", False),
+    (["1.5", "2"], "float", True),
+    (["x", "2"], "float", False),
+    (["x", "2"], "category", True),
+])
+def test_check_dtype_plausibility(values, dtype, expected):
+    assert check_dtype_plausibility(pd.Series(values, dtype=object), dtype) is expected
+
+
 def test_handle_json_input_valid(tmp_path):
     json_file = tmp_path / "metadata.json"
     json_content = {"someKey": "someValue"}